@@ -0,0 +1,103 @@
+"""
+Benchmark of training with every batch padded to max_text_len versus length
+bucketed batches. Sequence lengths follow a log-normal distribution, which is
+roughly what cleaned emails and reviews look like. The label of a text is its
+share of tokens from the lower half of the vocabulary, so there is something
+to learn.
+
+Both models are also scored on the test set padded to max_text_len, the way
+the data pipeline and the exported graphs feed them. For the bucketed model
+that is a different layout from the one it was trained on. Run from the
+training_model directory:
+
+    python -m benchmarks.bucketing
+"""
+
+import time
+
+import keras
+import numpy as np
+
+from utils.featurizer import TokenSequences
+from utils.input_pipeline import TrainingData
+from utils.utils import get_keras_model
+
+MAX_TEXT_LENGTH = 800
+VOCAB_SIZE = 20_000
+EMBEDDING_DIM = 100
+BATCH_SIZE = 64
+EPOCHS = 2
+
+
+def synthetic_sequences(
+    rng: np.random.Generator, n: int
+) -> tuple[TokenSequences, np.ndarray]:
+    lengths = np.clip(rng.lognormal(mean=4.0, sigma=1.0, size=n), 1, 2_000)
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(lengths.astype(np.int64), out=offsets[1:])
+    tokens = rng.integers(1, VOCAB_SIZE, size=offsets[-1], dtype=np.int32)
+
+    low = np.add.reduceat((tokens < VOCAB_SIZE // 2).astype(np.float32), offsets[:-1])
+    return TokenSequences(tokens, offsets), low / np.diff(offsets)
+
+
+def train(training_data: TrainingData, bucketed: bool) -> tuple[float, keras.Model]:
+    """
+    Trains for EPOCHS epochs. Returns the time of the last one, the first
+    includes tracing.
+    """
+    keras.backend.clear_session()
+    keras.utils.set_random_seed(0)
+    weights = np.random.default_rng(0).normal(size=(VOCAB_SIZE, EMBEDDING_DIM))
+    model = get_keras_model(
+        weights, 32, 128, 0.1, None if bucketed else MAX_TEXT_LENGTH
+    )
+    model.compile(optimizer="adam", loss="mse", metrics=["mae"])
+
+    inputs = training_data.fit_inputs(BATCH_SIZE, bucketed)
+    model.fit(**inputs, epochs=EPOCHS - 1, verbose=0)
+    start = time.perf_counter()
+    model.fit(**inputs, epochs=1, verbose=0)
+    return time.perf_counter() - start, model
+
+
+def mae(model: keras.Model, training_data: TrainingData, bucketed: bool) -> float:
+    """
+    Test set MAE, with bucketed or with max_text_len padding
+    """
+    if bucketed:
+        x, y = training_data.fit_inputs(BATCH_SIZE, bucketed)["validation_data"], None
+    else:
+        x, y = training_data.padded()[1], training_data.Y_test
+    return model.evaluate(x, y, batch_size=BATCH_SIZE, verbose=0, return_dict=True)["mae"]
+
+
+def main():
+    rng = np.random.default_rng(0)
+    train_sequences, Y_train = synthetic_sequences(rng, 20_000)
+    test_sequences, Y_test = synthetic_sequences(rng, 1_000)
+    training_data = TrainingData(
+        train_sequences, Y_train, test_sequences, Y_test, max_text_len=MAX_TEXT_LENGTH
+    )
+
+    print(f"[i] Median length: {np.median(train_sequences.lengths()):.0f} tokens")
+    print(f"[i] MAE of always predicting the mean: {np.abs(Y_test - Y_train.mean()).mean():.4f}")
+
+    padded, padded_model = train(training_data, bucketed=False)
+    bucketed, bucketed_model = train(training_data, bucketed=True)
+
+    print(
+        f"Padded to {MAX_TEXT_LENGTH}: {padded:.1f}s per epoch, "
+        f"test MAE {mae(padded_model, training_data, bucketed=False):.4f}"
+    )
+    print(
+        f"Bucketed: {bucketed:.1f}s per epoch, "
+        f"test MAE {mae(bucketed_model, training_data, bucketed=True):.4f} bucketed, "
+        f"{mae(bucketed_model, training_data, bucketed=False):.4f} "
+        f"padded to {MAX_TEXT_LENGTH}"
+    )
+    print(f"Speedup: {padded / bucketed:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Time spent in each step of utils.cleaning.clean_document.
+
+clean_document runs its regular expressions back to back on one text, which
+is what the pipeline profiles. Here the same steps run one at a time over a
+whole batch of review texts (see benchmarks.corpus), so each can be timed on
+its own. The steps are checked against clean_document before timing. Run from
+the training_model directory:
+
+    python -m benchmarks.cleaning_steps --rows 20000
+"""
+
+import argparse
+import time
+
+from benchmarks.corpus import review_lines
+from utils.cleaning import (
+    _SHORT_WORDS_AND_SPACES_RE,
+    _UNWANTED_RUNS_RE,
+    LINKS_RE,
+    REPEATS_RE,
+    clean_document,
+    convert_emoticons,
+)
+
+# The steps of clean_document, in its order
+STEPS = [
+    ("links", lambda txt: LINKS_RE.sub("", txt.lower())),
+    ("emoticons", convert_emoticons),
+    ("unwanted_chars", lambda txt: _UNWANTED_RUNS_RE.sub(" ", txt)),
+    ("repeats", lambda txt: REPEATS_RE.sub(r"\1", txt)),
+    ("short_words", lambda txt: _SHORT_WORDS_AND_SPACES_RE.sub(" ", txt)),
+]
+
+
+def clean_by_step(texts: list[str]) -> tuple[list[str], dict[str, float]]:
+    """
+    Cleans texts one step at a time. Returns them with the seconds per step.
+    """
+    seconds = {}
+    for name, step in STEPS:
+        start = time.perf_counter()
+        texts = [step(txt) for txt in texts]
+        seconds[name] = time.perf_counter() - start
+
+    return texts, seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=20_000)
+    args = parser.parse_args()
+
+    texts = [line.split(" ", 1)[1] for line in review_lines(args.rows)]
+
+    start = time.perf_counter()
+    expected = [clean_document(txt) for txt in texts]
+    fused = time.perf_counter() - start
+
+    cleaned, seconds = clean_by_step(texts)
+    assert cleaned == expected, "STEPS no longer match clean_document"
+
+    for name, step_seconds in seconds.items():
+        print(f"{name:<15} {step_seconds:>7.3f}s {step_seconds / fused:>6.1%}")
+    print(f"{'clean_document':<15} {fused:>7.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+Deterministic synthetic corpora, so the pipeline can be benchmarked and run
+without the real datasets or the network.
+
+Emails are raw RFC 822 messages with the headers of the Enron dump, in its
+CSV layout (file, message). Reviews are fastText lines,
+"__label__<1|2> <title>: <text>", like the Amazon review files. Words are
+drawn from a Zipf distribution over a fixed vocabulary that mixes neutral
+words with words VADER scores, plus a long tail of made up tokens standing in
+for names and typos. Bodies also hold links, numbers, emoticons and quoted
+replies. Text lengths are log-normal.
+
+The same size and seed always give the same corpus. Write one to disk with:
+
+    python -m benchmarks.corpus emails 100000 -o datasets/emails.csv
+    python -m benchmarks.corpus reviews 100000 -o datasets/train.ft.txt.bz2
+"""
+
+import argparse
+import bz2
+import os
+import random
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+
+COMMON_WORDS = """
+the to and of a in for is on that this with be will it you we have as are at
+by our from not or if can an please would your all any me my do has was but so
+they there about which what when get been more also one should time need let
+know just meeting report deal gas power price market contract trading energy
+enron company business group team project office week today tomorrow friday
+monday call phone attached file document draft review comments schedule
+agreement transaction volume capacity pipeline schedule forecast budget
+""".split()
+
+SENTIMENT_WORDS = """
+thanks thank great good excellent happy glad appreciate congratulations best
+wonderful love perfect nice helpful pleased success win agree sure fine
+problem bad sorry unfortunately issue concern wrong fail failed worst hate
+angry difficult delay risk loss lost terrible poor worried urgent cancel
+""".split()
+
+FIRST_NAMES = ["john", "jeff", "sara", "kate", "mark", "vince", "sally", "louise"]
+LAST_NAMES = ["allen", "lay", "skilling", "kaminski", "shackleton", "kitchen"]
+FOLDERS = ["_sent_mail", "inbox", "all_documents", "discussion_threads", "deleted_items"]
+EMOTICONS = [":)", ":(", ":D", ";)", ":-(", "<3", ":P"]
+
+TAIL_WORDS = 20_000
+
+
+def vocabulary(rng: random.Random) -> list[str]:
+    """
+    Words ordered from most to least frequent
+    """
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    tail = {
+        "".join(rng.choices(letters, k=rng.randint(3, 10))) for _ in range(TAIL_WORDS)
+    }
+    return COMMON_WORDS + SENTIMENT_WORDS + sorted(tail)
+
+
+class TextGenerator:
+    def __init__(self, seed: int):
+        self.rng = random.Random(seed)
+        self.np_rng = np.random.default_rng(seed)
+        self.words = vocabulary(self.rng)
+
+        # Zipf-Mandelbrot frequencies, flatter at the top than plain Zipf
+        weights = 1 / (np.arange(len(self.words)) + 3.0)
+        self.cumulative = np.cumsum(weights / weights.sum())
+
+    def words_between(self, median: int, sigma: float, cap: int) -> list[str]:
+        n = int(min(max(self.np_rng.lognormal(np.log(median), sigma), 1), cap))
+        ranks = np.searchsorted(self.cumulative, self.np_rng.random(n) * self.cumulative[-1])
+        return [self.words[i] for i in ranks]
+
+    def sentence(self, words: list[str]) -> str:
+        rng = self.rng
+        pieces = []
+        for word in words:
+            roll = rng.random()
+            if roll < 0.02:
+                word = str(rng.randint(1, 99_999))
+            elif roll < 0.03:
+                word = f"http://www.enron.com/{word}"
+            elif roll < 0.04:
+                word = word + rng.choice(EMOTICONS)
+            elif roll < 0.06:
+                word = word.capitalize()
+            elif roll < 0.07:
+                word = word.upper() + "!!!"
+            pieces.append(word)
+
+        text = " ".join(pieces)
+        return text[:1].upper() + text[1:] + rng.choice([".", ".", "!", "?"])
+
+    def paragraph(self, median: int) -> str:
+        words = self.words_between(median, 1.0, 2_000)
+        sentences = [
+            self.sentence(words[i : i + 15]) for i in range(0, len(words), 15)
+        ]
+        return " ".join(sentences)
+
+
+def address(rng: random.Random) -> str:
+    return f"{rng.choice(FIRST_NAMES)}.{rng.choice(LAST_NAMES)}@enron.com"
+
+
+def email_message(generator: TextGenerator, i: int, date: datetime) -> str:
+    rng = generator.rng
+    sender = address(rng)
+    recipients = sorted({address(rng) for _ in range(rng.randint(1, 4))})
+    subject = generator.sentence(generator.words_between(5, 0.5, 12))[:-1]
+    body = "\n\n".join(generator.paragraph(60) for _ in range(rng.randint(1, 3)))
+
+    if rng.random() < 0.3:
+        quoted = generator.paragraph(30)
+        body += f"\n\n -----Original Message-----\nFrom: {recipients[0]}\n\n{quoted}"
+        subject = f"RE: {subject}"
+
+    name = sender.split("@")[0].replace(".", " ").title()
+    headers = [
+        f"Message-ID: <{i}.{rng.randint(10**12, 10**13)}.JavaMail.evans@thyme>",
+        f"Date: {date.strftime('%a, %d %b %Y %H:%M:%S -0700')} (PDT)",
+        f"From: {sender}",
+        f"To: {', '.join(recipients)}",
+        f"Subject: {subject}",
+        "Mime-Version: 1.0",
+        "Content-Type: text/plain; charset=us-ascii",
+        "Content-Transfer-Encoding: 7bit",
+        f"X-From: {name}",
+        f"X-To: {', '.join(recipients)}",
+        "X-cc: ",
+        "X-bcc: ",
+        f"X-Folder: \\{name.replace(' ', '_')}\\{rng.choice(FOLDERS)}",
+        f"X-Origin: {name.split()[-1]}",
+        f"X-FileName: {sender.split('@')[0]} (Non-Privileged).pst",
+    ]
+    return "\n".join(headers) + "\n\n" + body + "\n"
+
+
+def enron_emails(rows: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Raw messages in the layout of the Enron CSV
+    """
+    generator = TextGenerator(seed)
+    start = datetime(1999, 1, 1, tzinfo=timezone(timedelta(hours=-7)))
+
+    files, messages = [], []
+    for i in range(rows):
+        date = start + timedelta(minutes=generator.rng.randint(0, 3 * 365 * 24 * 60))
+        folder = generator.rng.choice(FOLDERS)
+        files.append(f"{generator.rng.choice(LAST_NAMES)}-x/{folder}/{i}.")
+        messages.append(email_message(generator, i, date))
+
+    return pd.DataFrame({"file": files, "message": messages})
+
+
+def review_lines(rows: int, seed: int = 0) -> list[str]:
+    """
+    fastText lines, half of them positive (__label__2)
+    """
+    generator = TextGenerator(seed)
+    lines = []
+    for _ in range(rows):
+        label = generator.rng.choice([1, 2])
+        title = generator.sentence(generator.words_between(4, 0.5, 10))[:-1]
+        lines.append(f"__label__{label} {title}: {generator.paragraph(70)}")
+
+    return lines
+
+
+def write_corpus(kind: str, rows: int, path: str, seed: int = 0):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    if kind == "emails":
+        enron_emails(rows, seed).to_csv(path, index=False)
+    else:
+        with bz2.open(path, "wt", encoding="utf-8") as f:
+            f.write("\n".join(review_lines(rows, seed)) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic corpus")
+    parser.add_argument("kind", choices=["emails", "reviews"])
+    parser.add_argument("rows", type=int)
+    parser.add_argument("-o", "--output", required=True)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    write_corpus(args.kind, args.rows, args.output, args.seed)
+    print(f"[i] {args.rows} {args.kind} written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
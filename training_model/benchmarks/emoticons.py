@@ -0,0 +1,56 @@
+"""
+Micro-benchmark for emoticon replacement on long emails.
+
+Compares the old loop (one str.replace per emoticon) with the single-scan
+alternation in utils.cleaning. Run from the training_model directory:
+
+    python -m benchmarks.emoticons
+"""
+
+import random
+import timeit
+
+from utils.cleaning import convert_emoticons, emoticon_meanings
+
+WORDS = ["meeting", "report", "thanks", "please", "review", "the", "and", "deal"]
+
+
+def legacy_convert(txt: str) -> str:
+    for emoticon, meaning in emoticon_meanings.items():
+        txt = txt.replace(emoticon, f" {meaning}")
+
+    return txt
+
+
+def make_email(rng: random.Random, n_words: int) -> str:
+    emoticons = [e for e in emoticon_meanings if not e.endswith("v ")]
+    parts = [
+        rng.choice(emoticons) if rng.random() < 0.01 else " " + rng.choice(WORDS)
+        for _ in range(n_words)
+    ]
+    return "".join(parts)
+
+
+def main():
+    rng = random.Random(0)
+
+    for n_words in [100, 1_000, 10_000]:
+        emails = [make_email(rng, n_words) for _ in range(200)]
+        assert [legacy_convert(e) for e in emails] == [
+            convert_emoticons(e) for e in emails
+        ]
+
+        legacy = min(
+            timeit.repeat(lambda: [legacy_convert(e) for e in emails], number=3)
+        )
+        single = min(
+            timeit.repeat(lambda: [convert_emoticons(e) for e in emails], number=3)
+        )
+        print(
+            f"{n_words:>6} words: loop {legacy:.4f}s, "
+            f"single scan {single:.4f}s ({legacy / single:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
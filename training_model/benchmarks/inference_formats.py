@@ -0,0 +1,98 @@
+"""
+Benchmark for the saved model formats.
+
+Loads every format of a trained model that exists under ./models (run
+export_model.py first for the TFLite ones), scores the first rows of its
+cleaned dataset with each and reports the file size, load time, latency of a
+single row, batch throughput, accuracy, and how far the scores drift from the
+Keras model. Run from the training_model directory:
+
+    python -m benchmarks.inference_formats emails --rows 5000
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+from evaluate import DATASETS, read_chunks
+from utils.inference import MODEL_FORMATS, MODEL_NAMES, PREDICT_BATCH_SIZE, SentimentModel
+from utils.metrics import StreamingMetrics
+
+LATENCY_CALLS = 50
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare saved model formats")
+    parser.add_argument("model_name", choices=MODEL_NAMES)
+    parser.add_argument("--rows", type=int, default=5000, help="Rows scored per format")
+    parser.add_argument("--batch-size", type=int, default=PREDICT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    path, text_column = DATASETS[args.model_name]
+    texts, labels = [], []
+    for chunk_texts, chunk_labels in read_chunks(path, text_column, args.rows, args.rows):
+        texts += chunk_texts
+        labels.append(chunk_labels)
+    y_true = np.concatenate(labels)
+
+    results = {}
+    reference = None
+    for model_format, model_path in MODEL_FORMATS.items():
+        model_path = model_path.format(args.model_name)
+        if not os.path.exists(model_path):
+            print(f"[i] No {model_path}, skipping {model_format}")
+            continue
+
+        start = time.perf_counter()
+        model = SentimentModel(args.model_name, cache_size=0, model_format=model_format)
+        load = time.perf_counter() - start
+
+        sequences = model.featurize(texts)
+
+        # Warm up, then time single rows as a server would see them
+        model.predict(sequences.take(np.arange(1)))
+        latencies = []
+        for i in range(min(LATENCY_CALLS, len(texts))):
+            start = time.perf_counter()
+            model.predict(sequences.take(np.arange(i, i + 1)))
+            latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        scores = model.predict(sequences, batch_size=args.batch_size)
+        elapsed = time.perf_counter() - start
+
+        metrics = StreamingMetrics()
+        metrics.update(y_true, scores)
+        result = metrics.result()
+
+        if reference is None:
+            reference = scores
+        drift = np.abs(scores - reference)
+
+        results[model_format] = (
+            os.path.getsize(model_path) / 2**20,
+            load,
+            float(np.median(latencies)) * 1000,
+            len(texts) / elapsed,
+            result["MAE"],
+            result["classification_report"]["accuracy"],
+            float(drift.mean()),
+            float(drift.max()),
+        )
+
+    print(f"\n{len(texts)} rows of {path}, drift is against the first format")
+    print(
+        f"{'format':<12} {'size':>9} {'load':>7} {'p50 1 row':>10} {'rows/s':>9}"
+        f" {'MAE':>7} {'acc':>6} {'mean |d|':>9} {'max |d|':>8}"
+    )
+    for name, (size, load, p50, rate, mae, acc, mean_d, max_d) in results.items():
+        print(
+            f"{name:<12} {size:>5.1f} MiB {load:>6.2f}s {p50:>8.1f}ms {rate:>9.0f}"
+            f" {mae:>7.4f} {acc:>6.3f} {mean_d:>9.5f} {max_d:>8.5f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Benchmark of command line startup time. Every command is started in a fresh
+interpreter a few times, and the median wall time is reported. run_model.py is
+given an unknown model name, so it exits right after validating it. Run from
+the training_model directory:
+
+    python -m benchmarks.startup
+"""
+
+import statistics
+import subprocess
+import sys
+import time
+
+RUNS = 5
+
+# (command line, stdin)
+COMMANDS = [
+    (["main.py", "-h"], None),
+    (["main.py", "emails", "--from", "unknown"], None),
+    (["run_model.py"], "unknown\n"),
+    (["serve.py", "-h"], None),
+    (["evaluate.py", "-h"], None),
+    (["export_model.py", "-h"], None),
+]
+
+
+def startup_time(argv: list[str], stdin: str | None) -> float:
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, *argv],
+        input=stdin,
+        text=True,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    return time.perf_counter() - start
+
+
+def main():
+    for argv, stdin in COMMANDS:
+        times = [startup_time(argv, stdin) for _ in range(RUNS)]
+        print(f"{' '.join(argv):<40} {statistics.median(times):.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark for intermediate dataset storage.
+
+Writes a synthetic labelled email dataset as CSV (address sets joined with
+";;", as label_emails used to) and as Parquet through utils.storage, then
+reads it back whole and as only the content and sentiment columns. Run from
+the training_model directory:
+
+    python -m benchmarks.storage
+"""
+
+import os
+import random
+import tempfile
+import time
+
+import pandas as pd
+
+from utils.storage import read_dataset, write_dataset
+
+WORDS = ["meeting", "report", "thanks", "please", "review", "the", "and", "deal"]
+PEOPLE = [f"person{i}@enron.com" for i in range(500)]
+
+
+def make_dataset(rng: random.Random, rows: int) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "Date": pd.Timestamp("2001-05-14", tz="UTC"),
+            "From": [[rng.choice(PEOPLE)] for _ in range(rows)],
+            "To": [sorted(set(rng.sample(PEOPLE, rng.randint(1, 5)))) for _ in range(rows)],
+            "Subject": [" ".join(rng.choices(WORDS, k=5)) for _ in range(rows)],
+            "content": [" ".join(rng.choices(WORDS, k=200)) for _ in range(rows)],
+            "sentiment": [rng.uniform(-1, 1) for _ in range(rows)],
+        },
+        index=pd.Index([f"<{i}.JavaMail@thyme>" for i in range(rows)], name="Message-ID"),
+    )
+
+
+def timed(func) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main():
+    df = make_dataset(random.Random(0), 100_000)
+    csv_df = df.assign(
+        From=df["From"].map(";;".join), To=df["To"].map(";;".join)
+    )
+    columns = ["content", "sentiment"]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "emails.csv")
+        parquet_path = os.path.join(tmp, "emails.parquet")
+
+        results = {
+            "CSV": (
+                timed(lambda: csv_df.to_csv(csv_path)),
+                timed(lambda: pd.read_csv(csv_path, index_col=0)),
+                timed(lambda: pd.read_csv(csv_path, usecols=columns)),
+                os.path.getsize(csv_path),
+            ),
+            "Parquet": (
+                timed(lambda: write_dataset(df, parquet_path)),
+                timed(lambda: read_dataset(parquet_path)),
+                timed(lambda: read_dataset(parquet_path, columns=columns)),
+                os.path.getsize(parquet_path),
+            ),
+        }
+
+    for name, (write, read, partial, size) in results.items():
+        print(
+            f"{name:>8}: write {write:.2f}s, read {read:.2f}s, "
+            f"read {columns} {partial:.2f}s, {size / 2**20:.1f} MiB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""
+Benchmark suite of the whole pipeline on synthetic corpora (see
+benchmarks.corpus), so it runs anywhere without datasets, a trained model or
+the network.
+
+For every size it times:
+
+- label_emails: parsing and VADER labelling of raw Enron style messages
+- clean_text: cleaning of review texts
+- featurize: mapping cleaned text onto an embedding vocabulary
+- pad: padding every document to max_text_len
+- train: steps per second of a tiny model on bucketed batches
+- predict: batch inference throughput of that model
+
+Each benchmark runs --repeat times and keeps the fastest. Results are written
+to JSON, and --compare checks them against a saved run, exiting with 1 when
+anything got slower than the tolerance allows. Run from the training_model
+directory:
+
+    python -m benchmarks.suite --sizes 1000 10000 -o baseline.json
+    python -m benchmarks.suite --sizes 1000 10000 --compare baseline.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+from benchmarks.corpus import TextGenerator, enron_emails, review_lines
+from utils.cleaning import clean_texts
+from utils.embeddings import EmbeddingStore
+from utils.featurizer import Featurizer
+
+BENCHMARKS = ["label_emails", "clean_text", "featurize", "pad", "train", "predict"]
+DEFAULT_SIZES = [1_000, 10_000]
+RESULTS_DIR = "./benchmarks/results"
+DEFAULT_TOLERANCE = 0.15
+
+MAX_TEXT_LEN = 800
+EMBEDDING_DIM = 50
+BATCH_SIZE = 64
+TRAIN_STEPS = 50
+PREDICT_BATCH_SIZE = 1024
+
+
+def best_of(repeat: int, func) -> tuple[float, object]:
+    """
+    Runs func repeat times, returns the fastest time and the last result
+    """
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def timing(count: int, seconds: float, unit: str = "rows") -> dict:
+    return {"count": count, "unit": unit, "seconds": seconds, "rate": count / seconds}
+
+
+def synthetic_embeddings(seed: int) -> EmbeddingStore:
+    """
+    Random vectors for every word the corpus generator can produce
+    """
+    words = TextGenerator(seed).words
+    rng = np.random.default_rng(seed)
+    vectors = rng.normal(size=(len(words), EMBEDDING_DIM)).astype(np.float32)
+    return EmbeddingStore("synthetic", vectors, words)
+
+
+def time_model(
+    embeddings: EmbeddingStore, sequences, labels, repeat: int, skip: list[str]
+) -> dict[str, dict]:
+    """
+    Training steps per second and prediction throughput of a tiny model
+    """
+    try:
+        import keras
+    except ImportError:
+        print("[!] Keras is not installed, skipping train and predict")
+        return {}
+
+    from utils.input_pipeline import bucket_batches, bucketed_dataset
+    from utils.utils import get_keras_model
+
+    keras.backend.clear_session()
+    model = get_keras_model(embeddings.vectors, 16, 32, 0.1, None)
+    model.compile(optimizer="adam", loss="mse")
+
+    dataset = bucketed_dataset(sequences, labels, BATCH_SIZE, MAX_TEXT_LEN, seed=0).repeat()
+
+    # The first steps include tracing, one per bucket length
+    model.fit(dataset, epochs=1, steps_per_epoch=TRAIN_STEPS, verbose=0)  # pyright: ignore
+
+    results = {}
+    if "train" not in skip:
+        seconds, _ = best_of(
+            repeat,
+            lambda: model.fit(
+                dataset, epochs=1, steps_per_epoch=TRAIN_STEPS, verbose=0  # pyright: ignore
+            ),
+        )
+        results["train"] = timing(TRAIN_STEPS, seconds, "steps")
+
+    if "predict" not in skip:
+        batches = bucket_batches(sequences.lengths(), PREDICT_BATCH_SIZE, MAX_TEXT_LEN)
+
+        def predict():
+            for rows, limit in batches:
+                model.predict_on_batch(sequences.take(rows).pad(limit))
+
+        predict()
+        seconds, _ = best_of(repeat, predict)
+        results["predict"] = timing(len(sequences), seconds)
+
+    return results
+
+
+def run_size(
+    size: int, repeat: int, seed: int, workers: int, skip: list[str]
+) -> dict[str, dict]:
+    from emails.label_emails import label_emails
+
+    print(f"[i] Generating {size} emails and reviews")
+    results = {}
+
+    if "label_emails" not in skip:
+        emails = enron_emails(size, seed)
+        seconds, _ = best_of(
+            repeat, lambda: label_emails(emails, output=False, workers=workers)
+        )
+        results["label_emails"] = timing(size, seconds)
+        del emails
+
+    lines = review_lines(size, seed)
+    labels = np.array([line.startswith("__label__2") for line in lines], dtype=np.float32)
+    texts = [line.split(" ", 1)[1] for line in lines]
+
+    seconds, cleaned = best_of(
+        repeat, lambda: clean_texts(texts, progress=False, workers=workers)
+    )
+    if "clean_text" not in skip:
+        results["clean_text"] = timing(size, seconds)
+
+    featurizer = Featurizer(synthetic_embeddings(seed))
+    seconds, sequences = best_of(repeat, lambda: featurizer.transform(cleaned))  # pyright: ignore
+    if "featurize" not in skip:
+        results["featurize"] = timing(size, seconds)
+
+    if "pad" not in skip:
+        seconds, _ = best_of(repeat, lambda: sequences.pad(MAX_TEXT_LEN))  # pyright: ignore
+        results["pad"] = timing(size, seconds)
+
+    if "train" not in skip or "predict" not in skip:
+        results |= time_model(
+            synthetic_embeddings(seed),
+            sequences.truncate(MAX_TEXT_LEN),  # pyright: ignore
+            labels,
+            repeat,
+            skip,
+        )
+
+    return {f"{name}/{size}": result for name, result in results.items()}
+
+
+def compare(
+    results: dict[str, dict], baseline: dict[str, dict], tolerance: float
+) -> list[str]:
+    """
+    Prints the rate of every benchmark against the baseline. Returns the ones
+    that lost more than tolerance (a fraction) of their rate.
+    """
+    regressions = []
+    print(f"\n{'benchmark':<24} {'baseline':>14} {'now':>14} {'ratio':>7}")
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+
+        ratio = result["rate"] / baseline[name]["rate"]
+        flag = ""
+        if ratio < 1 - tolerance:
+            regressions.append(name)
+            flag = "  REGRESSION"
+
+        unit = f"{result['unit']}/s"
+        print(
+            f"{name:<24} {baseline[name]['rate']:>8,.0f} {unit:<5} "
+            f"{result['rate']:>8,.0f} {unit:<5} {ratio:>6.2f}x{flag}"
+        )
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline on synthetic data")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per benchmark, the fastest counts")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes for labelling and cleaning")
+    parser.add_argument("--skip", nargs="+", default=[], choices=BENCHMARKS)
+    parser.add_argument("-o", "--output", help=f"Results JSON (default: {RESULTS_DIR}/<time>.json)")
+    parser.add_argument("--compare", help="Results JSON of an earlier run to check against")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=DEFAULT_TOLERANCE,
+        help=f"Slowdown allowed before --compare fails (default: {DEFAULT_TOLERANCE})",
+    )
+    args = parser.parse_args()
+
+    started = datetime.now()
+    results = {}
+    for size in args.sizes:
+        results |= run_size(size, args.repeat, args.seed, args.workers, args.skip)
+
+    report = {
+        "started": started.isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "results": results,
+    }
+
+    path = args.output or os.path.join(RESULTS_DIR, f"{started:%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"\n{'benchmark':<24} {'seconds':>9} {'rate':>16}")
+    for name, result in results.items():
+        print(
+            f"{name:<24} {result['seconds']:>9.3f} "
+            f"{result['rate']:>10,.0f} {result['unit']}/s"
+        )
+    print(f"[i] Results written to {path}")
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)["results"]
+
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"[!] {len(regressions)} regressed past {args.tolerance:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+        print("[i] No regressions")
+
+
+if __name__ == "__main__":
+    main()
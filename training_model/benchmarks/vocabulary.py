@@ -0,0 +1,100 @@
+"""
+Benchmark of a model built over the whole GloVe matrix versus one over a
+vocabulary pruned to the corpus. A synthetic 400k x 100 store stands in for
+GloVe and a Zipf distributed corpus for the cleaned text. Reports the saved
+model size and the time to load the model and its vocabulary, as
+SentimentModel does. Run from the training_model directory:
+
+    python -m benchmarks.vocabulary
+"""
+
+import os
+import tempfile
+import time
+
+import keras
+import numpy as np
+
+from utils.embeddings import EmbeddingStore
+from utils.featurizer import Featurizer
+from utils.utils import get_keras_model
+from utils.vocabulary import (
+    load_vocabulary,
+    prune_embeddings,
+    save_vocabulary,
+    word_counts,
+)
+
+GLOVE_WORDS = 400_000
+EMBEDDING_DIM = 100
+VOCAB_SIZE = 50_000
+DOCUMENTS = 20_000
+
+
+def synthetic_store(rng: np.random.Generator) -> EmbeddingStore:
+    vectors = rng.normal(size=(GLOVE_WORDS, EMBEDDING_DIM)).astype(np.float32)
+    return EmbeddingStore("synthetic", vectors, [f"w{i}" for i in range(GLOVE_WORDS)])
+
+
+def synthetic_texts(rng: np.random.Generator) -> list[str]:
+    words = np.minimum(rng.zipf(1.2, size=(DOCUMENTS, 100)), GLOVE_WORDS) - 1
+    return [" ".join(f"w{i}" for i in row) for row in words]
+
+
+def save_model(store: EmbeddingStore, path: str) -> float:
+    keras.backend.clear_session()
+    model = get_keras_model(store.vectors, 32, 128, 0.1, None)
+    model.save(path)
+    return os.path.getsize(path) / 2**20
+
+
+def timed_load(model_path: str, vocabulary) -> float:
+    start = time.perf_counter()
+    Featurizer(vocabulary())
+    keras.models.load_model(model_path)
+    return time.perf_counter() - start
+
+
+def main():
+    rng = np.random.default_rng(0)
+    store = synthetic_store(rng)
+    texts = synthetic_texts(rng)
+
+    counts = word_counts(texts, store)
+    pruned = prune_embeddings(store, counts, VOCAB_SIZE)
+    coverage = counts[[store.key_to_index[w] for w in pruned.index_to_key[2:]]].sum()
+    print(
+        f"[i] {len(pruned) - 2} words kept, covering {coverage / counts.sum():.1%} "
+        "of the corpus"
+    )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        full_path = os.path.join(tmp, "full.keras")
+        pruned_path = os.path.join(tmp, "pruned.keras")
+        vocab_path = os.path.join(tmp, "vocab.txt")
+        store_vocab_path = os.path.join(tmp, "store_vocab.txt")
+
+        save_vocabulary(pruned, vocab_path)
+        # The full model reads the whole store vocabulary, as load_embeddings does
+        save_vocabulary(store, store_vocab_path)
+
+        results = {
+            "Full": (
+                save_model(store, full_path),
+                timed_load(full_path, lambda: load_vocabulary(store_vocab_path, "")),
+            ),
+            "Pruned": (
+                save_model(pruned, pruned_path),
+                timed_load(pruned_path, lambda: load_vocabulary(vocab_path, "")),
+            ),
+        }
+
+    for name, (size, load) in results.items():
+        print(f"{name:<7} model {size:>6.1f} MiB, loaded in {load:.2f}s")
+
+    (full_size, full_load), (pruned_size, pruned_load) = results.values()
+    print(f"Size: {full_size / pruned_size:.1f}x smaller, load: {full_load / pruned_load:.1f}x faster")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,71 @@
 import pandas as pd
 from tqdm import tqdm
+from utils.cleaning import DEFAULT_CHUNK_SIZE
+from utils.storage import (
+    EMAILS_CLEANED,
+    EMAILS_LABELLED,
+    append_dataset,
+    dataset_files,
+    dataset_index,
+    read_dataset,
+    shard_dataset,
+    write_dataset,
+)
 from utils.utils import clean_text
 
 tqdm.pandas()
 
 
-def clean_emails(data: pd.DataFrame, output_csv: bool = True) -> pd.DataFrame:
+def clean_emails(
+    data: pd.DataFrame,
+    output: bool = True,
+    workers: int | None = 1,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> pd.DataFrame:
     print("[i] Cleaning content")
-    data["content"] = clean_text(data["content"])  # pyright: ignore
+    data["content"] = clean_text(
+        data["content"], workers=workers, chunk_size=chunk_size
+    )  # pyright: ignore
 
     print("[i] Scaling values")
     data["sentiment"] = data["sentiment"].progress_apply(lambda x: (x + 1) / 2)
 
-    if output_csv:
-        data.to_csv("datasets/emails_cleaned.csv")
+    if output:
+        print(f"[i] Saving emails to {EMAILS_CLEANED}")
+        write_dataset(data, EMAILS_CLEANED)
+
+    return data
+
+
+def clean_new_emails(
+    labelled_path: str = EMAILS_LABELLED,
+    path: str = EMAILS_CLEANED,
+    workers: int | None = 1,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> pd.DataFrame:
+    """
+    Cleans only the labelled emails missing from the cleaned dataset and
+    appends them to it as a new shard. Returns the new rows.
+    """
+    known = dataset_index(path)
+
+    # Shards whose emails were all cleaned before are never loaded
+    new_rows = []
+    for shard in dataset_files(labelled_path):
+        index = dataset_index(shard)
+        if not index.isin(known).all():
+            data = read_dataset(shard)
+            new_rows.append(data[~data.index.isin(known)])
+
+    data = pd.concat(new_rows) if new_rows else pd.DataFrame()
+    print(f"[i] {len(known)} emails already cleaned, {len(data)} new")
+
+    shard_dataset(path)
+    if data.empty:
+        return data
+
+    data = clean_emails(data, output=False, workers=workers, chunk_size=chunk_size)
+    print(f"[i] Appending {len(data)} emails to {path}")
+    append_dataset(data, path)
 
     return data
@@ -0,0 +1,138 @@
+"""
+Drops exact and near-duplicate emails before they are labelled.
+
+Enron holds the same message in several folders of a mailbox (all_documents,
+sent, _sent_mail, discussion_threads) and many forwarded copies. Each copy
+would be parsed, scored by VADER, cleaned and trained on, and copies landing
+on both sides of the train/test split inflate the test score.
+
+Only copies between the same people are dropped, so every labelled
+sender/recipient pair survives. An exact duplicate has the same From, To and
+Date headers and the same body. A near duplicate has the same From and To as
+an earlier email and a body similar to it, such as the same message forwarded
+again to the same recipients. Two people sending each other "Thanks!" on
+different days are two emails.
+
+The raw CSV is read twice, a chunk at a time, so memory holds one chunk plus
+16 bytes of keys per email. Pass one computes the keys of every message
+across workers (see utils.dedup), spilling the MinHash signatures to a
+memory mapped temporary file. Pass two writes the emails that are kept as
+Parquet shards, with their row number in the CSV as index.
+"""
+
+import os
+import shutil
+import tempfile
+from email.parser import HeaderParser
+
+import numpy as np
+import pandas as pd
+
+from utils import profiling
+from utils.dedup import DEFAULT_THRESHOLD, NUM_PERM, duplicate_rows, key_hash, text_keys
+from utils.parallel import DEFAULT_CHUNK_SIZE, map_chunks
+from utils.storage import EMAILS_DEDUPED, write_dataset
+
+READ_CHUNK_SIZE = 100_000
+
+
+KEY_HEADERS = ["From", "To", "Date"]
+
+
+def split_message(message: str | None) -> tuple[list[str], str | None]:
+    """
+    The KEY_HEADERS of a raw message, lowercase with whitespace collapsed, and
+    everything after the headers
+    """
+    if not isinstance(message, str):
+        return [""] * len(KEY_HEADERS), None
+
+    head, _, body = message.partition("\n\n")
+    headers = HeaderParser().parsestr(head)
+    values = [str(headers.get(key, "")) for key in KEY_HEADERS]
+    return [" ".join(value.lower().split()) for value in values], body
+
+
+def _keys_chunk(messages: list[str]) -> list[tuple]:
+    parts = [split_message(message) for message in messages]
+    hashes, signatures = text_keys(
+        (body for _, body in parts), ("\n".join(headers) for headers, _ in parts)
+    )
+    # Near duplicates are only looked for among emails between the same people
+    groups = [key_hash("\n".join(headers[:2])) for headers, _ in parts]
+    return list(zip(hashes.tolist(), groups, signatures))
+
+
+def dedup_emails(
+    csv_path: str,
+    path: str = EMAILS_DEDUPED,
+    threshold: float = DEFAULT_THRESHOLD,
+    workers: int | None = 1,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    read_chunk_size: int = READ_CHUNK_SIZE,
+) -> dict[str, int]:
+    """
+    Writes the emails of csv_path without duplicates to path. Returns how
+    many were read, dropped as exact or near duplicates and kept.
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        signatures_path = os.path.join(tmp_dir, "signatures.u32")
+        hashes, groups = [], []
+
+        with profiling.span("dedup/keys") as span, open(signatures_path, "wb") as f:
+            for i, chunk in enumerate(pd.read_csv(csv_path, chunksize=read_chunk_size)):
+                keys = map_chunks(
+                    _keys_chunk,
+                    list(chunk["message"]),
+                    workers=workers,
+                    chunk_size=chunk_size,
+                    desc=f"[i] Hashing emails, chunk {i}",
+                )
+                hashes.append(np.array([key[0] for key in keys], dtype=np.int64))
+                groups.append(np.array([key[1] for key in keys], dtype=np.int64))
+                f.write(np.stack([key[2] for key in keys]).tobytes())
+
+            span.rows = sum(map(len, hashes))
+
+        hashes = np.concatenate(hashes) if hashes else np.zeros(0, dtype=np.int64)
+        groups = np.concatenate(groups) if groups else np.zeros(0, dtype=np.int64)
+        signatures = (
+            np.memmap(signatures_path, dtype=np.uint32, mode="r").reshape(-1, NUM_PERM)
+            if len(hashes)
+            else np.zeros((0, NUM_PERM), dtype=np.uint32)
+        )
+
+        print("[i] Finding duplicates")
+        with profiling.span("dedup/match", rows=len(hashes)):
+            exact, near = duplicate_rows(hashes, signatures, threshold, groups)
+        del signatures
+
+    keep = ~(exact | near)
+
+    # Start from an empty directory so shards of a previous run never mix in
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    os.makedirs(path)
+
+    with profiling.span("dedup/write", rows=int(keep.sum())):
+        start, shards = 0, 0
+        for chunk in pd.read_csv(csv_path, chunksize=read_chunk_size):
+            kept = chunk[keep[start : start + len(chunk)]]
+            start += len(chunk)
+            if len(kept) or (shards == 0 and start == len(keep)):
+                write_dataset(kept, os.path.join(path, f"part-{shards:05d}.parquet"))
+                shards += 1
+
+    counts = {
+        "read": len(keep),
+        "exact": int(exact.sum()),
+        "near": int(near.sum()),
+        "kept": int(keep.sum()),
+    }
+    removed = counts["exact"] + counts["near"]
+    print(
+        f"[i] Removed {removed} of {counts['read']} emails "
+        f"({removed / max(counts['read'], 1):.1%}): {counts['exact']} exact and "
+        f"{counts['near']} near duplicates, {counts['kept']} kept in {path}"
+    )
+    return counts
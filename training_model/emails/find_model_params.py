@@ -1,87 +1,109 @@
 import json
-import time
+from typing import TYPE_CHECKING
 
-import gensim.downloader
-import keras
-import numpy as np
 import pandas as pd
-from ax.core.types import TEvaluationOutcome
-from ax.service.ax_client import AxClient, ObjectiveProperties
-from gensim.models import KeyedVectors
-from keras.api.callbacks import History
-from keras.api.preprocessing.sequence import pad_sequences
-from sklearn.model_selection import train_test_split
 from tqdm import tqdm
 
+from utils.dataset_cache import cache_features, split_rows
+from utils.embeddings import DEFAULT_EMBEDDINGS, load_embeddings
+from utils.experiments import open_experiment
+from utils.search import DEFAULT_MAX_TRIALS, MedianPruner, TrialData, run_search
 from utils.utils import get_keras_model
 
+if TYPE_CHECKING:
+    from ax.core.types import TEvaluationOutcome
+
 tqdm.pandas()
 
 MAX_TEXT_LENGTH = 800
 
+DATA_SIZE = 500_000
+
+MODEL_INFO_PATH = "./models/emails_modelInfo.json"
+
 
-def find_email_params(data: pd.DataFrame, output: bool = True):
-    data = data.iloc[:500_000]
-    X = data["content"]
-    Y = data["sentiment"]
+def keras_cv_score(
+    parameterization, trial_data: TrialData, pruner: MedianPruner | None = None
+) -> "TEvaluationOutcome":
+    """
+    Trains one trial and returns its validation MAE and how long its training
+    on the full data took. Raises TrialPruned when pruned. Runs in a worker
+    process when trials run in parallel.
+    """
+    import keras
 
-    print("[i] Splitting test and train")
-    X_train, X_test, Y_train, Y_test = train_test_split(X, Y, test_size=0.05)
+    from utils.pruning import fit_with_pruning
+
+    bucketed = trial_data.bucketed
+
+    keras.backend.clear_session()
+    model = get_keras_model(
+        trial_data.embedding_model.vectors,  # pyright: ignore
+        parameterization.get("lstm_units"),
+        parameterization.get("neurons_dense"),
+        parameterization.get("dropout_rate"),
+        None if bucketed else trial_data.max_text_len,
+    )
 
+    learning_rate = parameterization.get("learning_rate")
+    optimizer = keras.optimizers.Adam(learning_rate=learning_rate)
+
+    NUM_EPOCHS = parameterization.get("num_epochs")
+
+    # Specify the training configuration.
+    model.compile(
+        optimizer=optimizer,  # pyright: ignore
+        loss="mse",
+        metrics=["mae"],
+    )
+
+    # fit the model, starting on a fraction of the data so bad trials are
+    # pruned cheaply. Bucketed batches are only padded to their bucket's length.
+    last_score, runtime = fit_with_pruning(
+        model,
+        trial_data.training_data,
+        parameterization.get("batch_size"),
+        NUM_EPOCHS,
+        "val_mae",
+        pruner,
+        bucketed,
+    )
+
+    # Only the full run is timed, loading data and building the model cost the
+    # same for every configuration
+    return {
+        "keras_cv": (last_score, 0),
+        "runtime": (runtime, 0),
+    }  # pyright: ignore
+
+
+def find_email_params(
+    data: pd.DataFrame,
+    output: bool = True,
+    bucketed: bool = False,
+    workers: int = 1,
+    max_trials: int = DEFAULT_MAX_TRIALS,
+    time_budget: float | None = None,
+    prune: bool = True,
+    resume: bool = False,
+    warm_start: bool = False,
+):
     print("[i] Loading embedding model")
-    embedding_model: KeyedVectors = gensim.downloader.load(
-        "glove-wiki-gigaword-100"
-    )  # pyright: ignore
-
-    def embed(txt: str):
-        return [
-            embedding_model.key_to_index[word]  # pyright: ignore
-            for word in txt.split(" ")
-            if word in embedding_model
-        ]
-
-    print("[i] Embedding text")
-    X_train_seq = [embed(txt) for txt in tqdm(X_train, "Embedding XTRAIN")]
-    X_test_seq = [embed(txt) for txt in tqdm(X_test, "Embedding XTEST")]
-
-    # This function takes in the hyperparameters and returns a score (Cross validation).
-    def keras_cv_score(parameterization, max_text_len=800):
-
-        keras.backend.clear_session()
-        model = get_keras_model(
-            embedding_model.vectors,  # pyright: ignore
-            parameterization.get("lstm_units"),
-            parameterization.get("neurons_dense"),
-            parameterization.get("dropout_rate"),
-            max_text_len,
-        )
-
-        learning_rate = parameterization.get("learning_rate")
-        optimizer = keras.optimizers.Adam(learning_rate=learning_rate)
-
-        NUM_EPOCHS = parameterization.get("num_epochs")
-
-        # Specify the training configuration.
-        model.compile(
-            optimizer=optimizer,  # pyright: ignore
-            loss="mse",
-            metrics=["mae"],
-        )
-
-        # pad the sequences so they're the same length.
-        X_train_seq_padded = pad_sequences(X_train_seq, maxlen=max_text_len)
-        X_test_seq_padded = pad_sequences(X_test_seq, maxlen=max_text_len)
-
-        # fit the model using a 20% validation set.
-        res: History = model.fit(
-            x=X_train_seq_padded,
-            y=Y_train,
-            batch_size=parameterization.get("batch_size"),
-            epochs=NUM_EPOCHS,
-            validation_data=(X_test_seq_padded, Y_test),
-        )
-        last_score = np.array(res.history["val_mae"][-1:])
-        return last_score, 0
+    embedding_model = load_embeddings(DEFAULT_EMBEDDINGS)
+
+    # Features are cached on the whole dataset so training can reuse them, and
+    # trial workers open the cache instead of receiving a copy
+    cache_path = cache_features(
+        data["content"], data["sentiment"], embedding_model, MAX_TEXT_LENGTH
+    )
+
+    trial_data = TrialData(
+        cache_path,
+        *split_rows(len(data), limit=DATA_SIZE),
+        max_text_len=MAX_TEXT_LENGTH,
+        embeddings=DEFAULT_EMBEDDINGS,
+        bucketed=bucketed,
+    )
 
     # Define the search space.
     parameters = [
@@ -115,37 +137,32 @@ def find_email_params(data: pd.DataFrame, output: bool = True):
         },
     ]
 
-    ax_client = AxClient()
+    from ax.service.ax_client import ObjectiveProperties
 
-    # create the experiment.
-    ax_client.create_experiment(
-        name="keras_experiment",
-        parameters=parameters,
-        objectives={
+    # create the experiment, or pick up a saved one
+    ax_client, checkpoint_path, done = open_experiment(
+        "emails",
+        cache_path,
+        parameters,
+        {
             "keras_cv": ObjectiveProperties(minimize=True),
             "runtime": ObjectiveProperties(minimize=True),
         },
+        workers=workers,
+        resume=resume,
+        warm_start=warm_start,
     )
 
-    def evaluate(parameters):
-        now = time.time()
-        result: TEvaluationOutcome = {
-            "keras_cv": keras_cv_score(parameters, max_text_len=MAX_TEXT_LENGTH),
-        }  # pyright: ignore
-
-        result["runtime"] = (time.time() - now, 0)  # pyright: ignore
-
-        return result
-
-    try:
-        print("[i] RUNNING TESTS: If you want to stop. Run Ctrl-C")
-        while True:
-            parameters, trial_index = ax_client.get_next_trial()
-            ax_client.complete_trial(
-                trial_index=trial_index, raw_data=evaluate(parameters)
-            )
-    except:
-        pass
+    run_search(
+        ax_client,
+        keras_cv_score,
+        trial_data,
+        workers=workers,
+        max_trials=max(max_trials - done, 0),
+        time_budget=time_budget,
+        prune=prune,
+        checkpoint_path=checkpoint_path,
+    )
 
     # look at all the trials.
     print(ax_client.get_trials_data_frame().sort_values("trial_index"))
@@ -176,11 +193,11 @@ def find_email_params(data: pd.DataFrame, output: bool = True):
         # Save JSON with important parameters
         relevant_data = {
             "max_text_len": MAX_TEXT_LENGTH,
-            "gensin_model": "glove-wiki-gigaword-100",
+            "gensin_model": DEFAULT_EMBEDDINGS,
         }
 
         for k, v in best_parameters.items():
             relevant_data[k] = v  # pyright: ignore
 
-        with open("./models/emails_modelInfo.json", "w") as f:
+        with open(MODEL_INFO_PATH, "w") as f:
             json.dump(relevant_data, f)
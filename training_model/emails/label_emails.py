@@ -2,10 +2,27 @@ from email.message import Message
 from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
 import pandas as pd
 import email
+import re
 from tqdm import tqdm
 
+from utils import profiling
+from utils.parallel import DEFAULT_CHUNK_SIZE, map_chunks
+from utils.storage import (
+    EMAILS_LABELLED,
+    append_dataset,
+    dataset_index,
+    shard_dataset,
+    write_dataset,
+)
+
 tqdm.pandas()
 
+# Headers kept from every message, everything else is dropped while parsing
+HEADERS = ["Message-ID", "Date", "From", "To", "Subject"]
+
+# Finds the Message-ID of a raw message without parsing all of it
+MESSAGE_ID = r"^Message-ID:[ \t]*(.*?)[ \t\r]*$"
+
 
 # Parse message contents
 def get_contents(msg: Message) -> str:
@@ -27,53 +44,69 @@ def get_addresses(emails: str | None) -> frozenset[str]:
     return addresses
 
 
-def label_emails(df: pd.DataFrame, output: bool = True) -> pd.DataFrame:
-    emails = [
-        email.message_from_string(txt)
-        for txt in tqdm(df["message"], "[i] Parsing emails")
-    ]
+def parse_message(txt: str) -> tuple:
+    """
+    Pulls the kept headers and the text/plain payload out of a raw message.
+    The Message object is discarded as soon as this returns.
+    """
+    msg = email.message_from_string(txt)
+    fields = {key: msg[key] for key in HEADERS}
+    fields["From"] = get_addresses(fields["From"])
+    fields["To"] = get_addresses(fields["To"])
 
-    df.drop("message", axis=1, inplace=True)
+    return (*fields.values(), get_contents(msg))
+
+
+def _parse_chunk(chunk: list[str]) -> list[tuple]:
+    return [parse_message(txt) for txt in chunk]
+
+
+def parse_emails(
+    messages: pd.Series, workers: int | None = 1, chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> pd.DataFrame:
+    """
+    Parses raw messages in chunks, across a process pool when workers > 1
+    """
+    rows = map_chunks(
+        _parse_chunk,
+        list(messages),
+        workers=workers,
+        chunk_size=chunk_size,
+        desc="[i] Parsing emails",
+    )
+    return pd.DataFrame(rows, columns=HEADERS + ["content"], index=messages.index)
 
-    print("[i] Splitting email into dataset")
-    for key in tqdm(emails[0].keys()):
-        df[key] = [doc[key] for doc in emails]
 
-    df["content"] = [
-        get_contents(e) for e in tqdm(emails, "[i] Parsing message contents")
-    ]
+def label_emails(
+    df: pd.DataFrame,
+    output: bool = True,
+    workers: int | None = 1,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> pd.DataFrame:
+    with profiling.span("label_emails", rows=len(df)):
+        return _label_emails(df, output, workers, chunk_size)
 
-    print("[i] Parsing From and To fields")
-    df["From"] = df["From"].progress_map(get_addresses)
-    df["To"] = df["To"].progress_map(get_addresses)
+
+def _label_emails(
+    df: pd.DataFrame, output: bool, workers: int | None, chunk_size: int
+) -> pd.DataFrame:
+    with profiling.span("label_emails/parse", rows=len(df)):
+        parsed = parse_emails(df["message"], workers=workers, chunk_size=chunk_size)
+
+    print("[i] Splitting email into dataset")
+    df = df.drop(["message", "file"], axis=1, errors="ignore").join(parsed)
 
     # Set index
     df = df.set_index("Message-ID")
-    df.drop(
-        [
-            "file",
-            "Mime-Version",
-            "Content-Type",
-            "Content-Transfer-Encoding",
-            "X-Folder",
-            "X-Origin",
-            "X-FileName",
-            "X-cc",
-            "X-From",
-            "X-To",
-            "X-bcc",
-        ],
-        axis=1,
-        inplace=True,
-    )
 
     # Clean the dates
     print("[i] Parsing dates")
-    df["Date"] = pd.to_datetime(
-        df["Date"].str.extract(r"^(.*? -\d{4})", expand=False),
-        format="%a, %d %b %Y %H:%M:%S %z",
-        errors="coerce",
-    )
+    with profiling.span("label_emails/dates", rows=len(df)):
+        df["Date"] = pd.to_datetime(
+            df["Date"].str.extract(r"^(.*? -\d{4})", expand=False),
+            format="%a, %d %b %Y %H:%M:%S %z",
+            errors="coerce",
+        )
 
     df.dropna(subset=["Date", "To", "From"], inplace=True)
 
@@ -81,17 +114,47 @@ def label_emails(df: pd.DataFrame, output: bool = True) -> pd.DataFrame:
     analyzer = SentimentIntensityAnalyzer()
 
     print("[i] Labelling emails")
-    df["sentiment"] = df["content"].progress_map(
-        lambda x: analyzer.polarity_scores(x)["compound"]
-    )
+    with profiling.span("label_emails/vader", rows=len(df)):
+        df["sentiment"] = df["content"].progress_map(
+            lambda x: analyzer.polarity_scores(x)["compound"]
+        )
 
-    # Save the dataset
-    print("[i] Formatting From and To fields for CSV")
-    df["From"] = df["From"].progress_apply(lambda x: ";;".join(x))
-    df["To"] = df["To"].progress_apply(lambda x: ";;".join(x))
+    # Address sets are stored as list columns
+    df["From"] = df["From"].map(sorted)
+    df["To"] = df["To"].map(sorted)
 
     if output:
-        print("[i] Saving emails")
-        df.to_csv("./datasets/emails_labelled.csv", index=False)
+        print(f"[i] Saving emails to {EMAILS_LABELLED}")
+        write_dataset(df, EMAILS_LABELLED)
 
     return df
+
+
+def label_new_emails(
+    df: pd.DataFrame,
+    path: str = EMAILS_LABELLED,
+    workers: int | None = 1,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> pd.DataFrame:
+    """
+    Labels only the messages whose Message-ID is not in the labelled dataset
+    yet and appends them to it as a new shard. Returns the new rows.
+    """
+    known = dataset_index(path)
+    ids = df["message"].str.extract(MESSAGE_ID, flags=re.IGNORECASE | re.MULTILINE, expand=False)
+    new = df[~ids.isin(known)]
+    print(f"[i] {len(df) - len(new)} emails already labelled, {len(new)} new")
+
+    shard_dataset(path)
+    if new.empty:
+        return new
+
+    labelled = label_emails(new, output=False, workers=workers, chunk_size=chunk_size)
+    # In case parsing disagrees with the regex on some header
+    labelled = labelled[~labelled.index.isin(known)]
+
+    if len(labelled):
+        print(f"[i] Appending {len(labelled)} emails to {path}")
+        append_dataset(labelled, path)
+
+    return labelled
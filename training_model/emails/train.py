@@ -1,47 +1,49 @@
 import json
 
-import gensim.downloader
-import keras
 import pandas as pd
-from gensim.models import Word2Vec
-from keras.api.callbacks import EarlyStopping, ModelCheckpoint
-from keras.api.preprocessing.sequence import pad_sequences
-from sklearn.model_selection import train_test_split
 from tqdm import tqdm
 
+from emails.find_model_params import MODEL_INFO_PATH
+from utils.dataset_cache import cached_sequences, train_test_split_sequences
+from utils import profiling
+from utils.input_pipeline import TrainingData
 from utils.utils import get_keras_model
+from utils.vocabulary import pruned_training_embeddings
 
 tqdm.pandas()
 
+LIMIT = 1_000_000
 
-def train_email_model(data: pd.DataFrame):
-    data = data.iloc[:1_000_000]
-    with open("./models/emails_modelInfo.json", "r") as f:
+MODEL_PATH = "./models/emails_sentiment.keras"
+EXPORT_PATH = "../data_pipeline/models/emails"
+
+
+def train_email_model(
+    data: pd.DataFrame, bucketed: bool = False, vocab_size: int | None = None
+):
+    import keras
+    from keras.api.callbacks import EarlyStopping, ModelCheckpoint
+
+    with open(MODEL_INFO_PATH, "r") as f:
         relevant_data = json.load(f)
 
     print(f"[i] Using parameters: {relevant_data}")
 
     print("[i] Loading embedding model")
-    embedding_model: Word2Vec = gensim.downloader.load(
-        "glove-wiki-gigaword-100"
-    )  # pyright: ignore
-
-    def embed(txt: str):
-        return [
-            embedding_model.key_to_index[word]  # pyright: ignore
-            for word in txt.split(" ")
-            if word in embedding_model  # pyright: ignore
-        ]
+    embedding_model = pruned_training_embeddings(
+        "emails", data["content"], relevant_data, vocab_size
+    )
 
     print("[i] Loading dataset")
+    max_text_len = relevant_data["max_text_len"]
+    sequences, labels = cached_sequences(
+        data["content"], data["sentiment"], embedding_model, max_text_len
+    )
 
-    X = data["content"]
-    Y = data["sentiment"]
-
-    X_train, X_test, Y_train, Y_test = train_test_split(X, Y, test_size=0.05)
-
-    X_train_seq = [embed(txt) for txt in tqdm(X_train, "Embedding XTRAIN")]
-    X_test_seq = [embed(txt) for txt in tqdm(X_test, "Embedding XTEST")]
+    train, test, Y_train, Y_test = train_test_split_sequences(
+        sequences, labels, limit=LIMIT
+    )
+    training_data = TrainingData(train, Y_train, test, Y_test, max_text_len=max_text_len)
 
     model_checkpoint_callback = ModelCheckpoint(
         filepath=f"./models/emails_model.keras",
@@ -52,15 +54,13 @@ def train_email_model(data: pd.DataFrame):
     )
     callbacks = [EarlyStopping(patience=3), model_checkpoint_callback]
 
-    max_text_len = relevant_data["max_text_len"]
-
     keras.backend.clear_session()
     model = get_keras_model(
         embedding_model.vectors,  # pyright: ignore
         relevant_data["lstm_units"],
         relevant_data["neurons_dense"],
         relevant_data["dropout_rate"],
-        max_text_len,
+        None if bucketed else max_text_len,
     )
 
     model.summary()
@@ -77,20 +77,21 @@ def train_email_model(data: pd.DataFrame):
         metrics=["mae"],
     )
 
-    # pad the sequences so they're the same length.
-    X_train_seq_padded = pad_sequences(X_train_seq, maxlen=max_text_len)
-    X_test_seq_padded = pad_sequences(X_test_seq, maxlen=max_text_len)
-
     # fit the model using a 20% validation set.
-    model.fit(
-        x=X_train_seq_padded,
-        y=Y_train,
-        batch_size=relevant_data["batch_size"],
-        epochs=NUM_EPOCHS,
-        validation_data=(X_test_seq_padded, Y_test),
-        callbacks=callbacks,
-    )
+    with profiling.span("fit") as span:
+        history = model.fit(
+            **training_data.fit_inputs(relevant_data["batch_size"], bucketed),
+            epochs=NUM_EPOCHS,
+            callbacks=callbacks,
+        )
+        span.rows = len(training_data.train) * len(history.history["loss"])
 
     # Save model to disk
-    model.save("./models/emails_sentiment.keras")
-    model.export("../data_pipeline/models/emails")
+    model.save(MODEL_PATH)
+
+    # The data pipeline looks words up in the full GloVe vocabulary, a pruned
+    # model there would read every token id wrong
+    if vocab_size is None:
+        model.export(EXPORT_PATH)
+    else:
+        print(f"[i] Pruned vocabulary, not exporting to {EXPORT_PATH}")
@@ -0,0 +1,201 @@
+"""
+Non interactive evaluation of a trained model on a cleaned dataset.
+
+The dataset is streamed in chunks and scored in large batches. Metrics are
+accumulated as it goes, so any number of rows can be evaluated. Results are
+written to <output-dir>/metrics.json, with the normalised confusion matrix in
+<output-dir>/confusion_matrix.png.
+
+    python evaluate.py emails --rows 100000 --batch-size 2048
+"""
+
+import argparse
+import glob
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.inference import (
+    MODEL_FORMATS,
+    MODEL_NAMES,
+    PREDICT_BATCH_SIZE,
+    SentimentModel,
+)
+from utils.metrics import CLASS_NAMES, StreamingMetrics
+from utils.storage import EMAILS_CLEANED, REVIEWS_CLEANED, iter_dataset
+
+# Cleaned dataset and text column evaluated for each model by default
+DATASETS = {
+    "emails": (EMAILS_CLEANED, "content"),
+    "review": (REVIEWS_CLEANED, "review"),
+}
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Evaluate a trained sentiment model")
+    parser.add_argument("model_name", choices=MODEL_NAMES)
+    parser.add_argument(
+        "--format",
+        choices=list(MODEL_FORMATS),
+        default="keras",
+        help="Saved model to load (default: keras)",
+    )
+    parser.add_argument(
+        "--input",
+        help="Cleaned Parquet or CSV file, or directory of shards (default: the model's dataset)",
+    )
+    parser.add_argument("--rows", type=int, help="Stop after this many rows")
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=50_000,
+        help="Rows read from disk at a time (default: 50000)",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=PREDICT_BATCH_SIZE,
+        help=f"Rows per model call (default: {PREDICT_BATCH_SIZE})",
+    )
+    parser.add_argument(
+        "--output-dir", help="Where results are written (default: ./evaluation/<model>)"
+    )
+    return parser.parse_args()
+
+
+def read_chunks(path: str, text_column: str, chunk_size: int, rows: int | None):
+    """
+    Yields (texts, labels) chunks from a Parquet or CSV file, or a directory of
+    shards. Only the text and sentiment columns are read.
+    """
+    columns = [text_column, "sentiment"]
+    if os.path.isdir(path):
+        csv_files = sorted(glob.glob(os.path.join(path, "*.csv")))
+    else:
+        csv_files = [path] if path.endswith(".csv") else []
+
+    # CSV datasets from before the move to Parquet still work
+    if csv_files:
+        chunks = (
+            chunk
+            for file in csv_files
+            for chunk in pd.read_csv(file, usecols=columns, chunksize=chunk_size)
+        )
+    else:
+        chunks = iter_dataset(path, columns, chunk_size)
+
+    remaining = rows
+    for chunk in chunks:
+        chunk = chunk.dropna(subset=columns)
+        if remaining is not None:
+            chunk = chunk.iloc[:remaining]
+            remaining -= len(chunk)
+
+        yield chunk[text_column].tolist(), chunk["sentiment"].to_numpy(dtype=np.float64)
+
+        if remaining is not None and remaining <= 0:
+            return
+
+
+def plot_confusion_matrix(confusion: np.ndarray, path: str):
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    # Normalize it row-wise
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cm_normalized = np.nan_to_num(
+            confusion.astype("float") / confusion.sum(axis=1)[:, np.newaxis]
+        )
+
+    plt.figure(figsize=(6, 5))
+    sns.heatmap(
+        cm_normalized,
+        annot=True,
+        fmt=".2f",
+        xticklabels=CLASS_NAMES,
+        yticklabels=CLASS_NAMES,
+        cmap="Blues",
+    )
+    plt.xlabel("Predicted")
+    plt.ylabel("True")
+    plt.title("Normalised Confusion Matrix")
+    plt.savefig(path, bbox_inches="tight")
+    plt.close()
+
+
+def evaluate(
+    model: SentimentModel,
+    path: str,
+    text_column: str,
+    chunk_size: int,
+    batch_size: int,
+    rows: int | None = None,
+) -> dict:
+    metrics = StreamingMetrics()
+    predict_time = 0.0
+    start = time.perf_counter()
+
+    for texts, labels in read_chunks(path, text_column, chunk_size, rows):
+        # The dataset is already cleaned, so skip straight to featurizing
+        predict_start = time.perf_counter()
+        scores = model.predict(model.featurize(texts), batch_size=batch_size)
+        predict_time += time.perf_counter() - predict_start
+
+        metrics.update(labels, scores)
+        print(f"[i] Evaluated {metrics.n} rows")
+
+    elapsed = time.perf_counter() - start
+    result = metrics.result()
+    result["throughput"] = {
+        "seconds": elapsed,
+        "samples_per_s": metrics.n / elapsed if elapsed else 0,
+        "model_samples_per_s": metrics.n / predict_time if predict_time else 0,
+    }
+    return result
+
+
+def main():
+    args = parse_args()
+    path, text_column = DATASETS[args.model_name]
+    path = args.input or path
+    suffix = "" if args.format == "keras" else f"-{args.format}"
+    output_dir = args.output_dir or f"./evaluation/{args.model_name}{suffix}"
+
+    model = SentimentModel(args.model_name, cache_size=0, model_format=args.format)
+    result = evaluate(
+        model, path, text_column, args.chunk_size, args.batch_size, args.rows
+    )
+
+    result["format"] = args.format
+
+    os.makedirs(output_dir, exist_ok=True)
+    metrics_path = os.path.join(output_dir, "metrics.json")
+    with open(metrics_path, "w") as f:
+        json.dump(result, f, indent=2)
+
+    plot_path = os.path.join(output_dir, "confusion_matrix.png")
+    plot_confusion_matrix(np.array(result["confusion_matrix"]), plot_path)
+
+    for metric_name in ["MSE", "MAE", "MAPE", "R2"]:
+        print(f"{metric_name}: {result[metric_name]:.4f}")
+    report = result["classification_report"]
+    for name in CLASS_NAMES:
+        scores = report[name]
+        print(
+            f"{name:>10}: precision {scores['precision']:.3f}"
+            f" recall {scores['recall']:.3f} f1 {scores['f1-score']:.3f}"
+            f" support {scores['support']}"
+        )
+    print(f"Accuracy: {report['accuracy']:.3f}")
+    print(f"Samples/s: {result['throughput']['samples_per_s']:.1f}")
+    print(f"[i] Metrics saved to {metrics_path}, plot saved to {plot_path}")
+
+
+if __name__ == "__main__":
+    main()
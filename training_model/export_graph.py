@@ -0,0 +1,54 @@
+"""
+Exports the sentiment graph of the labelled emails as neo4j-admin import
+files, see utils.graph. Run the label stage of main.py first. Edge sentiment
+is the mean VADER label scaled to [0, 1].
+
+    python export_graph.py enron
+"""
+
+import argparse
+import os
+
+from utils.graph import GRAPH_DIR, import_command, sentiment_edges, write_neo4j_import
+from utils.storage import EMAILS_LABELLED, read_dataset
+
+
+def export_graph(
+    project: str,
+    output_dir: str | None = None,
+    directed: bool = False,
+    limit: int | None = None,
+) -> list[str]:
+    """
+    Writes the import files of the labelled emails under output_dir
+    (GRAPH_DIR/<project> by default). Returns their paths.
+    """
+    output_dir = output_dir or os.path.join(GRAPH_DIR, project)
+
+    print(f"[i] Reading {EMAILS_LABELLED}")
+    df = read_dataset(EMAILS_LABELLED, columns=["From", "To", "sentiment"], limit=limit)
+
+    print("[i] Aggregating sentiment per address pair")
+    table, edges = sentiment_edges(df, directed=directed)
+    print(f"[i] {len(df)} emails, {len(table)} addresses, {len(edges)} edges")
+
+    paths = write_neo4j_import(table, edges, project, output_dir)
+    print(f"[i] Import files written to {output_dir}, load them with:")
+    print(f"    {import_command(paths)}")
+
+    return paths
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the email sentiment graph for Neo4j")
+    parser.add_argument("project", help="Dataset name of the project node")
+    parser.add_argument("-o", "--output", help=f"Output directory (default: {GRAPH_DIR}/<project>)")
+    parser.add_argument(
+        "--directed",
+        action="store_true",
+        help="Keep a -> b and b -> a apart instead of merging them into one edge",
+    )
+    parser.add_argument("--limit", type=int, help="Only export the first emails")
+    args = parser.parse_args()
+
+    export_graph(args.project, args.output, args.directed, args.limit)
@@ -0,0 +1,51 @@
+"""
+Exports a trained model to TFLite, as is and with int8 weights, for fast CPU
+inference. run_model.py, serve.py and evaluate.py load them with
+--format tflite or --format tflite-int8.
+
+    python export_model.py emails
+"""
+
+import argparse
+import json
+
+from utils.inference import MODEL_FORMATS, MODEL_NAMES
+from utils.tflite import EXPORT_BATCH_SIZE, export_tflite
+
+
+def export_model(model_name: str, batch_size: int = EXPORT_BATCH_SIZE) -> list[str]:
+    """
+    Writes the TFLite variants of a trained Keras model. Returns their paths.
+    """
+    import keras
+
+    with open(f"models/{model_name}_modelInfo.json", "r") as f:
+        max_text_len: int = json.load(f)["max_text_len"]
+
+    print("[i] Loading model...")
+    model = keras.models.load_model(MODEL_FORMATS["keras"].format(model_name))
+
+    paths = []
+    for model_format, quantize in [("tflite", False), ("tflite-int8", True)]:
+        path = MODEL_FORMATS[model_format].format(model_name)
+        print(f"[i] Exporting {model_format} to {path}")
+
+        size = export_tflite(model, max_text_len, path, batch_size, quantize)
+        print(f"[i] {path}: {size / 2**20:.1f} MiB")
+        paths.append(path)
+
+    return paths
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export a model to TFLite")
+    parser.add_argument("model_name", choices=MODEL_NAMES)
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=EXPORT_BATCH_SIZE,
+        help=f"Rows per call of the exported graph (default: {EXPORT_BATCH_SIZE})",
+    )
+    args = parser.parse_args()
+
+    export_model(args.model_name, args.batch_size)
@@ -1,73 +1,404 @@
-import sys
-import pandas as pd
+import argparse
+import os
 
-from emails.clean_emails import clean_emails
-from emails.find_model_params import find_email_params
-from emails.label_emails import label_emails
-from emails.train import train_email_model
-from reviews.clean_dataset import clean_reviews
-from reviews.find_model_params import find_review_params
-from reviews.train import train_reviews
+from utils import profiling
+from utils.dedup import DEFAULT_THRESHOLD
+from utils.parallel import DEFAULT_CHUNK_SIZE
+from utils.search import DEFAULT_MAX_TRIALS
+from utils.stages import Stage, run_stages
 
+# Pipeline modules are imported by the stage builders, so -h and argument
+# errors never wait for pandas, keras or Ax to load
 
-def print_usage():
-    print(f"Usage: {sys.argv[0]} <dataset>")
-    print("Datasets:")
-    print("- emails")
-    print("- reviews")
+EMAILS_CSV = "datasets/emails.csv"
 
+# Code every search and training stage depends on, by module name
+MODEL_CODE = [
+    "utils.dataset_cache",
+    "utils.embeddings",
+    "utils.featurizer",
+    "utils.input_pipeline",
+    "utils.utils",
+]
+SEARCH_CODE = MODEL_CODE + ["utils.experiments", "utils.pruning", "utils.search"]
+TRAIN_CODE = MODEL_CODE + ["utils.vocabulary"]
 
-if len(sys.argv) < 2 or "-h" in sys.argv:
-    print_usage()
-    exit(1)
 
-if sys.argv[1] not in ["emails", "reviews"]:
-    print("[-] Error: Dataset does not exist. Please choose a valid dataset")
-    print_usage()
-    exit(1)
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Train a sentiment model")
+    parser.add_argument("dataset", choices=["emails", "reviews"])
+    parser.add_argument(
+        "--from",
+        dest="start",
+        help="First stage to run: dedup, label (both emails only), clean, search, train or export",
+    )
+    parser.add_argument("--to", dest="stop", help="Last stage to run")
+    parser.add_argument(
+        "--force",
+        nargs="*",
+        metavar="STAGE",
+        help="Rerun these stages even if their outputs are up to date (all if none given)",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=1,
+        help="Processes used to parse and clean text, 0 uses every core (default: 1)",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=DEFAULT_CHUNK_SIZE,
+        help=f"Rows sent to each worker at a time (default: {DEFAULT_CHUNK_SIZE})",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Clean the compressed reviews chunk by chunk into shards (reviews only)",
+    )
+    parser.add_argument(
+        "--stream-chunk-size",
+        type=int,
+        help="Reviews read per chunk when streaming (default: 200000)",
+    )
+    parser.add_argument(
+        "--no-dedup",
+        dest="dedup",
+        action="store_false",
+        help="Label every email instead of dropping exact and near duplicates first",
+    )
+    parser.add_argument(
+        "--dedup-threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help=f"Estimated Jaccard similarity from which emails are near duplicates "
+        f"(default: {DEFAULT_THRESHOLD})",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Label and clean only emails not seen before, appending them as new shards "
+        "(emails only). Forced stages still rebuild their dataset",
+    )
+    parser.add_argument(
+        "--bucketing",
+        dest="bucketed",
+        action="store_true",
+        help="Pad training batches by length instead of to max_text_len. Faster, but "
+        "the data pipeline and exported graphs still pad every text to max_text_len",
+    )
+    parser.add_argument(
+        "--vocab-size",
+        type=int,
+        help="Train on the most frequent words of the corpus only, plus one bucket for the rest",
+    )
+    parser.add_argument(
+        "--search-workers",
+        type=int,
+        default=1,
+        help="Hyperparameter trials trained at the same time (default: 1)",
+    )
+    parser.add_argument(
+        "--max-trials",
+        type=int,
+        default=DEFAULT_MAX_TRIALS,
+        help=f"Hyperparameter trials to run (default: {DEFAULT_MAX_TRIALS})",
+    )
+    parser.add_argument(
+        "--time-budget",
+        type=float,
+        help="Stop starting hyperparameter trials after this many seconds",
+    )
+    parser.add_argument(
+        "--no-pruning",
+        dest="prune",
+        action="store_false",
+        help="Train every hyperparameter trial fully instead of stopping bad ones early",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue the saved hyperparameter search for this dataset",
+    )
+    parser.add_argument(
+        "--warm-start",
+        action="store_true",
+        help="Seed a new hyperparameter search with earlier searches on this dataset",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help=f"Time every step and write a JSON report to {profiling.PROFILES_DIR}",
+    )
+    parser.add_argument(
+        "--trace",
+        action="store_true",
+        help="Also write a Chrome trace of the run, implies --profile",
+    )
+    return parser.parse_args()
+
+
+def search_kwargs(args: argparse.Namespace) -> dict:
+    return {
+        "bucketed": args.bucketed,
+        "workers": args.search_workers,
+        "max_trials": args.max_trials,
+        "time_budget": args.time_budget,
+        "prune": args.prune,
+        "resume": args.resume,
+        "warm_start": args.warm_start,
+    }
+
+
+def search_params(args: argparse.Namespace) -> dict:
+    """
+    Search settings that change its result. Worker counts do not, and resuming
+    or warm starting forces the stage instead.
+    """
+    kwargs = search_kwargs(args)
+    return {k: kwargs[k] for k in ["bucketed", "max_trials", "time_budget", "prune"]}
+
+
+def forced_stages(args: argparse.Namespace) -> list[str] | None:
+    force = args.force
+    if (args.resume or args.warm_start) and force != []:
+        force = (force or []) + ["search"]
+
+    return force
 
 
-def exec_emails():
-    # Read csv
-    df = pd.read_csv("datasets/emails.csv")
+def is_forced(args: argparse.Namespace, stage: str) -> bool:
+    force = forced_stages(args)
+    return force == [] or stage in (force or [])
 
-    # Label dataset
-    df = label_emails(df)
 
-    # Clean text
-    df = clean_emails(df)
+def train_stage(
+    args: argparse.Namespace, model_name: str, train, inputs: list[str], module
+) -> Stage:
+    from utils.vocabulary import VOCAB_PATH
 
-    # Find best model parameters
-    df: pd.DataFrame = df[["content", "sentiment"]].dropna()  # pyright: ignore
-    find_email_params(df)
+    # Pruned vocabulary models are not exported to the data pipeline
+    outputs = [module.MODEL_PATH]
+    if args.vocab_size is None:
+        outputs.append(module.EXPORT_PATH)
+    else:
+        outputs.append(VOCAB_PATH.format(model_name))
+
+    return Stage(
+        "train",
+        train,
+        inputs=inputs,
+        outputs=outputs,
+        code=TRAIN_CODE + [module],
+        params={"bucketed": args.bucketed, "vocab_size": args.vocab_size},
+    )
 
-    # Train the model
-    train_email_model(df)
 
+def export_stage(model_name: str, model_path: str) -> Stage:
+    import export_model
+    from utils import tflite
+    from utils.inference import MODEL_FORMATS
 
-def exec_reviews():
-    # Read the file
-    print("[i] Reading dataset...")
-    df = pd.read_csv(
-        "datasets/train.ft.txt.bz2",
-        sep="\t",
-        header=None,
-        names=["text"],
-        compression="bz2",
+    def export():
+        export_model.export_model(model_name)
+
+    return Stage(
+        "export",
+        export,
+        inputs=[model_path, f"models/{model_name}_modelInfo.json"],
+        outputs=[
+            MODEL_FORMATS[model_format].format(model_name)
+            for model_format in ["tflite", "tflite-int8"]
+        ],
+        code=[export_model, tflite],
     )
 
-    # Clean reviews
-    df = clean_reviews(df)
 
-    # Find best model params
-    find_review_params(df)
+def email_stages(args: argparse.Namespace) -> list[Stage]:
+    import pandas as pd
+
+    from emails import clean_emails, dedup_emails, find_model_params as email_params
+    from emails import label_emails
+    from emails import train as email_train
+    from utils import cleaning, dedup, parallel, storage
+    from utils.storage import EMAILS_CLEANED, EMAILS_DEDUPED, EMAILS_LABELLED, read_dataset
+
+    raw_emails = EMAILS_DEDUPED if args.dedup else EMAILS_CSV
+
+    def deduplicate():
+        dedup_emails.dedup_emails(
+            EMAILS_CSV,
+            threshold=args.dedup_threshold,
+            workers=args.workers,
+            chunk_size=args.chunk_size,
+        )
+
+    def label():
+        df = read_dataset(EMAILS_DEDUPED) if args.dedup else pd.read_csv(EMAILS_CSV)
+        if args.incremental and not is_forced(args, "label"):
+            label_emails.label_new_emails(
+                df, workers=args.workers, chunk_size=args.chunk_size
+            )
+        else:
+            label_emails.label_emails(df, workers=args.workers, chunk_size=args.chunk_size)
+
+    def clean():
+        if args.incremental and not is_forced(args, "clean"):
+            clean_emails.clean_new_emails(workers=args.workers, chunk_size=args.chunk_size)
+            return
+
+        df = read_dataset(EMAILS_LABELLED)
+        clean_emails.clean_emails(df, workers=args.workers, chunk_size=args.chunk_size)
+
+    def training_data() -> pd.DataFrame:
+        columns = ["content", "sentiment"]
+        return read_dataset(EMAILS_CLEANED, columns=columns).dropna()
+
+    def find_params():
+        email_params.find_email_params(training_data(), **search_kwargs(args))
+
+    def train():
+        email_train.train_email_model(
+            training_data(), bucketed=args.bucketed, vocab_size=args.vocab_size
+        )
+
+    stages = [
+        Stage(
+            "label",
+            label,
+            inputs=[raw_emails],
+            outputs=[EMAILS_LABELLED],
+            code=[label_emails, parallel, storage],
+        ),
+        Stage(
+            "clean",
+            clean,
+            inputs=[EMAILS_LABELLED],
+            outputs=[EMAILS_CLEANED],
+            code=[clean_emails, cleaning, parallel, storage],
+        ),
+        Stage(
+            "search",
+            find_params,
+            inputs=[EMAILS_CLEANED],
+            outputs=[email_params.MODEL_INFO_PATH],
+            code=SEARCH_CODE + [email_params],
+            params=search_params(args),
+        ),
+        train_stage(
+            args, "emails", train, [EMAILS_CLEANED, email_params.MODEL_INFO_PATH], email_train
+        ),
+        export_stage("emails", email_train.MODEL_PATH),
+    ]
+
+    if args.dedup:
+        stages.insert(
+            0,
+            Stage(
+                "dedup",
+                deduplicate,
+                inputs=[EMAILS_CSV],
+                outputs=[EMAILS_DEDUPED],
+                code=[dedup_emails, dedup, parallel, storage],
+                params={"threshold": args.dedup_threshold},
+            ),
+        )
+
+    return stages
+
+
+def review_stages(args: argparse.Namespace) -> list[Stage]:
+    import pandas as pd
+
+    from reviews import clean_dataset, find_model_params as review_params
+    from reviews import train as review_train
+    from reviews.clean_dataset import REVIEW_FILES, STREAM_CHUNK_SIZE
+    from utils import cleaning, parallel, storage
+    from utils.storage import REVIEWS_CLEANED, read_dataset
+
+    stream_chunk_size = args.stream_chunk_size or STREAM_CHUNK_SIZE
+
+    if args.stream:
+        # Clean every split without holding the corpus in memory, then only
+        # load back as many rows as training uses
+        splits = ["train"] + [
+            split
+            for split, (path, _) in REVIEW_FILES.items()
+            if split != "train" and os.path.exists(path)
+        ]
+        raw_files = [REVIEW_FILES[split][0] for split in splits]
+        cleaned = [REVIEW_FILES[split][1] for split in splits]
+    else:
+        raw_files = [REVIEW_FILES["train"][0]]
+        cleaned = [REVIEWS_CLEANED]
+
+    def clean():
+        if args.stream:
+            for split in splits:
+                clean_dataset.stream_clean_reviews(
+                    split,
+                    stream_chunk_size=stream_chunk_size,
+                    workers=args.workers,
+                    chunk_size=args.chunk_size,
+                )
+        else:
+            # Read the file
+            print("[i] Reading dataset...")
+            df = clean_dataset.read_reviews(REVIEW_FILES["train"][0])
+            clean_dataset.clean_reviews(
+                df, workers=args.workers, chunk_size=args.chunk_size
+            )
+
+    def training_data() -> pd.DataFrame:
+        return read_dataset(
+            cleaned[0], columns=["review", "sentiment"], limit=review_train.LIMIT
+        )
+
+    def find_params():
+        review_params.find_review_params(training_data(), **search_kwargs(args))
+
+    def train():
+        review_train.train_reviews(
+            training_data(), bucketed=args.bucketed, vocab_size=args.vocab_size
+        )
+
+    return [
+        Stage(
+            "clean",
+            clean,
+            inputs=raw_files,
+            outputs=cleaned,
+            code=[clean_dataset, cleaning, parallel, storage],
+            params={"stream": args.stream, "stream_chunk_size": stream_chunk_size},
+        ),
+        Stage(
+            "search",
+            find_params,
+            inputs=[cleaned[0]],
+            outputs=[review_params.MODEL_INFO_PATH],
+            code=SEARCH_CODE + [review_params],
+            params=search_params(args),
+        ),
+        train_stage(
+            args, "review", train, [cleaned[0], review_params.MODEL_INFO_PATH], review_train
+        ),
+        export_stage("review", review_train.MODEL_PATH),
+    ]
+
 
-    # Train the model
-    train_reviews(df)
+if __name__ == "__main__":
+    args = parse_args()
+    if args.profile or args.trace:
+        profiling.enable()
 
+    match args.dataset:
+        case "emails":
+            stages = email_stages(args)
+        case _:
+            stages = review_stages(args)
 
-match sys.argv[1]:
-    case "emails":
-        exec_emails()
-    case "reviews":
-        exec_reviews()
+    try:
+        run_stages(args.dataset, stages, args.start, args.stop, forced_stages(args))
+    finally:
+        profiling.write_report(args.dataset, trace=args.trace)
@@ -1,38 +1,103 @@
+import glob
+import os
+
 import pandas as pd
 from tqdm import tqdm
+from utils.cleaning import DEFAULT_CHUNK_SIZE
+from utils.storage import REVIEWS_CLEANED, read_dataset, write_dataset
 from utils.utils import clean_text
 
 tqdm.pandas()
 
-CSV_PATH = "./datasets/reviews_cleaned.csv"
+# Compressed fastText files and where their cleaned shards are streamed to
+REVIEW_FILES = {
+    "train": ("./datasets/train.ft.txt.bz2", "./datasets/reviews_cleaned"),
+    "test": ("./datasets/test.ft.txt.bz2", "./datasets/reviews_test_cleaned"),
+}
+STREAM_CHUNK_SIZE = 200_000
 
 
-def clean_reviews(df: pd.DataFrame, output: bool = True) -> pd.DataFrame:
-    # Extract labels and reviews
-    print("[i] Extracting labels...")
-    df["label"] = df["text"].progress_apply(
-        lambda x: int(x.split()[0].replace("__label__", ""))
+def read_reviews(path: str, chunksize: int | None = None):
+    """
+    Reads a fastText style file, either whole or as an iterator of chunks
+    """
+    return pd.read_csv(
+        path,
+        sep="\t",
+        header=None,
+        names=["text"],
+        compression="bz2",
+        chunksize=chunksize,
     )
 
-    print("[i] Extracting review texts...")
-    df["review"] = df["text"].progress_apply(lambda x: " ".join(x.split()[1:]))
+
+def clean_reviews(
+    df: pd.DataFrame,
+    output: bool = True,
+    workers: int | None = 1,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> pd.DataFrame:
+    # Extract labels and reviews. Each line is "__label__<n> <review>"
+    print("[i] Extracting labels and review texts...")
+    parts = df["text"].str.extract(r"^\s*__label__(\d+)\s*(.*)$")
+    df["label"] = pd.to_numeric(parts[0])
+    df["review"] = parts[1].str.replace(r"\s+", " ", regex=True).str.strip()
 
     data: pd.DataFrame = df[["review", "label"]].dropna()  # pyright: ignore
 
     # Clean review text
     print("[i] Cleaning text...")
-    data["review"] = clean_text(data["review"])  # pyright: ignore
+    data["review"] = clean_text(
+        data["review"], workers=workers, chunk_size=chunk_size
+    )  # pyright: ignore
 
     # Assign sentiment from 0 to 1
     print("[i] Translating labels...")
-    data["sentiment"] = data["label"].progress_apply(  # pyright: ignore
-        lambda x: 1 if x == 2 else 0
-    )
+    data["sentiment"] = (data["label"] == 2).astype(int)
 
     data.drop(["label"], axis=1, inplace=True)
 
     if output:
-        print(f"[i] Clean dataset saved to: {CSV_PATH}")
-        data.to_csv(CSV_PATH)
+        write_dataset(data, REVIEWS_CLEANED)
+        print(f"[i] Clean dataset saved to: {REVIEWS_CLEANED}")
 
     return data
+
+
+def stream_clean_reviews(
+    split: str = "train",
+    stream_chunk_size: int = STREAM_CHUNK_SIZE,
+    workers: int | None = 1,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> list[str]:
+    """
+    Cleans a compressed review file chunk by chunk, writing one Parquet shard
+    per chunk. Memory stays bounded by the chunk size instead of the corpus size.
+    """
+    path, output_dir = REVIEW_FILES[split]
+
+    # Start from an empty directory so shards of a previous run never mix in
+    os.makedirs(output_dir, exist_ok=True)
+    for old_shard in glob.glob(os.path.join(output_dir, "part-*")):
+        os.remove(old_shard)
+
+    shards = []
+    for i, chunk in enumerate(read_reviews(path, chunksize=stream_chunk_size)):
+        print(f"[i] Cleaning {split} chunk {i} ({len(chunk)} rows)")
+        data = clean_reviews(chunk, output=False, workers=workers, chunk_size=chunk_size)
+
+        shard = os.path.join(output_dir, f"part-{i:05d}.parquet")
+        write_dataset(data, shard)
+        shards.append(shard)
+
+    print(f"[i] {len(shards)} shards saved to: {output_dir}")
+    return shards
+
+
+def read_review_shards(split: str = "train", limit: int | None = None) -> pd.DataFrame:
+    """
+    Loads the text and sentiment of cleaned shards in order, stopping once
+    limit rows have been read
+    """
+    _, output_dir = REVIEW_FILES[split]
+    return read_dataset(output_dir, columns=["review", "sentiment"], limit=limit)
@@ -1,88 +1,97 @@
 import json
-from ax.core.types import TEvaluationOutcome
-from gensim.models import Word2Vec
+from typing import TYPE_CHECKING
 import pandas as pd
-import numpy as np
-from sklearn.model_selection import train_test_split
 from tqdm import tqdm
-import gensim.downloader
-import keras
-from keras.api.preprocessing.sequence import pad_sequences
-from keras.api.callbacks import History
 
+from utils.dataset_cache import cache_features, split_rows
+from utils.embeddings import DEFAULT_EMBEDDINGS, load_embeddings
+from utils.experiments import open_experiment
+from utils.search import DEFAULT_MAX_TRIALS, MedianPruner, TrialData, run_search
 from utils.utils import get_keras_model
 
+if TYPE_CHECKING:
+    from ax.core.types import TEvaluationOutcome
+
 tqdm.pandas()
 
 DATA_SIZE = 500_000
 MAX_TEXT_LENGTH = 800
 
+MODEL_INFO_PATH = "./models/review_modelInfo.json"
+
+
+# This function takes in the hyperparameters and returns a score (Cross validation).
+def keras_cv_score(
+    parameterization, trial_data: TrialData, pruner: MedianPruner | None = None
+) -> "TEvaluationOutcome":
+    import keras
+
+    from utils.pruning import fit_with_pruning
 
-def find_review_params(data: pd.DataFrame, output: bool = True):
-    data = data.iloc[:DATA_SIZE]
+    bucketed = trial_data.bucketed
 
-    X = data["review"]
-    Y = data["sentiment"]
+    keras.backend.clear_session()
+    model = get_keras_model(
+        trial_data.embedding_model.vectors,  # pyright: ignore
+        parameterization.get("lstm_units"),
+        parameterization.get("neurons_dense"),
+        parameterization.get("dropout_rate"),
+        None if bucketed else trial_data.max_text_len,
+    )
+
+    learning_rate = parameterization.get("learning_rate")
+    optimizer = keras.optimizers.Adam(learning_rate=learning_rate)
 
-    print("[i] Splitting test and train")
-    X_train, X_test, Y_train, Y_test = train_test_split(X, Y, test_size=0.05)
+    NUM_EPOCHS = parameterization.get("num_epochs")
+
+    # Specify the training configuration.
+    model.compile(
+        optimizer=optimizer,  # pyright: ignore
+        loss=keras.losses.BinaryCrossentropy(),
+        metrics=["accuracy"],
+    )
 
+    # fit the model, starting on a fraction of the data so bad trials are
+    # pruned cheaply. Bucketed batches are only padded to their bucket's length.
+    last_score, _ = fit_with_pruning(
+        model,
+        trial_data.training_data,
+        parameterization.get("batch_size"),
+        NUM_EPOCHS,
+        "val_loss",
+        pruner,
+        bucketed,
+    )
+    return {"keras_cv": (last_score, 0)}  # pyright: ignore
+
+
+def find_review_params(
+    data: pd.DataFrame,
+    output: bool = True,
+    bucketed: bool = False,
+    workers: int = 1,
+    max_trials: int = DEFAULT_MAX_TRIALS,
+    time_budget: float | None = None,
+    prune: bool = True,
+    resume: bool = False,
+    warm_start: bool = False,
+):
     print("[i] Loading embedding model")
-    embedding_model: Word2Vec = gensim.downloader.load(
-        "glove-wiki-gigaword-100"
-    )  # pyright: ignore
-
-    def embed(txt: str):
-        return [
-            embedding_model.key_to_index[word]  # pyright: ignore
-            for word in txt.split(" ")
-            if word in embedding_model  # pyright: ignore
-        ]
-
-    print("[i] Embedding text")
-    X_train_seq = [embed(txt) for txt in tqdm(X_train, "Embedding XTRAIN")]
-    X_test_seq = [embed(txt) for txt in tqdm(X_test, "Embedding XTEST")]
-
-    # This function takes in the hyperparameters and returns a score (Cross validation).
-    def keras_cv_score(parameterization, max_text_len=800):
-
-        max_text_len = parameterization.get("max_text_len")
-
-        keras.backend.clear_session()
-        model = get_keras_model(
-            embedding_model.vectors,  # pyright: ignore
-            parameterization.get("lstm_units"),
-            parameterization.get("neurons_dense"),
-            parameterization.get("dropout_rate"),
-            max_text_len,
-        )
-
-        learning_rate = parameterization.get("learning_rate")
-        optimizer = keras.optimizers.Adam(learning_rate=learning_rate)
-
-        NUM_EPOCHS = parameterization.get("num_epochs")
-
-        # Specify the training configuration.
-        model.compile(
-            optimizer=optimizer,  # pyright: ignore
-            loss=keras.losses.BinaryCrossentropy(),
-            metrics=["accuracy"],
-        )
-
-        # pad the sequences so they're the same length.
-        X_train_seq_padded = pad_sequences(X_train_seq, maxlen=max_text_len)
-        X_test_seq_padded = pad_sequences(X_test_seq, maxlen=max_text_len)
-
-        # fit the model using a 20% validation set.
-        res: History = model.fit(
-            x=X_train_seq_padded,
-            y=Y_train,
-            batch_size=parameterization.get("batch_size"),
-            epochs=NUM_EPOCHS,
-            validation_data=(X_test_seq_padded, Y_test),
-        )
-        last_score = np.array(res.history["val_loss"][-1:])
-        return last_score, 0
+    embedding_model = load_embeddings(DEFAULT_EMBEDDINGS)
+
+    # Features are cached on the whole dataset so training can reuse them, and
+    # trial workers open the cache instead of receiving a copy
+    cache_path = cache_features(
+        data["review"], data["sentiment"], embedding_model, MAX_TEXT_LENGTH
+    )
+
+    trial_data = TrialData(
+        cache_path,
+        *split_rows(len(data), limit=DATA_SIZE),
+        max_text_len=MAX_TEXT_LENGTH,
+        embeddings=DEFAULT_EMBEDDINGS,
+        bucketed=bucketed,
+    )
 
     # Define the search space.
     parameters = [
@@ -120,34 +129,32 @@ def find_review_params(data: pd.DataFrame, output: bool = True):
     ]
 
     # import more packages
-    from ax.service.ax_client import AxClient, ObjectiveProperties
+    from ax.service.ax_client import ObjectiveProperties
     from ax.utils.notebook.plotting import init_notebook_plotting
 
     init_notebook_plotting()
 
-    ax_client = AxClient()
-
-    # create the experiment.
-    ax_client.create_experiment(
-        name="keras_experiment",
-        parameters=parameters,
-        objectives={"keras_cv": ObjectiveProperties(minimize=True)},
+    # create the experiment, or pick up a saved one
+    ax_client, checkpoint_path, done = open_experiment(
+        "reviews",
+        cache_path,
+        parameters,
+        {"keras_cv": ObjectiveProperties(minimize=True)},
+        workers=workers,
+        resume=resume,
+        warm_start=warm_start,
     )
 
-    def evaluate(parameters) -> TEvaluationOutcome:
-        return {
-            "keras_cv": keras_cv_score(parameters, max_text_len=MAX_TEXT_LENGTH)
-        }  # pyright: ignore
-
-    print("[i] Press CTRL+C to exit loop")
-    try:
-        while True:
-            parameters, trial_index = ax_client.get_next_trial()
-            ax_client.complete_trial(
-                trial_index=trial_index, raw_data=evaluate(parameters)
-            )
-    except:
-        pass
+    run_search(
+        ax_client,
+        keras_cv_score,
+        trial_data,
+        workers=workers,
+        max_trials=max(max_trials - done, 0),
+        time_budget=time_budget,
+        prune=prune,
+        checkpoint_path=checkpoint_path,
+    )
 
     # look at all the trials.
     ax_client.get_trials_data_frame().sort_values("trial_index")
@@ -169,11 +176,11 @@ def find_review_params(data: pd.DataFrame, output: bool = True):
         # Save JSON with important parameters
         relevant_data = {
             "max_text_len": MAX_TEXT_LENGTH,
-            "gensin_model": "glove-wiki-gigaword-100",
+            "gensin_model": DEFAULT_EMBEDDINGS,
         }
 
         for k, v in best_parameters.items():
             relevant_data[k] = v  # pyright: ignore
 
-        with open("./models/review_modelInfo.json", "w") as f:
+        with open(MODEL_INFO_PATH, "w") as f:
             json.dump(relevant_data, f)
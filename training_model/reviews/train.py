@@ -1,44 +1,45 @@
 import json
 import pandas as pd
-from sklearn.model_selection import train_test_split
 from tqdm import tqdm
+from reviews.find_model_params import MODEL_INFO_PATH
+from utils.dataset_cache import cached_sequences, train_test_split_sequences
+from utils import profiling
+from utils.input_pipeline import TrainingData
 from utils.utils import get_keras_model
-import gensim.downloader
-from gensim.models import KeyedVectors
-
-import keras
-from keras.api.preprocessing.sequence import pad_sequences
-from keras.api.callbacks import EarlyStopping, ModelCheckpoint
+from utils.vocabulary import pruned_training_embeddings
 
 tqdm.pandas()
 
 LIMIT = 1_250_000
 
-with open("./models/review_modelInfo.json", "r") as f:
-    relevant_data = json.load(f)
+MODEL_PATH = "./models/review_sentiment.keras"
+EXPORT_PATH = "../data_pipeline/models/review"
 
 
-def train_reviews(data: pd.DataFrame):
-    data = data.iloc[:LIMIT]
-    X = data["review"]
-    Y = data["sentiment"]
+def train_reviews(
+    data: pd.DataFrame, bucketed: bool = False, vocab_size: int | None = None
+):
+    import keras
+    from keras.api.callbacks import EarlyStopping, ModelCheckpoint
 
-    X_train, X_test, Y_train, Y_test = train_test_split(X, Y, test_size=0.05)
+    # Read here rather than at import, the search writes this file first
+    with open(MODEL_INFO_PATH, "r") as f:
+        relevant_data = json.load(f)
 
     print("[i] Loading embedding model")
-    embedding_model: KeyedVectors = gensim.downloader.load(
-        "glove-wiki-gigaword-100"
-    )  # pyright: ignore
+    embedding_model = pruned_training_embeddings(
+        "review", data["review"], relevant_data, vocab_size
+    )
 
-    def embed(txt: str):
-        return [
-            embedding_model.key_to_index[word]  # pyright: ignore
-            for word in txt.split(" ")
-            if word in embedding_model
-        ]
+    max_text_len = relevant_data["max_text_len"]
+    sequences, labels = cached_sequences(
+        data["review"], data["sentiment"], embedding_model, max_text_len
+    )
 
-    X_train_seq = [embed(txt) for txt in tqdm(X_train, "Embedding XTRAIN")]
-    X_test_seq = [embed(txt) for txt in tqdm(X_test, "Embedding XTEST")]
+    train, test, Y_train, Y_test = train_test_split_sequences(
+        sequences, labels, limit=LIMIT
+    )
+    training_data = TrainingData(train, Y_train, test, Y_test, max_text_len=max_text_len)
 
     model_checkpoint_callback = ModelCheckpoint(
         filepath=f"./models/review_model.keras",
@@ -49,15 +50,13 @@ def train_reviews(data: pd.DataFrame):
     )
     callbacks = [EarlyStopping(patience=3), model_checkpoint_callback]
 
-    max_text_len = relevant_data["max_text_len"]
-
     keras.backend.clear_session()
     model = get_keras_model(
         embedding_model.vectors,
         relevant_data["lstm_units"],
         relevant_data["neurons_dense"],
         relevant_data["dropout_rate"],
-        max_text_len,
+        None if bucketed else max_text_len,
     )
 
     model.summary()
@@ -74,23 +73,24 @@ def train_reviews(data: pd.DataFrame):
         metrics=["mae"],
     )
 
-    # pad the sequences so they're the same length.
-    X_train_seq_padded = pad_sequences(X_train_seq, maxlen=max_text_len)
-    X_test_seq_padded = pad_sequences(X_test_seq, maxlen=max_text_len)
-
     # fit the model using a 20% validation set.
     try:
-        model.fit(
-            x=X_train_seq_padded,
-            y=Y_train,
-            batch_size=relevant_data["batch_size"],
-            epochs=NUM_EPOCHS,
-            validation_data=(X_test_seq_padded, Y_test),
-            callbacks=callbacks,
-        )
+        with profiling.span("fit") as span:
+            history = model.fit(
+                **training_data.fit_inputs(relevant_data["batch_size"], bucketed),
+                epochs=NUM_EPOCHS,
+                callbacks=callbacks,
+            )
+            span.rows = len(training_data.train) * len(history.history["loss"])
     except:
         pass
 
     # Save model to disk
-    model.save("models/review_sentiment.keras")
-    model.export("../data_pipeline/models/review")
+    model.save(MODEL_PATH)
+
+    # The data pipeline looks words up in the full GloVe vocabulary, a pruned
+    # model there would read every token id wrong
+    if vocab_size is None:
+        model.export(EXPORT_PATH)
+    else:
+        print(f"[i] Pruned vocabulary, not exporting to {EXPORT_PATH}")
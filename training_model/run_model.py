@@ -1,53 +1,26 @@
-import json
-import pandas as pd
-from utils.utils import clean_text
-import gensim.downloader
-from tqdm import tqdm
-from gensim.models import Word2Vec
+import argparse
 
-tqdm.pandas()
+from utils.inference import MODEL_FORMATS, MODEL_NAMES, SentimentModel
 
-import keras
-from keras.api.preprocessing.sequence import pad_sequences
+parser = argparse.ArgumentParser(description="Score text typed in the terminal")
+parser.add_argument(
+    "--format",
+    choices=list(MODEL_FORMATS),
+    default="keras",
+    help="Saved model to load (default: keras)",
+)
+args = parser.parse_args()
 
 # Get model to run
-model_name = input("Model name [emails, review]: ")
+model_name = input(f"Model name [{', '.join(MODEL_NAMES)}]: ")
 
-if model_name not in ["emails", "review"]:
+if model_name not in MODEL_NAMES:
     print("[-] Invalid model name")
     exit(1)
 
-print("[i] Loading word embedding model")
-embedding_model: Word2Vec = gensim.downloader.load(
-    "glove-wiki-gigaword-100"
-)  # pyright: ignore
-
-
-def embed(txt: str):
-    return [
-        embedding_model.key_to_index[word]  # pyright: ignore
-        for word in txt.split(" ")
-        if word in embedding_model  # pyright: ignore
-    ]
-
-
-# Loading model
-print("[i] Loading model...")
-model: keras.Model = keras.models.load_model(
-    f"models/{model_name}_sentiment.keras"
-)  # pyright: ignore
-
-with open(f"models/{model_name}_modelInfo.json", "r") as f:
-    relevant_data = json.load(f)
-
-max_text_len = relevant_data["max_text_len"]
+model = SentimentModel(model_name, model_format=args.format)
 
 in_text = ""
 while in_text != "exit":
     in_text = input("INPUT: ")
-    text = pd.Series([in_text])
-
-    embbeded = [embed(txt) for txt in clean_text(text)]
-    padded = pad_sequences(embbeded, maxlen=max_text_len)
-    print(padded[0])
-    print(f"SCORE: {model.predict(padded)}")
+    print(f"SCORE: {model.score([in_text])[0]:.4f}")
@@ -0,0 +1,149 @@
+"""
+Long running scoring service. Keeps the model and vocabulary in memory and
+gathers concurrent requests into micro-batches.
+
+    python serve.py emails --port 8000 --max-batch-size 64 --max-wait-ms 5
+
+Endpoints:
+    POST /score   {"text": "..."} or {"texts": ["...", ...]}
+                  -> {"score": 0.7} or {"scores": [0.7, ...]}
+    GET  /stats   throughput and latency counters
+    GET  /health  liveness check
+"""
+
+import argparse
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from utils.batching import MicroBatcher
+from utils.inference import MODEL_FORMATS, MODEL_NAMES, SentimentModel
+from utils.prediction_cache import DEFAULT_CACHE_SIZE
+
+REQUEST_TIMEOUT = 60
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Serve a sentiment model over HTTP")
+    parser.add_argument("model_name", choices=MODEL_NAMES)
+    parser.add_argument(
+        "--format",
+        choices=list(MODEL_FORMATS),
+        default="keras",
+        help="Saved model to load (default: keras)",
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--max-batch-size",
+        type=int,
+        default=64,
+        help="Most texts scored by one model call (default: 64)",
+    )
+    parser.add_argument(
+        "--max-wait-ms",
+        type=float,
+        default=5.0,
+        help="Longest a text waits for others to batch with (default: 5)",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=DEFAULT_CACHE_SIZE,
+        help=f"Scores kept in memory, 0 disables caching (default: {DEFAULT_CACHE_SIZE})",
+    )
+    parser.add_argument(
+        "--cache-path",
+        help="SQLite file keeping cached scores across restarts",
+    )
+    return parser.parse_args()
+
+
+def make_handler(batcher: MicroBatcher, model: SentimentModel | None = None):
+    class ScoreHandler(BaseHTTPRequestHandler):
+        def send_json(self, status: int, body: dict):
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            match self.path:
+                case "/stats":
+                    stats = batcher.stats()
+                    if model is not None and model.cache is not None:
+                        stats["cache"] = model.cache.stats()
+                    self.send_json(200, stats)
+                case "/health":
+                    self.send_json(200, {"status": "ok"})
+                case _:
+                    self.send_json(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path != "/score":
+                self.send_json(404, {"error": "not found"})
+                return
+
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length))
+            except (ValueError, json.JSONDecodeError):
+                self.send_json(400, {"error": "body must be JSON"})
+                return
+
+            if not isinstance(body, dict):
+                self.send_json(400, {"error": "body must be a JSON object"})
+                return
+
+            try:
+                if isinstance(body.get("text"), str):
+                    score = batcher.submit(body["text"]).result(REQUEST_TIMEOUT)
+                    self.send_json(200, {"score": float(score)})
+                elif isinstance(body.get("texts"), list) and all(
+                    isinstance(t, str) for t in body["texts"]
+                ):
+                    futures = batcher.submit_many(body["texts"])
+                    scores = [float(f.result(REQUEST_TIMEOUT)) for f in futures]
+                    self.send_json(200, {"scores": scores})
+                else:
+                    self.send_json(400, {"error": 'expected "text" or "texts"'})
+            except Exception as e:
+                self.send_json(500, {"error": str(e)})
+
+        def log_message(self, format, *args):
+            # Per request logging would dominate at high request rates
+            pass
+
+    return ScoreHandler
+
+
+def main():
+    args = parse_args()
+    model = SentimentModel(
+        args.model_name,
+        cache_size=args.cache_size,
+        cache_path=args.cache_path,
+        model_format=args.format,
+    )
+
+    batcher = MicroBatcher(
+        model.score, max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms
+    ).start()
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(batcher, model))
+    print(f"[i] Serving {args.model_name} on http://{args.host}:{args.port}")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        batcher.close()
+        if model.cache is not None:
+            model.cache.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import threading
+import time
+
+import pytest
+
+from utils.batching import MicroBatcher
+
+
+def test_micro_batcher_groups_concurrent_requests():
+    seen_batches = []
+
+    def double(items):
+        seen_batches.append(len(items))
+        return [x * 2 for x in items]
+
+    batcher = MicroBatcher(double, max_batch_size=8, max_wait_ms=50).start()
+    futures = batcher.submit_many(range(20))
+
+    assert [f.result(timeout=5) for f in futures] == [x * 2 for x in range(20)]
+    assert max(seen_batches) == 8 and sum(seen_batches) == 20
+
+    stats = batcher.stats()
+    assert stats["requests"] == 20
+    assert stats["batches"] == len(seen_batches)
+    batcher.close()
+
+
+def test_micro_batcher_flushes_after_max_wait():
+    batcher = MicroBatcher(lambda items: items, max_batch_size=100, max_wait_ms=10)
+    batcher.start()
+
+    start = time.perf_counter()
+    assert batcher.submit("x").result(timeout=5) == "x"
+    assert time.perf_counter() - start < 1
+    batcher.close()
+
+
+def test_micro_batcher_propagates_errors():
+    def fail(items):
+        raise ValueError("bad batch")
+
+    batcher = MicroBatcher(fail, max_wait_ms=1).start()
+    future = batcher.submit(1)
+
+    with pytest.raises(ValueError):
+        future.result(timeout=5)
+    assert batcher.stats()["errors"] == 1
+    batcher.close()
+
+
+def test_micro_batcher_serves_many_threads():
+    batcher = MicroBatcher(lambda items: [x + 1 for x in items], max_wait_ms=5)
+    batcher.start()
+    results = {}
+
+    def client(i):
+        results[i] = batcher.submit(i).result(timeout=5)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(50)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results == {i: i + 1 for i in range(50)}
+    batcher.close()
+
+
+def test_micro_batcher_fails_batch_on_missing_results():
+    batcher = MicroBatcher(lambda items: items[:-1], max_batch_size=3, max_wait_ms=50)
+    batcher.start()
+    futures = batcher.submit_many([1, 2, 3])
+
+    for future in futures:
+        with pytest.raises(RuntimeError, match="2 results for 3 items"):
+            future.result(timeout=5)
+    assert batcher.stats()["errors"] == 3
+    batcher.close()
@@ -0,0 +1,140 @@
+import random
+import re
+
+import pandas as pd
+
+from benchmarks.cleaning_steps import clean_by_step
+from utils.cleaning import (
+    clean_document,
+    clean_texts,
+    convert_emoticons,
+    emoticon_meanings,
+)
+
+
+def legacy_clean(txt: str) -> str:
+    """
+    The original seven pass chain from utils.clean_text, kept as a reference
+    """
+    txt = txt.lower()
+    txt = re.sub(r"https?://\S+|www\.\S+", "", txt)
+    for emoticon, meaning in emoticon_meanings.items():
+        txt = txt.replace(emoticon, f" {meaning}")
+    txt = re.sub(r"[^a-zA-Z#]", " ", txt)
+    txt = re.sub(r"(.)\1{2,}", r"\1", txt)
+    txt = re.sub(r"\b\w{1,2}\b", " ", txt)
+    txt = re.sub(r"(?<=\w)\d+|\d+(?=\w)", "", txt)
+    txt = re.sub(r"\s+", " ", txt)
+    return txt
+
+
+FRAGMENTS = [
+    "Hello",
+    "WORLD",
+    "ok",
+    "a",
+    "I",
+    "sooooo",
+    "goooood",
+    "aa",
+    "aaa",
+    "#tag",
+    "###",
+    "##",
+    "42",
+    "abc123",
+    "123abc",
+    "http://example.com/a?b=1",
+    "https://x.y",
+    "www.example.org",
+    "\n",
+    "\t",
+    "  ",
+    "   ",
+    "-",
+    "--",
+    "!!!",
+    "café",
+    "naïve",
+    "İstanbul",
+    "über",
+    "_",
+    "__init__",
+    ":",
+    "(",
+    ")",
+    "v",
+    ",",
+    ".",
+    "'",
+    "‘",
+] + list(emoticon_meanings.keys())
+
+
+def random_text(rng: random.Random) -> str:
+    parts = rng.choices(FRAGMENTS, k=rng.randint(0, 40))
+    seps = rng.choices(["", " ", "  ", "\n"], k=len(parts))
+    return "".join(s + p for s, p in zip(seps, parts))
+
+
+def test_clean_document_matches_legacy_chain():
+    rng = random.Random(1234)
+    for _ in range(20_000):
+        txt = random_text(rng)
+        assert clean_document(txt) == legacy_clean(txt), repr(txt)
+
+
+def test_clean_document_handles_overlapping_emoticons():
+    for txt in [
+        " :v :)",
+        " (^_^)v :v ",
+        " :*( :-(( :-( :(( :|]",
+        "hey :vhttp://a.b :) there",
+        " :v :v :)",
+    ]:
+        assert clean_document(txt) == legacy_clean(txt), repr(txt)
+
+
+def test_clean_texts_keeps_series_index():
+    content = pd.Series(["Hello there :)", "www.x.com GREAT!!!"], index=[7, 3])
+    cleaned = clean_texts(content, progress=False)
+
+    assert isinstance(cleaned, pd.Series)
+    assert list(cleaned.index) == [7, 3]
+    assert list(cleaned) == [legacy_clean(txt) for txt in content]
+
+
+def test_clean_texts_accepts_lists():
+    content = ["Hello there :)", "www.x.com GREAT!!!"]
+    assert clean_texts(content, progress=False) == [
+        legacy_clean(txt) for txt in content
+    ]
+
+
+def test_clean_texts_parallel_keeps_order_and_index():
+    rng = random.Random(99)
+    texts = [random_text(rng) for _ in range(50)]
+    content = pd.Series(texts, index=range(100, 0, -2))
+
+    cleaned = clean_texts(content, progress=False, workers=2, chunk_size=7)
+
+    assert list(cleaned.index) == list(content.index)
+    assert list(cleaned) == [legacy_clean(txt) for txt in texts]
+
+
+def test_convert_emoticons_matches_sequential_replace():
+    rng = random.Random(7)
+    for _ in range(20_000):
+        txt = random_text(rng)
+        expected = txt
+        for emoticon, meaning in emoticon_meanings.items():
+            expected = expected.replace(emoticon, f" {meaning}")
+
+        assert convert_emoticons(txt) == expected, repr(txt)
+
+
+def test_benchmarked_steps_match_clean_document():
+    rng = random.Random(99)
+    texts = [random_text(rng) for _ in range(2_000)]
+
+    assert clean_by_step(texts)[0] == [clean_document(txt) for txt in texts]
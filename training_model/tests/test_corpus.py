@@ -0,0 +1,51 @@
+import pytest
+
+from benchmarks import corpus
+
+pytest.importorskip("vaderSentiment")
+
+from benchmarks.suite import compare  # noqa: E402
+from emails.label_emails import HEADERS, parse_message  # noqa: E402
+
+
+def test_corpora_are_deterministic():
+    assert corpus.enron_emails(20, seed=3).equals(corpus.enron_emails(20, seed=3))
+    assert corpus.review_lines(20, seed=3) == corpus.review_lines(20, seed=3)
+    assert corpus.review_lines(20, seed=3) != corpus.review_lines(20, seed=4)
+
+
+def test_emails_parse_like_enron_messages():
+    df = corpus.enron_emails(50)
+    assert list(df.columns) == ["file", "message"]
+
+    for message in df["message"]:
+        fields = dict(zip(HEADERS + ["content"], parse_message(message)))
+        assert fields["Message-ID"].endswith(".JavaMail.evans@thyme>")
+        assert len(fields["From"]) == 1
+        assert all(address.endswith("@enron.com") for address in fields["To"])
+        assert fields["content"].strip()
+
+    assert df["message"].str.extract(r"Message-ID: (<.*>)")[0].is_unique
+
+
+def test_review_lines_are_labelled():
+    lines = corpus.review_lines(200)
+    labels = [line.split(" ", 1)[0] for line in lines]
+
+    assert set(labels) == {"__label__1", "__label__2"}
+    assert all(": " in line for line in lines)
+
+
+def test_compare_flags_slower_benchmarks(capsys):
+    baseline = {
+        "pad/10": {"unit": "rows", "rate": 100.0},
+        "featurize/10": {"unit": "rows", "rate": 100.0},
+    }
+    results = {
+        "pad/10": {"unit": "rows", "rate": 90.0},
+        "featurize/10": {"unit": "rows", "rate": 70.0},
+        "clean_text/10": {"unit": "rows", "rate": 10.0},
+    }
+
+    assert compare(results, baseline, tolerance=0.15) == ["featurize/10"]
+    assert "REGRESSION" in capsys.readouterr().out
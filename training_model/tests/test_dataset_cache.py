@@ -0,0 +1,53 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from utils import dataset_cache
+
+
+class FakeEmbeddings:
+    index_to_key = ["the", "good", "bad", "movie"]
+    key_to_index = {word: i for i, word in enumerate(index_to_key)}
+
+
+TEXTS = pd.Series(["the good movie", "bad bad movie the", "", "good"])
+LABELS = pd.Series([1.0, 0.0, 0.5, 1.0])
+
+
+def test_cached_sequences_reuses_previous_run(tmp_path, monkeypatch):
+    monkeypatch.setattr(dataset_cache, "CACHE_DIR", str(tmp_path))
+
+    sequences, labels = dataset_cache.cached_sequences(
+        TEXTS, LABELS, FakeEmbeddings(), 3
+    )
+    assert len(os.listdir(tmp_path)) == 1
+    assert isinstance(sequences.tokens, np.memmap)
+    assert sequences[1].tolist() == [2, 3, 0]
+    assert labels.tolist() == LABELS.tolist()
+
+    again, _ = dataset_cache.cached_sequences(TEXTS, LABELS, FakeEmbeddings(), 3)
+    assert len(os.listdir(tmp_path)) == 1
+    assert np.array_equal(again.pad(3), sequences.pad(3))
+
+
+def test_dataset_key_changes_with_inputs():
+    key = dataset_cache.dataset_key(TEXTS, LABELS, FakeEmbeddings(), 3)
+
+    assert key != dataset_cache.dataset_key(TEXTS, LABELS, FakeEmbeddings(), 4)
+    assert key != dataset_cache.dataset_key(
+        TEXTS.str.upper(), LABELS, FakeEmbeddings(), 3
+    )
+    assert key != dataset_cache.dataset_key(TEXTS, 1 - LABELS, FakeEmbeddings(), 3)
+
+
+def test_train_test_split_sequences_respects_limit():
+    sequences = dataset_cache.Featurizer(FakeEmbeddings()).transform(TEXTS)
+
+    train, test, Y_train, Y_test = dataset_cache.train_test_split_sequences(
+        sequences, LABELS.to_numpy(), limit=3, test_size=1
+    )
+
+    assert len(train) == 2 and len(test) == 1
+    assert len(Y_train) == 2 and len(Y_test) == 1
+    assert sorted(train.lengths().tolist() + test.lengths().tolist()) == [0, 3, 4]
@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.corpus import TextGenerator, enron_emails
+from utils.dedup import duplicate_rows, text_keys
+
+
+def words(generator: TextGenerator, k: int) -> str:
+    return " ".join(generator.rng.choices(generator.words, k=k))
+
+
+FORWARD = "---------------------- Forwarded by Sara Shackleton/HOU/ECT on 05/11/2000 ----\n"
+
+
+def flags(texts: list, threshold: float = 0.8, contexts=None, groups=None) -> list[str]:
+    hashes, signatures = text_keys(texts, contexts)
+    exact, near = duplicate_rows(hashes, signatures, threshold, groups)
+    return ["exact" if e else "near" if n else "" for e, n in zip(exact, near)]
+
+
+def test_finds_exact_and_near_duplicates_keeping_the_first():
+    generator = TextGenerator(0)
+    body = words(generator, 200)
+    other = words(generator, 200)
+
+    texts = [
+        body,
+        other,
+        "  " + body.upper().replace(" ", "\n  "),
+        FORWARD + body,
+        None,
+        "",
+    ]
+    assert flags(texts) == ["", "", "exact", "near", "", "exact"]
+
+    # Appending never changes which earlier texts are kept
+    assert flags(texts + [FORWARD + other, body])[: len(texts)] == flags(texts)
+
+
+def test_threshold_controls_near_duplicates():
+    generator = TextGenerator(1)
+    body = words(generator, 100)
+    reply = body + " " + words(generator, 30)
+
+    assert flags([body, reply], threshold=0.5) == ["", "near"]
+    assert flags([body, reply], threshold=0.95) == ["", ""]
+
+
+def test_contexts_and_groups_keep_copies_apart():
+    body = words(TextGenerator(2), 100)
+    texts = [body, body, FORWARD + body, FORWARD + body]
+
+    contexts = ["a", "b", "a", "a"]
+
+    # Contexts only tell exact copies apart, groups also near ones
+    assert flags(texts, contexts=contexts) == ["", "near", "near", "exact"]
+    groups = np.array([1, 2, 1, 1])
+    assert flags(texts, contexts=contexts, groups=groups) == ["", "", "near", "exact"]
+
+
+def test_short_texts_are_never_near_duplicates():
+    texts = ["thanks", "thanks!", "thanks a lot", "ok thanks"]
+    assert flags(texts, threshold=0.0) == ["", "exact", "", ""]
+
+
+def message(sender: str, recipient: str, date: str, body: str) -> str:
+    headers = [f"Message-ID: <{sender}{date}>", f"Date: {date}", f"From: {sender}"]
+    return "\n".join(headers + [f"To: {recipient}", "", body])
+
+
+def test_dedup_emails_only_drops_copies_between_the_same_people(tmp_path):
+    pytest.importorskip("pyarrow")
+    from emails.dedup_emails import dedup_emails
+
+    body = words(TextGenerator(3), 100)
+    messages = [
+        message("a@x", "b@x", "Mon, 1 May 2000", "Thanks!"),
+        message("c@x", "d@x", "Mon, 1 May 2000", "Thanks!"),
+        message("a@x", "b@x", "Tue, 2 May 2000", ""),
+        message("c@x", "d@x", "Tue, 2 May 2000", ""),
+        message("a@x", "b@x", "Wed, 3 May 2000", body),
+        message("c@x", "b@x", "Wed, 3 May 2000", FORWARD + body),
+        # The same emails filed in another folder, and a forward between the
+        # same people
+        message("a@x", "b@x", "Mon, 1 May 2000", "Thanks!"),
+        message("c@x", "d@x", "Tue,  2 May 2000", ""),
+        message("A@x", "b@x", "Thu, 4 May 2000", FORWARD + body),
+    ]
+    csv_path = str(tmp_path / "emails.csv")
+    pd.DataFrame({"file": range(len(messages)), "message": messages}).to_csv(
+        csv_path, index=False
+    )
+
+    counts = dedup_emails(csv_path, str(tmp_path / "deduped.parquet"))
+    assert counts == {"read": 9, "exact": 2, "near": 1, "kept": 6}
+
+
+def test_dedup_emails_writes_kept_rows(tmp_path):
+    pytest.importorskip("pyarrow")
+    from emails.dedup_emails import dedup_emails
+    from utils.storage import read_dataset
+
+    emails = enron_emails(40)
+    # Copies of the same messages filed under other folders
+    copies = emails.iloc[:10].assign(file=lambda df: df["file"] + "copy")
+    csv_path = str(tmp_path / "emails.csv")
+    pd.concat([emails, copies], ignore_index=True).to_csv(csv_path, index=False)
+
+    path = str(tmp_path / "deduped.parquet")
+    counts = dedup_emails(csv_path, path, workers=2, chunk_size=7, read_chunk_size=15)
+
+    assert counts["read"] == 50 and counts["exact"] == 10
+    assert counts["kept"] == 50 - counts["exact"] - counts["near"]
+
+    kept = read_dataset(path)
+    assert len(kept) == counts["kept"]
+    assert kept.index.is_unique and kept.index.max() < 40
+    assert list(kept.columns) == ["file", "message"]
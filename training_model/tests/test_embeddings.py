@@ -0,0 +1,25 @@
+import os
+
+import numpy as np
+
+from utils import embeddings
+
+
+def test_load_embeddings_reads_local_store(tmp_path, monkeypatch):
+    monkeypatch.setattr(embeddings, "EMBEDDINGS_DIR", str(tmp_path))
+    path = embeddings.store_path("tiny")
+    os.makedirs(path)
+
+    vectors = np.arange(6, dtype=np.float32).reshape(3, 2)
+    np.save(os.path.join(path, embeddings.VECTORS_FILE), vectors)
+    with open(os.path.join(path, embeddings.VOCAB_FILE), "w") as f:
+        f.write("the\nhello\nworld")
+
+    store = embeddings.load_model_embeddings({"gensin_model": "tiny"})
+
+    assert isinstance(store.vectors, np.memmap)
+    assert store.vectors.dtype == np.float32
+    assert np.array_equal(store.vectors, vectors)
+    assert store.key_to_index == {"the": 0, "hello": 1, "world": 2}
+    assert "hello" in store and "missing" not in store
+    assert len(store) == 3
@@ -0,0 +1,84 @@
+import pytest
+
+pytest.importorskip("ax")
+
+from ax.service.ax_client import ObjectiveProperties  # noqa: E402
+
+from utils import experiments  # noqa: E402
+from utils.search import TrialData, TrialPruned, run_search  # noqa: E402
+
+PARAMETERS = [{"name": "x", "type": "range", "bounds": [0.0, 1.0]}]
+OBJECTIVES = {"loss": ObjectiveProperties(minimize=True)}
+
+
+def loss(parameters, trial_data, pruner):
+    return {"loss": (parameters["x"] ** 2, 0)}
+
+
+def pruned_loss(parameters, trial_data, pruner):
+    raise TrialPruned(parameters["x"] ** 2)
+
+
+def open_experiment(**kwargs):
+    return experiments.open_experiment(
+        "test", "datasets/cache/key", PARAMETERS, OBJECTIVES, **kwargs
+    )
+
+
+def test_resume_and_warm_start(tmp_path, monkeypatch):
+    monkeypatch.setattr(experiments, "EXPERIMENTS_DIR", str(tmp_path))
+    trial_data = TrialData("unused", [], [], 10, "unused")
+
+    ax_client, path, done = open_experiment()
+    assert done == 0
+    run_search(ax_client, loss, trial_data, max_trials=3, checkpoint_path=path)
+
+    # Resuming picks up the three finished trials
+    resumed, _, done = open_experiment(resume=True)
+    assert done == 3
+    assert len(resumed.experiment.trials) == 3
+
+    # A new experiment archives the old one and is seeded from it
+    seeded, _, done = open_experiment(warm_start=True)
+    assert done == 0
+    trials = seeded.experiment.trials.values()
+    assert len(trials) == 3
+    assert all(trial.run_metadata.get("warm_start") for trial in trials)
+    assert len(list((tmp_path / "test" / "key").glob("*.json"))) == 2
+
+    # Pruned trials and the seeds themselves never seed a later search
+    run_search(seeded, pruned_loss, trial_data, max_trials=2, checkpoint_path=path)
+    assert len(seeded.experiment.trials) == 5
+
+    # Pruned trials are abandoned, but still count as done on resume
+    _, _, done = open_experiment(resume=True)
+    assert done == 2
+
+    again, _, _ = open_experiment(warm_start=True)
+    assert len(again.experiment.trials) == 3
+    assert len(list((tmp_path / "test" / "key").glob("*.json"))) == 3
+
+
+def test_warm_start_skips_seeds_outside_the_search_space(tmp_path, monkeypatch):
+    monkeypatch.setattr(experiments, "EXPERIMENTS_DIR", str(tmp_path))
+    trial_data = TrialData("unused", [], [], 10, "unused")
+
+    ax_client, path, _ = open_experiment()
+    random_trials = ax_client.generation_strategy._steps[0].num_trials
+    run_search(ax_client, loss, trial_data, max_trials=3, checkpoint_path=path)
+
+    narrowed = [{"name": "x", "type": "range", "bounds": [2.0, 3.0]}]
+    seeded, _, _ = experiments.open_experiment(
+        "test", "datasets/cache/key", narrowed, OBJECTIVES, warm_start=True
+    )
+    # None of the seeds were attached, so none replace random trials
+    assert len(seeded.experiment.trials) == 0
+    assert seeded.generation_strategy._steps[0].num_trials == random_trials
+
+
+def test_archive_names_never_collide(tmp_path):
+    first = experiments.archive_path(str(tmp_path), 123)
+    open(first, "w").close()
+    second = experiments.archive_path(str(tmp_path), 123)
+
+    assert first != second and second.endswith("123-1.json")
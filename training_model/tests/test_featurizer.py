@@ -0,0 +1,84 @@
+import numpy as np
+
+from utils.featurizer import Featurizer, SequenceRows
+
+
+class FakeEmbeddings:
+    key_to_index = {"the": 0, "good": 1, "bad": 2, "movie": 3}
+
+
+def reference_pad(sequences: list[list[int]], maxlen: int) -> np.ndarray:
+    """
+    keras.preprocessing.sequence.pad_sequences with its default arguments
+    """
+    padded = np.zeros((len(sequences), maxlen), dtype=np.int32)
+    for row, seq in enumerate(sequences):
+        seq = seq[-maxlen:]
+        if seq:
+            padded[row, -len(seq) :] = seq
+    return padded
+
+
+TEXTS = ["the good movie", "", "unknown words only", "bad bad bad the movie good", None]
+
+
+def test_transform_matches_encode():
+    featurizer = Featurizer(FakeEmbeddings())
+    sequences = featurizer.transform(TEXTS)
+
+    assert sequences.tokens.dtype == np.int32
+    assert len(sequences) == len(TEXTS)
+    for i, txt in enumerate(TEXTS):
+        expected = featurizer.encode(txt) if txt else []
+        assert sequences[i].tolist() == expected
+
+
+def test_pad_matches_keras_defaults():
+    featurizer = Featurizer(FakeEmbeddings())
+    sequences = featurizer.transform(TEXTS)
+    as_lists = [sequences[i].tolist() for i in range(len(sequences))]
+
+    for maxlen in [1, 3, 6, 10]:
+        assert np.array_equal(sequences.pad(maxlen), reference_pad(as_lists, maxlen))
+
+
+def test_take_selects_rows_in_order():
+    sequences = Featurizer(FakeEmbeddings()).transform(TEXTS)
+    subset = sequences.take(np.array([3, 0, 1]))
+
+    assert [subset[i].tolist() for i in range(3)] == [
+        sequences[3].tolist(),
+        sequences[0].tolist(),
+        [],
+    ]
+
+
+
+def test_sequence_rows_match_taken_rows():
+    sequences = Featurizer(FakeEmbeddings()).transform(TEXTS)
+    rows = SequenceRows(SequenceRows(sequences, np.array([3, 0, 1, 2])), [1, 0, 2])
+    taken = sequences.take(np.array([0, 3, 1]))
+
+    assert rows.lengths().tolist() == taken.lengths().tolist()
+    assert np.array_equal(rows.pad(4), taken.pad(4))
+
+def test_transform_handles_empty_batches():
+    sequences = Featurizer(FakeEmbeddings()).transform([])
+
+    assert len(sequences) == 0
+    assert sequences.pad(5).shape == (0, 5)
+
+
+def test_pad_defaults_to_longest_document():
+    sequences = Featurizer(FakeEmbeddings()).transform(TEXTS)
+    assert sequences.pad().shape == (len(TEXTS), 6)
+
+
+def test_truncate_keeps_last_tokens():
+    sequences = Featurizer(FakeEmbeddings()).transform(TEXTS)
+    truncated = sequences.truncate(2)
+
+    assert [truncated[i].tolist() for i in range(len(TEXTS))] == [
+        sequences[i].tolist()[-2:] for i in range(len(TEXTS))
+    ]
+    assert np.array_equal(truncated.pad(2), sequences.pad(2))
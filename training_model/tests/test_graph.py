@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+
+from utils.graph import (
+    import_command,
+    intern_addresses,
+    sentiment_edges,
+    write_neo4j_import,
+)
+
+
+def make_emails() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "From": [["b@x"], ["a@x"], ["c@x"], ["b@x"], ["a@x"]],
+            "To": [["a@x", "c@x"], ["b@x"], [], ["a@x"], ["a@x"]],
+            "sentiment": [0.5, -0.5, 0.9, 1.0, np.nan],
+        }
+    )
+
+
+def reference_edges(df: pd.DataFrame, directed: bool) -> dict:
+    """
+    The slow per message aggregation the vectorized one replaces
+    """
+    sums: dict[tuple, list] = {}
+    for senders, recipients, sentiment in df.itertuples(index=False):
+        if np.isnan(sentiment):
+            continue
+        for sender in senders:
+            for recipient in recipients:
+                key = (sender, recipient) if directed else tuple(sorted((sender, recipient)))
+                total = sums.setdefault(key, [0, 0.0])
+                total[0] += 1
+                total[1] += (sentiment + 1) / 2
+    return {key: (count, total / count) for key, (count, total) in sums.items()}
+
+
+def as_dict(table, edges: pd.DataFrame) -> dict:
+    return {
+        (table[start], table[end]): (emails_sent, sentiment)
+        for start, end, emails_sent, sentiment in edges.itertuples(index=False)
+    }
+
+
+def test_intern_addresses_sorts_ids():
+    table, [(senders, sender_offsets), (recipients, recipient_offsets)] = intern_addresses(
+        [["c@x"], ["a@x"]], [["b@x", "a@x"], []]
+    )
+
+    assert list(table.addresses) == ["a@x", "b@x", "c@x"]
+    assert senders.dtype == np.int32
+    assert senders.tolist() == [2, 0] and sender_offsets.tolist() == [0, 1, 2]
+    assert recipients.tolist() == [1, 0] and recipient_offsets.tolist() == [0, 2, 2]
+    assert table.ids(["b@x", "z@x"]).tolist() == [1, -1]
+
+
+def test_edges_match_per_message_aggregation():
+    df = make_emails()
+    for directed in [False, True]:
+        table, edges = sentiment_edges(df, directed=directed)
+        expected = reference_edges(df, directed)
+
+        assert as_dict(table, edges).keys() == expected.keys()
+        for key, (count, sentiment) in as_dict(table, edges).items():
+            assert count == expected[key][0]
+            assert np.isclose(sentiment, expected[key][1])
+
+    # b -> a and a -> b are one edge unless directed
+    table, edges = sentiment_edges(df)
+    count, sentiment = as_dict(table, edges)[("a@x", "b@x")]
+    assert count == 3 and np.isclose(sentiment, 2 / 3)
+
+
+def test_edge_sentiment_is_on_the_model_scale():
+    # VADER compound scores span [-1, 1], the web app expects [0, 1]
+    df = pd.DataFrame(
+        {
+            "From": [["a@x"], ["a@x"], ["c@x"]],
+            "To": [["b@x"], ["b@x"], ["d@x"]],
+            "sentiment": [-1.0, -1.0, 1.0],
+        }
+    )
+    _, edges = sentiment_edges(df)
+
+    assert edges["sentiment"].tolist() == [0.0, 1.0]
+    assert edges["sentiment"].between(0, 1).all()
+
+
+def test_write_neo4j_import(tmp_path):
+    table, edges = sentiment_edges(make_emails())
+    paths = write_neo4j_import(table, edges, "enron", str(tmp_path))
+
+    users = pd.read_csv(paths[1])
+    assert list(users.columns) == [":ID(User)", "email"]
+    assert users["email"].tolist() == ["a@x", "b@x", "c@x"]
+
+    owns = pd.read_csv(paths[2])
+    assert owns[":START_ID(Project)"].eq("enron").all()
+    assert len(owns) == len(users)
+
+    sentiment = pd.read_csv(paths[3])
+    assert list(sentiment.columns) == [
+        ":START_ID(User)",
+        ":END_ID(User)",
+        "sentiment:double",
+        "emailsSent:long",
+    ]
+    assert sentiment["emailsSent:long"].sum() == 4
+    assert "--relationships=SENTIMENT=" in import_command(paths)
@@ -0,0 +1,44 @@
+import pytest
+
+pytest.importorskip("pyarrow")
+pytest.importorskip("vaderSentiment")
+
+from benchmarks.corpus import enron_emails  # noqa: E402
+from emails import label_emails  # noqa: E402
+from emails.clean_emails import clean_new_emails  # noqa: E402
+from emails.label_emails import label_new_emails  # noqa: E402
+from utils.storage import dataset_files, read_dataset  # noqa: E402
+
+
+def test_only_new_emails_are_labelled_and_cleaned(tmp_path, monkeypatch):
+    labelled = str(tmp_path / "emails_labelled.parquet")
+    cleaned = str(tmp_path / "emails_cleaned.parquet")
+    emails = enron_emails(30)
+
+    assert len(label_new_emails(emails.iloc[:20], labelled)) == 20
+    assert len(clean_new_emails(labelled, cleaned)) == 20
+
+    calls = []
+    label = label_emails.label_emails
+
+    def counting_label(df, **kwargs):
+        calls.append(len(df))
+        return label(df, **kwargs)
+
+    monkeypatch.setattr(label_emails, "label_emails", counting_label)
+
+    # The first 20 are known, only 10 get labelled and cleaned
+    assert len(label_new_emails(emails, labelled)) == 10
+    assert calls == [10]
+    assert len(clean_new_emails(labelled, cleaned)) == 10
+
+    assert len(dataset_files(labelled)) == 2
+    assert len(dataset_files(cleaned)) == 2
+    data = read_dataset(cleaned)
+    assert data.index.is_unique and len(data) == 30
+    assert data["sentiment"].between(0, 1).all()
+
+    # Nothing new, nothing written
+    assert label_new_emails(emails, labelled).empty
+    assert clean_new_emails(labelled, cleaned).empty
+    assert len(dataset_files(cleaned)) == 2
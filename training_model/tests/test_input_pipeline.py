@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("tensorflow")
+
+from utils.dataset_cache import train_test_split_sequences  # noqa: E402
+from utils.featurizer import TokenSequences  # noqa: E402
+from utils.input_pipeline import (  # noqa: E402
+    TrainingData,
+    bucket_batches,
+    bucketed_dataset,
+)
+
+
+def test_bucket_batches_cover_every_row_once():
+    rng = np.random.default_rng(0)
+    lengths = rng.integers(0, 900, size=1_000)
+
+    batches = bucket_batches(lengths, 32, 800, rng=rng)
+    rows = np.concatenate([rows for rows, _ in batches])
+
+    assert sorted(rows.tolist()) == list(range(1_000))
+    for rows, limit in batches:
+        assert len(rows) <= 32
+        assert limit <= 800
+        assert np.all(np.minimum(lengths[rows], 800) <= limit)
+
+
+def test_bucketed_dataset_pads_at_the_start():
+    sequences = TokenSequences(
+        np.array([1, 2, 3, 4, 5, 6], dtype=np.int32),
+        np.array([0, 1, 3, 6], dtype=np.int64),
+    )
+    labels = np.array([0.0, 0.5, 1.0])
+
+    batches = list(bucketed_dataset(sequences, labels, 8, 800, shuffle=False))
+
+    assert len(batches) == 1
+    x, y = batches[0]
+    assert x.shape == (3, 16)
+    assert x.numpy()[:, -3:].tolist() == [[0, 0, 1], [0, 2, 3], [4, 5, 6]]
+    assert y.numpy().tolist() == [0.0, 0.5, 1.0]
+
+
+def test_training_data_from_split_keeps_labels_with_their_rows():
+    # Every row's tokens are its label, so a mixed up split shows in the labels
+    lengths = np.array([3, 1, 4, 1, 5, 9, 2, 6])
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    tokens = np.repeat(np.arange(1, len(lengths) + 1, dtype=np.int32), lengths)
+    labels = np.arange(1, len(lengths) + 1, dtype=np.float64)
+
+    train, test, Y_train, Y_test = train_test_split_sequences(
+        TokenSequences(tokens, offsets), labels, test_size=2
+    )
+    data = TrainingData(train, Y_train, test, Y_test, max_text_len=8)
+
+    X_train, X_test = data.padded()
+    assert X_train.shape == (6, 8) and X_test.shape == (2, 8)
+    assert X_train[:, -1].tolist() == data.Y_train.tolist()
+    assert X_test[:, -1].tolist() == data.Y_test.tolist()
+
+    for bucketed in (False, True):
+        inputs = data.fit_inputs(4, bucketed)
+        for x, y in [*inputs["x"], *inputs["validation_data"]]:
+            assert bucketed or x.shape[1] == 8
+            assert x.numpy()[:, -1].tolist() == y.numpy().tolist()
+
+
+def test_training_data_subset_takes_leading_rows():
+    sequences = TokenSequences(
+        np.arange(10, dtype=np.int32), np.arange(11, dtype=np.int64)
+    )
+    labels = np.linspace(0, 1, 10)
+    data = TrainingData(sequences, labels, sequences, labels, max_text_len=5)
+
+    subset = data.subset(0.3)
+
+    assert len(subset.train) == 3 and len(subset.test) == 3
+    assert subset.train.sequences is sequences
+    assert subset.train.pad(1).reshape(-1).tolist() == [0, 1, 2]
+    assert subset.Y_train.tolist() == labels[:3].tolist()
+    assert len(data.subset(0.01).train) == 1
@@ -0,0 +1,42 @@
+import numpy as np
+from sklearn.metrics import (
+    classification_report,
+    confusion_matrix,
+    mean_absolute_error,
+    mean_absolute_percentage_error,
+    mean_squared_error,
+    r2_score,
+)
+
+from utils.metrics import CLASS_NAMES, LABELS, StreamingMetrics, to_labels
+
+
+def test_streaming_metrics_match_sklearn():
+    rng = np.random.default_rng(0)
+    y_true = rng.random(1_000)
+    y_pred = np.clip(y_true + rng.normal(scale=0.2, size=1_000), 0, 1)
+
+    metrics = StreamingMetrics()
+    for start in range(0, 1_000, 128):
+        metrics.update(y_true[start : start + 128], y_pred[start : start + 128])
+    result = metrics.result()
+
+    assert result["samples"] == 1_000
+    assert np.isclose(result["MSE"], mean_squared_error(y_true, y_pred))
+    assert np.isclose(result["MAE"], mean_absolute_error(y_true, y_pred))
+    assert np.isclose(result["MAPE"], mean_absolute_percentage_error(y_true, y_pred))
+    assert np.isclose(result["R2"], r2_score(y_true, y_pred))
+
+    true_lbl, pred_lbl = to_labels(y_true), to_labels(y_pred)
+    assert result["confusion_matrix"] == confusion_matrix(
+        true_lbl, pred_lbl, labels=LABELS
+    ).tolist()
+
+    expected = classification_report(
+        true_lbl, pred_lbl, labels=LABELS, target_names=CLASS_NAMES, output_dict=True
+    )
+    report = result["classification_report"]
+    for name in CLASS_NAMES + ["macro avg", "weighted avg"]:
+        for key in ["precision", "recall", "f1-score", "support"]:
+            assert np.isclose(report[name][key], expected[name][key])
+    assert np.isclose(report["accuracy"], expected["accuracy"])
@@ -0,0 +1,39 @@
+from utils.prediction_cache import PredictionCache
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = PredictionCache("model-a", max_entries=2)
+    a, b, c = (cache.key(t) for t in ["a", "b", "c"])
+
+    cache.put_many([a, b], [0.1, 0.2])
+    assert cache.get_many([a]) == [0.1]  # a is now the most recent
+    cache.put_many([c], [0.3])
+
+    assert cache.get_many([a, b, c]) == [0.1, None, 0.3]
+    assert cache.stats()["hits"] == 3 and cache.stats()["misses"] == 1
+
+
+def test_keys_depend_on_model_identity():
+    assert PredictionCache("model-a").key("text") != PredictionCache(
+        "model-b"
+    ).key("text")
+
+
+def test_disk_tier_survives_restarts_and_drops_other_models(tmp_path):
+    path = str(tmp_path / "predictions.sqlite")
+
+    cache = PredictionCache("model-a", disk_path=path)
+    key = cache.key("hello")
+    cache.put_many([key], [0.75])
+    cache.close()
+
+    reopened = PredictionCache("model-a", disk_path=path)
+    assert reopened.get_many([key]) == [0.75]
+    assert reopened.stats()["disk_hits"] == 1
+    reopened.close()
+
+    # Opening with another model clears the old scores
+    PredictionCache("model-b", disk_path=path).close()
+    again = PredictionCache("model-a", disk_path=path)
+    assert again.get_many([key]) == [None]
+    again.close()
@@ -0,0 +1,72 @@
+import json
+import os
+
+import pytest
+
+from utils import profiling
+from utils.parallel import map_chunks
+
+
+@pytest.fixture
+def profiler(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILES_DIR", str(tmp_path))
+    profiling.enable()
+    yield profiling._profiler
+    monkeypatch.setattr(profiling, "_profiler", None)
+
+
+def _square_chunk(chunk: list[int]) -> list[int]:
+    with profiling.tally("square", rows=len(chunk)):
+        return [x * x for x in chunk]
+
+
+def test_disabled_records_nothing():
+    assert not profiling.enabled()
+    with profiling.span("work", rows=10) as span:
+        span.rows = 20
+    assert profiling.span("other") is profiling.tally("other")
+    assert profiling.write_report("test") is None
+
+
+def test_spans_and_tallies(profiler):
+    with profiling.span("outer", dataset="emails"):
+        with profiling.span("inner") as span:
+            span.rows = 100
+        for _ in range(3):
+            with profiling.tally("step", rows=10):
+                pass
+
+    spans = {record["name"]: record for record in profiler.spans}
+    assert spans["inner"]["rows"] == 100
+    assert spans["inner"]["rows_per_s"] > 0
+    assert spans["outer"]["wall_s"] >= spans["inner"]["wall_s"]
+    assert spans["outer"]["args"] == {"dataset": "emails"}
+
+    totals = profiler.totals()
+    assert totals["step"]["calls"] == 3
+    assert totals["step"]["rows"] == 30
+
+
+def test_worker_records_are_merged(profiler):
+    squares = map_chunks(_square_chunk, list(range(100)), workers=2, chunk_size=10)
+
+    assert squares == [x * x for x in range(100)]
+    total = profiler.totals()["square"]
+    assert (total["calls"], total["rows"]) == (10, 100)
+
+
+def test_report_and_trace(profiler):
+    with profiling.span("work", rows=5):
+        pass
+
+    path = profiling.write_report("emails", trace=True)
+    with open(path) as f:  # pyright: ignore
+        report = json.load(f)
+    with open(path.replace(".json", ".trace.json")) as f:  # pyright: ignore
+        trace = json.load(f)
+
+    assert os.path.basename(path).startswith("emails-")  # pyright: ignore
+    assert report["totals"]["work"]["rows"] == 5
+    assert report["spans"][0]["start"] >= 0
+    assert trace["traceEvents"][0]["ph"] == "X"
+    assert trace["traceEvents"][0]["args"]["rows"] == 5
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("tensorflow")
+
+import keras  # noqa: E402
+
+from utils.featurizer import TokenSequences  # noqa: E402
+from utils.input_pipeline import TrainingData  # noqa: E402
+from utils.pruning import fit_with_pruning, reset_training, training_state  # noqa: E402
+from utils.search import MedianPruner, TrialPruned  # noqa: E402
+from utils.utils import get_keras_model  # noqa: E402
+
+
+def make_model() -> keras.Model:
+    weights = np.random.default_rng(0).normal(size=(10, 4))
+    model = get_keras_model(weights, 4, 8, 0.1, 6)
+    model.compile(optimizer=keras.optimizers.Adam(learning_rate=0.01), loss="mse")
+    return model
+
+
+def make_training_data() -> TrainingData:
+    rng = np.random.default_rng(0)
+    tokens = rng.integers(1, 10, size=60, dtype=np.int32)
+    sequences = TokenSequences(tokens, np.arange(0, 61, 3, dtype=np.int64))
+    labels = rng.random(20).astype(np.float32)
+    return TrainingData(sequences, labels, sequences, labels, max_text_len=6)
+
+
+def test_reset_training_forgets_earlier_fits():
+    model = make_model()
+    weights = model.get_weights()
+    state = training_state(model)
+
+    model.fit(**make_training_data().fit_inputs(4), epochs=2, verbose=0)
+    reset_training(model, state)
+
+    assert all(np.array_equal(a, b) for a, b in zip(model.get_weights(), weights))
+    assert int(model.optimizer.iterations) == 0
+    assert float(model.optimizer.learning_rate) == pytest.approx(0.01)
+    slots = [v for v in model.optimizer.variables if v.path not in state]
+    assert slots and not any(np.any(v.numpy()) for v in slots)
+
+
+def test_fit_with_pruning_raises_for_pruned_trials():
+    # Three earlier trials reached 0 on the first rung, nothing can beat them
+    pruner = MedianPruner(history={"0.1x1": [0.0, 0.0, 0.0]})
+
+    with pytest.raises(TrialPruned):
+        fit_with_pruning(make_model(), make_training_data(), 4, 1, "val_loss", pruner)
+
+
+def test_fit_with_pruning_returns_full_run():
+    value, seconds = fit_with_pruning(
+        make_model(), make_training_data(), 4, 2, "val_loss", MedianPruner()
+    )
+    assert value >= 0 and seconds > 0
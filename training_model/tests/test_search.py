@@ -0,0 +1,121 @@
+import json
+import os
+import pickle
+
+import numpy as np
+
+from utils.search import MedianPruner, TrialData, TrialPruned, run_search
+
+
+class FakeAxClient:
+    def __init__(self):
+        self.next_index = 0
+        self.completed = {}
+        self.failed = []
+        self.abandoned = []
+
+    def get_next_trials(self, max_trials):
+        trials = {}
+        for _ in range(max_trials):
+            trials[self.next_index] = {"x": self.next_index}
+            self.next_index += 1
+        return trials, False
+
+    def complete_trial(self, trial_index, raw_data):
+        self.completed[trial_index] = raw_data
+
+    def log_trial_failure(self, trial_index):
+        self.failed.append(trial_index)
+
+    def abandon_trial(self, trial_index, reason=None):
+        self.abandoned.append(trial_index)
+
+    def save_to_json_file(self, filepath):
+        with open(filepath, "w") as f:
+            json.dump(sorted(self.completed), f)
+
+
+def square(parameters, trial_data, pruner):
+    if parameters["x"] == 3:
+        raise ValueError("bad trial")
+    if pruner is not None and pruner.should_prune("rung", parameters["x"]):
+        raise TrialPruned(parameters["x"])
+    return {
+        "objective": (parameters["x"] ** 2, 0),
+        "threads": os.environ.get("OMP_NUM_THREADS"),
+    }
+
+
+def make_trial_data():
+    return TrialData("unused", np.arange(4), np.arange(2), 10, "unused")
+
+
+def test_run_search_stops_after_max_trials():
+    ax_client = FakeAxClient()
+    run_search(ax_client, square, make_trial_data(), max_trials=5)
+
+    assert ax_client.next_index == 5
+    assert sorted(ax_client.completed) == [0, 1, 2]
+    assert ax_client.failed == [3]
+    # Worse than the three trials before it, so its value never reaches Ax
+    assert ax_client.abandoned == [4]
+
+
+def test_run_search_stops_on_time_budget():
+    ax_client = FakeAxClient()
+    run_search(ax_client, square, make_trial_data(), max_trials=5, time_budget=0)
+
+    assert ax_client.next_index == 0
+
+
+def test_run_search_in_worker_processes():
+    ax_client = FakeAxClient()
+    run_search(ax_client, square, make_trial_data(), workers=2, max_trials=6)
+
+    assert ax_client.next_index == 6
+    assert ax_client.failed == [3]
+    assert ax_client.completed[0]["objective"] == (0, 0)
+    # Every worker was given its share of the threads
+    threads = max(1, (os.cpu_count() or 1) // 2)
+    assert {r["threads"] for r in ax_client.completed.values()} == {str(threads)}
+    # Rungs are shared between workers. Whichever order they finish in, the
+    # last trial is judged against at least three better ones.
+    assert {0, 1, 2} <= set(ax_client.completed)
+    assert 5 in ax_client.abandoned
+
+
+def test_run_search_checkpoints_every_trial(tmp_path):
+    ax_client = FakeAxClient()
+    path = str(tmp_path / "current.json")
+    run_search(ax_client, square, make_trial_data(), max_trials=3, checkpoint_path=path)
+
+    with open(path) as f:
+        assert json.load(f) == [0, 1, 2]
+    assert os.listdir(tmp_path) == ["current.json"]
+
+
+def test_run_search_without_pruning():
+    ax_client = FakeAxClient()
+    run_search(ax_client, square, make_trial_data(), max_trials=6, prune=False)
+
+    assert sorted(ax_client.completed) == [0, 1, 2, 4, 5]
+    assert ax_client.abandoned == []
+
+
+def test_median_pruner_waits_for_min_trials():
+    pruner = MedianPruner(min_trials=3)
+
+    assert not any(pruner.should_prune("epoch 1", v) for v in [5.0, 1.0, 3.0])
+    assert pruner.should_prune("epoch 1", 4.0)
+    assert not pruner.should_prune("epoch 1", 2.0)
+    # Every rung is judged on its own
+    assert not pruner.should_prune("epoch 2", 100.0)
+
+
+def test_trial_data_pickles_without_loaded_data():
+    trial_data = make_trial_data()
+    trial_data._training_data = "loaded"
+
+    restored = pickle.loads(pickle.dumps(trial_data))
+    assert restored._training_data is None
+    assert restored.train_rows.tolist() == [0, 1, 2, 3]
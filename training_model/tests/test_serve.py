@@ -0,0 +1,45 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from serve import make_handler
+from utils.batching import MicroBatcher
+
+
+@pytest.fixture
+def server():
+    batcher = MicroBatcher(lambda texts: [len(t) / 10 for t in texts], max_wait_ms=1)
+    batcher.start()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(batcher))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+
+    server.shutdown()
+    server.server_close()
+    batcher.close()
+
+
+def post(url: str, body: bytes) -> tuple[int, dict]:
+    request = urllib.request.Request(f"{url}/score", data=body, method="POST")
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as e:
+        return e.code, json.load(e)
+
+
+def test_score(server):
+    assert post(server, b'{"text": "abc"}') == (200, {"score": 0.3})
+    assert post(server, b'{"texts": ["a", "ab"]}') == (200, {"scores": [0.1, 0.2]})
+
+
+@pytest.mark.parametrize("body", [b"[]", b'"text"', b"1", b"null", b"{", b'{"text": 1}'])
+def test_bad_bodies_are_client_errors(server, body):
+    status, response = post(server, body)
+    assert status == 400 and "error" in response
@@ -0,0 +1,127 @@
+import argparse
+
+import pytest
+
+from emails import train
+from main import train_stage
+from utils import stages
+from utils.stages import Stage, run_stages
+
+
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch):
+    monkeypatch.setattr(stages, "STAGES_DIR", str(tmp_path / "stages"))
+    raw = tmp_path / "raw.txt"
+    middle = tmp_path / "middle.txt"
+    final = tmp_path / "final.txt"
+    raw.write_text("hello")
+    runs = []
+
+    def upper():
+        runs.append("upper")
+        middle.write_text(raw.read_text().upper())
+
+    def exclaim():
+        runs.append("exclaim")
+        final.write_text(middle.read_text() + "!")
+
+    def make(params=None):
+        return [
+            Stage("upper", upper, [str(raw)], [str(middle)], code=[stages]),
+            Stage("exclaim", exclaim, [str(middle)], [str(final)], params=params),
+        ]
+
+    return make, runs, raw, final
+
+
+def test_skips_stages_with_valid_outputs(pipeline):
+    make, runs, raw, final = pipeline
+
+    run_stages("test", make())
+    run_stages("test", make())
+    assert runs == ["upper", "exclaim"]
+    assert final.read_text() == "HELLO!"
+
+    # A changed input reruns everything downstream of it
+    raw.write_text("bye")
+    run_stages("test", make())
+    assert runs[2:] == ["upper", "exclaim"]
+    assert final.read_text() == "BYE!"
+
+    # So does a changed parameter, but only for its own stage
+    run_stages("test", make({"loud": True}))
+    assert runs[4:] == ["exclaim"]
+
+
+def test_rebuilds_changed_or_forced_outputs(pipeline):
+    make, runs, _, final = pipeline
+    run_stages("test", make())
+
+    final.write_text("edited")
+    run_stages("test", make())
+    assert runs[2:] == ["exclaim"]
+
+    run_stages("test", make(), force=["upper"])
+    assert runs[3:] == ["upper"]
+
+    run_stages("test", make(), force=[])
+    assert runs[4:] == ["upper", "exclaim"]
+
+
+
+def test_restores_outputs_of_earlier_runs(pipeline):
+    make, runs, raw, final = pipeline
+    run_stages("test", make())
+
+    raw.write_text("bye")
+    run_stages("test", make())
+    assert final.read_text() == "BYE!"
+
+    # Going back only puts the stored outputs in place
+    raw.write_text("hello")
+    run_stages("test", make())
+    assert runs[4:] == []
+    assert final.read_text() == "HELLO!"
+
+
+def test_rewritten_outputs_leave_stored_runs_alone(tmp_path, monkeypatch):
+    monkeypatch.setattr(stages, "STAGES_DIR", str(tmp_path / "stages"))
+    out = tmp_path / "out.txt"
+    runs = []
+
+    def make(word):
+        def write():
+            # In place, like most writers
+            runs.append(word)
+            out.write_text(word)
+
+        return [Stage("write", write, [], [str(out)], params={"word": word})]
+
+    for word in ["a", "b", "a", "b"]:
+        run_stages("test", make(word))
+        assert out.read_text() == word
+
+    assert runs == ["a", "b"]
+
+
+def test_runs_only_selected_stages(pipeline, tmp_path):
+    make, runs, _, _ = pipeline
+
+    with pytest.raises(FileNotFoundError):
+        run_stages("test", make(), start="exclaim")
+
+    run_stages("test", make(), stop="upper")
+    run_stages("test", make(), start="exclaim")
+    assert runs == ["upper", "exclaim"]
+
+    with pytest.raises(ValueError):
+        run_stages("test", make(), start="missing")
+
+
+def test_pruned_models_skip_the_data_pipeline_export():
+    def outputs(vocab_size):
+        args = argparse.Namespace(bucketed=False, vocab_size=vocab_size)
+        return train_stage(args, "emails", lambda: None, [], train).outputs
+
+    assert outputs(None) == [train.MODEL_PATH, train.EXPORT_PATH]
+    assert outputs(20_000) == [train.MODEL_PATH, "./models/emails_vocab.txt"]
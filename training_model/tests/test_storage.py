@@ -0,0 +1,75 @@
+import pandas as pd
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from utils.storage import (  # noqa: E402
+    append_dataset,
+    dataset_index,
+    iter_dataset,
+    read_dataset,
+    write_dataset,
+)
+
+
+def make_emails() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "From": [["a@enron.com"], ["b@enron.com"], ["c@enron.com"]],
+            "To": [["b@enron.com", "c@enron.com"], [], ["a@enron.com"]],
+            "content": ["good deal", "bad news", "thanks"],
+            "sentiment": [0.8, 0.1, 0.6],
+        },
+        index=pd.Index(["<1>", "<2>", "<3>"], name="Message-ID"),
+    )
+
+
+def test_round_trip_keeps_lists_strings_and_index(tmp_path):
+    path = str(tmp_path / "emails.parquet")
+    write_dataset(make_emails(), path)
+
+    data = read_dataset(path)
+
+    assert data.index.tolist() == ["<1>", "<2>", "<3>"]
+    assert list(data.loc["<1>", "To"]) == ["b@enron.com", "c@enron.com"]
+    assert list(data.loc["<2>", "To"]) == []
+    assert isinstance(data["content"].dtype, pd.StringDtype)
+    assert data["sentiment"].tolist() == [0.8, 0.1, 0.6]
+
+
+def test_reads_only_requested_columns_across_shards(tmp_path):
+    emails = make_emails()
+    write_dataset(emails.iloc[:2], str(tmp_path / "part-00000.parquet"))
+    write_dataset(emails.iloc[2:], str(tmp_path / "part-00001.parquet"))
+
+    data = read_dataset(str(tmp_path), columns=["content", "sentiment"], limit=2)
+    assert list(data.columns) == ["content", "sentiment"]
+    assert data["content"].tolist() == ["good deal", "bad news"]
+
+    batches = list(iter_dataset(str(tmp_path), ["content"], batch_size=1))
+    assert [b["content"].tolist() for b in batches] == [
+        ["good deal"],
+        ["bad news"],
+        ["thanks"],
+    ]
+
+
+def test_append_turns_a_file_into_shards(tmp_path):
+    path = str(tmp_path / "emails.parquet")
+    emails = make_emails()
+    assert dataset_index(path).empty
+
+    write_dataset(emails.iloc[:1], path)
+    shard = append_dataset(emails.iloc[1:], path)
+
+    assert shard.endswith("part-00001.parquet")
+    assert sorted(p.name for p in (tmp_path / "emails.parquet").iterdir()) == [
+        "part-00000.parquet",
+        "part-00001.parquet",
+    ]
+    assert dataset_index(path).tolist() == ["<1>", "<2>", "<3>"]
+    assert read_dataset(path)["content"].tolist() == ["good deal", "bad news", "thanks"]
+
+    # Writing the whole dataset again replaces the shards
+    write_dataset(emails.iloc[:2], path)
+    assert dataset_index(path).tolist() == ["<1>", "<2>"]
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("tensorflow")
+
+import keras
+
+from utils.tflite import TFLiteModel, export_tflite
+
+MAX_TEXT_LEN = 12
+
+
+def build_model() -> keras.Model:
+    keras.utils.set_random_seed(0)
+    model = keras.Sequential(
+        [
+            keras.Input(shape=(None,), dtype="int32"),
+            keras.layers.Embedding(50, 8, mask_zero=True),
+            keras.layers.LSTM(4),
+            keras.layers.Dense(1, activation="sigmoid"),
+        ]
+    )
+    return model
+
+
+@pytest.mark.parametrize("quantize", [False, True])
+def test_export_matches_keras(tmp_path, quantize):
+    model = build_model()
+    path = str(tmp_path / "model.tflite")
+
+    size = export_tflite(model, MAX_TEXT_LEN, path, batch_size=4, quantize=quantize)
+    assert size > 0
+
+    exported = TFLiteModel(path, num_threads=1)
+    assert exported.batch_size == 4
+    assert exported.input_shape == (None, MAX_TEXT_LEN)
+
+    # 10 rows is two full blocks and a padded tail
+    x = np.random.default_rng(0).integers(1, 50, size=(10, MAX_TEXT_LEN))
+    x[:, 8:] = 0
+    expected = model.predict_on_batch(x)
+    scores = exported.predict_on_batch(x)
+
+    assert scores.shape == (10, 1)
+    np.testing.assert_allclose(scores, expected, atol=0.02 if quantize else 1e-5)
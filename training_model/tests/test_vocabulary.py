@@ -0,0 +1,82 @@
+import os
+
+import numpy as np
+
+from utils import vocabulary
+from utils.embeddings import EmbeddingStore
+from utils.featurizer import Featurizer
+
+WORDS = ["the", "good", "bad", "movie", "plot"]
+TEXTS = ["good movie", "bad bad movie", "the plot", "bad movie", None]
+
+
+def store() -> EmbeddingStore:
+    vectors = np.arange(10, dtype=np.float32).reshape(5, 2)
+    return EmbeddingStore("tiny", vectors, WORDS)
+
+
+def test_prune_keeps_most_frequent_words():
+    full = store()
+    counts = vocabulary.word_counts(TEXTS, full)
+    assert counts.tolist() == [1, 1, 3, 3, 1]
+
+    pruned = vocabulary.prune_embeddings(full, counts, size=3)
+
+    # Ties keep the embedding order
+    assert pruned.index_to_key == ["<pad>", "<oov>", "bad", "movie", "the"]
+    assert pruned.oov_index == vocabulary.OOV_INDEX
+    assert np.array_equal(pruned.vectors[0], [0, 0])  # pyright: ignore
+    assert np.array_equal(pruned.vectors[2:], full.vectors[[2, 3, 0]])  # pyright: ignore
+    # good and plot occur once each
+    assert np.allclose(pruned.vectors[1], (full.vectors[1] + full.vectors[4]) / 2)  # pyright: ignore
+
+
+def test_prune_never_keeps_unseen_words():
+    full = store()
+    pruned = vocabulary.prune_embeddings(full, np.array([0, 2, 0, 1, 0]), size=10)
+
+    assert pruned.index_to_key == ["<pad>", "<oov>", "good", "movie"]
+    assert np.array_equal(pruned.vectors[1], [0, 0])  # pyright: ignore
+
+
+def test_featurizer_maps_dropped_words_to_oov():
+    full = store()
+    pruned = vocabulary.prune_embeddings(full, vocabulary.word_counts(TEXTS, full), 2)
+
+    sequences = Featurizer(pruned).transform(["bad  movie plot", "unknown", None])
+
+    assert sequences[0].tolist() == [2, 3, 1]
+    assert sequences[1].tolist() == []
+    assert sequences[2].tolist() == []
+
+
+def test_pruned_sequences_line_up_with_full_ones():
+    # Words GloVe never knew are dropped by both, not sent to the OOV bucket
+    full = store()
+    pruned = vocabulary.prune_embeddings(full, vocabulary.word_counts(TEXTS, full), 2)
+    texts = ["the zzz good movie qqq", "unknown words only", "plot bad"]
+
+    full_sequences = Featurizer(full).transform(texts)
+    pruned_sequences = Featurizer(pruned).transform(texts)
+
+    assert np.array_equal(full_sequences.offsets, pruned_sequences.offsets)
+    as_pruned = [pruned.key_to_index[WORDS[i]] for i in full_sequences.tokens]
+    assert pruned_sequences.tokens.tolist() == as_pruned
+
+
+def test_training_saves_and_removes_vocabulary(tmp_path, monkeypatch):
+    path = str(tmp_path / "{}_vocab.txt")
+    monkeypatch.setattr(vocabulary, "VOCAB_PATH", path)
+    monkeypatch.setattr(vocabulary, "load_model_embeddings", lambda info: store())
+
+    pruned = vocabulary.pruned_training_embeddings("emails", TEXTS, {}, vocab_size=2)
+    loaded = vocabulary.load_model_vocabulary("emails", {"gensin_model": "tiny"})
+
+    assert loaded.vectors is None
+    assert loaded.index_to_key == pruned.index_to_key
+    assert loaded.oov_words == pruned.oov_words
+    assert Featurizer(loaded).encode("bad plot unknown") == [2, 1]
+
+    full = vocabulary.pruned_training_embeddings("emails", TEXTS, {}, vocab_size=None)
+    assert full.index_to_key == WORDS
+    assert not os.path.exists(path.format("emails"))
@@ -0,0 +1,143 @@
+"""
+Micro-batching of concurrent requests.
+
+Calling a Keras model costs about the same for one row as for a few dozen, so
+single requests are queued and handed to the model together. A batch is run as
+soon as it reaches max_batch_size, or max_wait_ms after its first request
+arrived, whichever comes first.
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, Sequence
+
+import numpy as np
+
+LATENCY_WINDOW = 10_000
+
+
+class MicroBatcher:
+    def __init__(
+        self,
+        func: Callable[[list], Sequence],
+        max_batch_size: int = 64,
+        max_wait_ms: float = 5.0,
+    ):
+        self.func = func
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+
+        self._queue: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._closed = False
+
+        self._started_at = time.perf_counter()
+        self._items = 0
+        self._batches = 0
+        self._errors = 0
+        self._busy = 0.0
+        self._latencies: deque[float] = deque(maxlen=LATENCY_WINDOW)
+
+    def start(self) -> "MicroBatcher":
+        self._thread.start()
+        return self
+
+    def close(self):
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+
+    def submit(self, item) -> Future:
+        if self._closed:
+            raise RuntimeError("MicroBatcher is closed")
+
+        future: Future = Future()
+        self._queue.put((item, future, time.perf_counter()))
+        return future
+
+    def submit_many(self, items: Sequence) -> list[Future]:
+        return [self.submit(item) for item in items]
+
+    def _next_batch(self) -> list | None:
+        first = self._queue.get()
+        if first is None:
+            return None
+
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+
+            try:
+                entry = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+
+            if entry is None:
+                # Finish this batch, then stop
+                self._queue.put(None)
+                break
+
+            batch.append(entry)
+
+        return batch
+
+    def _run(self):
+        while (batch := self._next_batch()) is not None:
+            items = [item for item, _, _ in batch]
+            start = time.perf_counter()
+
+            try:
+                results = self.func(items)
+                if len(results) != len(batch):
+                    # zip would leave the futures past the end waiting forever
+                    raise RuntimeError(
+                        f"Batch function returned {len(results)} results "
+                        f"for {len(batch)} items"
+                    )
+            except Exception as e:
+                with self._lock:
+                    self._errors += len(batch)
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+
+            done = time.perf_counter()
+            for (_, future, _), result in zip(batch, results):
+                future.set_result(result)
+
+            with self._lock:
+                self._items += len(batch)
+                self._batches += 1
+                self._busy += done - start
+                self._latencies.extend(done - queued for _, _, queued in batch)
+
+    def stats(self) -> dict:
+        """
+        Throughput and latency counters since the batcher was created. The
+        latency percentiles cover the last LATENCY_WINDOW requests.
+        """
+        with self._lock:
+            uptime = time.perf_counter() - self._started_at
+            latencies = np.array(self._latencies) * 1000
+
+            return {
+                "uptime_s": uptime,
+                "requests": self._items,
+                "errors": self._errors,
+                "batches": self._batches,
+                "mean_batch_size": self._items / self._batches if self._batches else 0,
+                "throughput_per_s": self._items / uptime if uptime else 0,
+                "model_busy_s": self._busy,
+                "queued": self._queue.qsize(),
+                "latency_ms": {
+                    f"p{p}": float(np.percentile(latencies, p)) if len(latencies) else 0
+                    for p in [50, 95, 99]
+                },
+            }
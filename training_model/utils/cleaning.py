@@ -0,0 +1,170 @@
+import re
+import sys
+from typing import TYPE_CHECKING, Iterable
+
+from utils import profiling
+from utils.parallel import DEFAULT_CHUNK_SIZE, map_chunks
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+emoticon_meanings = {
+    " :)": "happy",
+    " :(": "sad",
+    " :D": "very happy",
+    " :|": "neutral",
+    " :O": "surprised",
+    " <3": "love",
+    " ;)": "wink",
+    " :P": "playful",
+    " :/": "confused",
+    " :*": "kiss",
+    " :')": "touched",
+    " XD": "laughing",
+    " :3": "cute",
+    " >:(": "angry",
+    " :-O": "shocked",
+    " :|]": "robot",
+    " :>": "sly",
+    " ^_^": "happy",
+    " O_o": "confused",
+    " :-|": "straight face",
+    " :X": "silent",
+    " B-)": "cool",
+    " <(‘.'<)": "dance",
+    " (-_-)": "bored",
+    " (>_<)": "upset",
+    " (¬‿¬)": "sarcastic",
+    " (o_o)": "surprised",
+    " (o.O)": "shocked",
+    " :0": "shocked",
+    " :*(": "crying",
+    " :v ": "pac-Man",
+    " (^_^)v ": "double victory",
+    " :-D": "big grin",
+    " :-*": "blowing a kiss",
+    " :^)": "nosey",
+    " :-((": "very sad",
+    " :-(": "frowning",
+}
+
+#########################
+# PRECOMPILED PATTERNS  #
+#########################
+
+LINKS_RE = re.compile(r"https?://\S+|www\.\S+")
+UNWANTED_CHARS_RE = re.compile(r"[^a-zA-Z#]")
+REPEATS_RE = re.compile(r"(.)\1{2,}")
+SHORT_WORDS_RE = re.compile(r"\b\w{1,2}\b")
+NUMBERS_RE = re.compile(r"(?<=\w)\d+|\d+(?=\w)")
+SPACES_RE = re.compile(r"\s+")
+
+# Fused variants, only valid once the text has been reduced to [a-zA-Z# ].
+# Collapsing runs of unwanted characters early is safe because every run of
+# whitespace gets collapsed to a single space at the end anyway, and short
+# words turn into spaces which are then merged with their neighbours.
+_UNWANTED_RUNS_RE = re.compile(r"[^a-zA-Z#]+")
+_SHORT_WORDS_AND_SPACES_RE = re.compile(r"(?:\b[a-zA-Z]{1,2}\b| )+")
+
+# All emoticons in a single alternation, scanned once per document. Alternatives
+# keep the order of emoticon_meanings, which is the precedence the old
+# replace-one-at-a-time loop had: when two emoticons start at the same place the
+# one listed first wins (" :*" beats " :*(", " :-((" beats " :-(").
+# Every emoticon starts with a space, so it is factored out of the alternation,
+# and the lookahead on the second character rejects ordinary words cheaply.
+_EMOTICON_STARTS = "".join(sorted({emoticon[1] for emoticon in emoticon_meanings}))
+EMOTICONS_RE = re.compile(
+    f" (?=[{re.escape(_EMOTICON_STARTS)}])(?:"
+    + "|".join(re.escape(emoticon[1:]) for emoticon in emoticon_meanings)
+    + ")"
+)
+_EMOTICON_REPLACEMENTS = {
+    emoticon: f" {meaning}" for emoticon, meaning in emoticon_meanings.items()
+}
+
+# " :v " and " (^_^)v " end in a space, so they can swallow the leading space of
+# an emoticon right after them. The old loop resolved that overlap by table
+# order rather than by position, so texts holding them keep the old path.
+_TRAILING_SPACE_EMOTICONS = (" :v", " (^_^)v")
+
+
+#############
+# FUNCTIONS #
+#############
+
+
+def _convert_emoticons_sequential(txt: str) -> str:
+    for emoticon, meaning in _EMOTICON_REPLACEMENTS.items():
+        if emoticon in txt:
+            txt = txt.replace(emoticon, meaning)
+
+    return txt
+
+
+def convert_emoticons(txt: str) -> str:
+    """
+    Replaces every emoticon in a piece of text with its meaning
+    """
+    if any(emoticon in txt for emoticon in _TRAILING_SPACE_EMOTICONS):
+        return _convert_emoticons_sequential(txt)
+
+    return EMOTICONS_RE.sub(lambda m: _EMOTICON_REPLACEMENTS[m.group()], txt)
+
+
+def clean_document(txt: str) -> str:
+    """
+    Cleans a single piece of text in one go. The output is identical to running
+    lowercase, remove_links, replace_emoticons, remove_unwanted_chars,
+    remove_repeats, remove_short_words, remove_numbers and remove_lots_space
+    one after the other.
+
+    Numbers are never present once unwanted characters are removed, so that
+    step is skipped entirely.
+    """
+    if not isinstance(txt, str):
+        return txt
+
+    txt = LINKS_RE.sub("", txt.lower())
+    txt = convert_emoticons(txt)
+    txt = _UNWANTED_RUNS_RE.sub(" ", txt)
+    txt = REPEATS_RE.sub(r"\1", txt)
+    return _SHORT_WORDS_AND_SPACES_RE.sub(" ", txt)
+
+
+def _clean_chunk(chunk: list[str]) -> list[str]:
+    # Timed in the worker, so the profile shows cleaning apart from the
+    # overhead of the process pool. benchmarks.cleaning_steps times each step.
+    with profiling.tally("clean_text/documents", rows=len(chunk)):
+        return [clean_document(txt) for txt in chunk]
+
+
+def clean_texts(
+    content: "pd.Series | Iterable[str]",
+    progress: bool = True,
+    workers: int | None = 1,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> "pd.Series | list[str]":
+    """
+    Cleans a batch of texts. A Series keeps its index and name, any other
+    iterable is returned as a list.
+
+    With more than one worker the texts are split into chunks of chunk_size
+    rows and cleaned in a process pool. None or 0 workers uses every core.
+    """
+    content_list = list(content)
+    with profiling.span("clean_text", rows=len(content_list)):
+        cleaned = map_chunks(
+            _clean_chunk,
+            content_list,
+            workers=workers,
+            chunk_size=chunk_size,
+            desc="[i] Cleaning text" if progress else None,
+        )
+
+    # Only a caller that loaded pandas can pass a Series, scoring text alone
+    # never imports it
+    pd = sys.modules.get("pandas")
+    if pd is not None and isinstance(content, pd.Series):
+        return pd.Series(cleaned, index=content.index, name=content.name)
+
+    return cleaned
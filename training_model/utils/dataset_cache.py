@@ -0,0 +1,135 @@
+"""
+On disk cache of featurized datasets.
+
+Featurizing hundreds of thousands of documents is the same work for every
+hyperparameter trial, for the search and the final training run, and for every
+rerun of main.py. The result is written once as memory mapped int32 tokens,
+int64 offsets and the labels, under a key hashed from the cleaned text, the
+labels, the embedding vocabulary and max_text_len.
+"""
+
+import hashlib
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+from numpy.typing import NDArray
+
+from utils.featurizer import Featurizer, TokenSequences
+
+CACHE_DIR = "./datasets/cache"
+
+TOKENS_FILE = "tokens.npy"
+OFFSETS_FILE = "offsets.npy"
+LABELS_FILE = "labels.npy"
+
+
+def dataset_key(
+    texts: pd.Series, labels: pd.Series, embedding_model, max_text_len: int
+) -> str:
+    digest = hashlib.sha256()
+    digest.update(f"max_text_len={max_text_len}\n".encode())
+    digest.update("\n".join(embedding_model.index_to_key).encode())
+    # Words a pruned vocabulary maps to its OOV index, full vocabularies have none
+    oov_words = getattr(embedding_model, "oov_words", None)
+    if oov_words:
+        digest.update(b"\0oov\0" + "\n".join(oov_words).encode())
+
+    for txt in texts:
+        digest.update(b"\0")
+        if isinstance(txt, str):
+            digest.update(txt.encode("utf-8", errors="surrogatepass"))
+
+    digest.update(np.ascontiguousarray(labels.to_numpy()).tobytes())
+
+    return digest.hexdigest()[:32]
+
+
+def load_cached(path: str) -> tuple[TokenSequences, NDArray]:
+    """
+    Opens a cache entry as memory mapped sequences and labels. Every process
+    opening the same entry shares its pages.
+    """
+    sequences = TokenSequences(
+        np.load(os.path.join(path, TOKENS_FILE), mmap_mode="r"),
+        np.load(os.path.join(path, OFFSETS_FILE), mmap_mode="r"),
+    )
+    return sequences, np.load(os.path.join(path, LABELS_FILE), mmap_mode="r")
+
+
+def cache_features(
+    texts: pd.Series, labels: pd.Series, embedding_model, max_text_len: int
+) -> str:
+    """
+    Featurizes texts, truncated to max_text_len, unless a previous run already
+    did it for identical inputs. Returns the path of the cache entry.
+    """
+    print("[i] Hashing dataset")
+    key = dataset_key(texts, labels, embedding_model, max_text_len)
+    path = os.path.join(CACHE_DIR, key)
+
+    if os.path.isdir(path):
+        print(f"[i] Using cached features from {path}")
+        return path
+
+    featurizer = Featurizer(embedding_model)
+    sequences = featurizer.transform(texts, "Embedding text").truncate(max_text_len)
+
+    # Write to a temporary directory first so a crash never leaves a half
+    # written entry behind
+    tmp_path = f"{path}.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    np.save(os.path.join(tmp_path, TOKENS_FILE), sequences.tokens)
+    np.save(os.path.join(tmp_path, OFFSETS_FILE), sequences.offsets)
+    np.save(os.path.join(tmp_path, LABELS_FILE), labels.to_numpy())
+    os.replace(tmp_path, path)
+
+    print(f"[i] Features cached to {path}")
+    return path
+
+
+def cached_sequences(
+    texts: pd.Series, labels: pd.Series, embedding_model, max_text_len: int
+) -> tuple[TokenSequences, NDArray]:
+    """
+    Featurizes texts, truncated to max_text_len, reusing a previous run when
+    the inputs are identical. Returns memory mapped sequences and labels.
+    """
+    return load_cached(cache_features(texts, labels, embedding_model, max_text_len))
+
+
+def split_rows(
+    n: int, limit: int | None = None, test_size: float = 0.05
+) -> tuple[NDArray[np.int64], NDArray[np.int64]]:
+    """
+    Splits the row numbers of the first limit rows into train and test rows
+    """
+    from sklearn.model_selection import train_test_split
+
+    rows = np.arange(n if limit is None else min(limit, n))
+
+    print("[i] Splitting test and train")
+    train_rows, test_rows = train_test_split(rows, test_size=test_size)
+    return train_rows, test_rows
+
+
+def train_test_split_sequences(
+    sequences: TokenSequences,
+    labels: NDArray,
+    limit: int | None = None,
+    test_size: float = 0.05,
+) -> tuple[TokenSequences, TokenSequences, NDArray, NDArray]:
+    """
+    Splits the first limit rows into train and test sets
+    """
+    train_rows, test_rows = split_rows(len(sequences), limit, test_size)
+
+    return (
+        sequences.take(train_rows),
+        sequences.take(test_rows),
+        np.asarray(labels[train_rows]),
+        np.asarray(labels[test_rows]),
+    )
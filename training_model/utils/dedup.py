@@ -0,0 +1,197 @@
+"""
+Exact and near-duplicate detection for text.
+
+Texts are compared as their lowercase words, so whitespace, punctuation and
+case never tell two copies apart. Exact duplicates share a 64 bit BLAKE2 hash
+of those words, and of a context string such as the headers of an email when
+one is given.
+
+Near duplicates, like forwarded copies or replies quoting a whole message,
+are found with MinHash and LSH. Every text becomes a signature: the minimum
+of NUM_PERM hash functions over its 3 word shingles, computed for a whole
+batch of texts at once with NumPy. The share of equal
+positions in two signatures estimates the Jaccard similarity of their
+shingle sets. Signatures are cut into BANDS bands, and texts with an
+identical band land in the same bucket. Within each bucket, every text is
+compared with the bucket's earliest text and dropped when the estimated
+similarity reaches the threshold. That is one vectorized comparison per
+candidate instead of comparing every pair. Texts shorter than a shingle have
+no signature and are never near duplicates, and with groups only texts of the
+same group are compared.
+
+The first copy of anything is always the one kept. Appending texts never
+changes which earlier texts are kept.
+"""
+
+import hashlib
+import re
+import zlib
+from typing import Iterable
+
+import numpy as np
+from numpy.typing import NDArray
+
+NUM_PERM = 64
+BANDS = 16
+SHINGLE_WORDS = 3
+DEFAULT_THRESHOLD = 0.8
+
+# Signature of texts without a shingle. A real minimum over NUM_PERM hashes
+# is practically never the largest value.
+EMPTY = np.iinfo(np.uint32).max
+
+# Rows of signatures compared at a time
+COMPARE_BLOCK = 100_000
+
+# Multiply-shift hash functions, fixed so that signatures agree between runs
+# and worker processes
+_rng = np.random.default_rng(20_011)
+_A = _rng.integers(1, 2**63, NUM_PERM, dtype=np.uint64) | np.uint64(1)
+_B = _rng.integers(0, 2**63, NUM_PERM, dtype=np.uint64)
+_SHINGLE_MIX = np.array([0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 1], dtype=np.uint64)
+
+WORD = re.compile(r"[a-z0-9]+")
+
+
+def _fmix(x: NDArray[np.uint64]) -> NDArray[np.uint64]:
+    """
+    MurmurHash3's 64 bit finalizer. Multiply-shift hashing of the linear
+    shingle mix alone underestimates similarity.
+    """
+    for multiplier in [0xFF51AFD7ED558CCD, 0xC4CEB9FE1A85EC53]:
+        x = (x ^ (x >> np.uint64(33))) * np.uint64(multiplier)
+    return x ^ (x >> np.uint64(33))
+
+
+def words(txt: str) -> list[str]:
+    return WORD.findall(txt.lower())
+
+
+def key_hash(key: str) -> int:
+    digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little", signed=True)
+
+
+def exact_hash(tokens: list[str], context: str = "") -> int:
+    # Words never hold a newline, so the context cannot run into them
+    return key_hash(f"{context}\n{' '.join(tokens)}")
+
+
+def minhash(token_lists: list[list[str]]) -> NDArray[np.uint32]:
+    """
+    Signatures of a batch of texts, one row each. Texts shorter than a
+    shingle get the EMPTY signature.
+    """
+    lengths = np.array([len(tokens) for tokens in token_lists], dtype=np.int64)
+    offsets = np.zeros(len(token_lists) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+
+    token_hashes = np.fromiter(
+        (zlib.crc32(word.encode()) for tokens in token_lists for word in tokens),
+        dtype=np.uint64,
+        count=offsets[-1],
+    )
+
+    # One shingle per position that starts a full shingle
+    shingles = np.maximum(lengths - SHINGLE_WORDS + 1, 0)
+    texts = np.repeat(np.arange(len(token_lists)), shingles)
+    first = np.zeros(len(token_lists) + 1, dtype=np.int64)
+    np.cumsum(shingles, out=first[1:])
+    positions = offsets[texts] + np.arange(first[-1]) - first[texts]
+
+    mixed = np.zeros(len(positions), dtype=np.uint64)
+    for i, factor in enumerate(_SHINGLE_MIX):
+        mixed += token_hashes[positions + i] * factor
+    mixed = _fmix(mixed)
+
+    # Filled one hash function (row) at a time, then turned into a row per text
+    signatures = np.full((NUM_PERM, len(token_lists)), EMPTY, dtype=np.uint32)
+    nonempty = shingles > 0
+    if nonempty.any():
+        starts = first[:-1][nonempty]
+        for k in range(NUM_PERM):
+            permuted = (mixed * _A[k] + _B[k]) >> np.uint64(32)
+            signatures[k, nonempty] = np.minimum.reduceat(permuted, starts)
+
+    return np.ascontiguousarray(signatures.T)
+
+
+def text_keys(
+    texts: Iterable[str | None], contexts: Iterable[str] | None = None
+) -> tuple[NDArray[np.int64], NDArray[np.uint32]]:
+    """
+    The exact hashes and MinHash signatures of a batch of texts. Missing
+    texts count as empty. Only the exact hashes include the contexts.
+    """
+    token_lists = [words(txt) if isinstance(txt, str) else [] for txt in texts]
+    contexts = [""] * len(token_lists) if contexts is None else list(contexts)
+    hashes = np.array(
+        [exact_hash(tokens, context) for tokens, context in zip(token_lists, contexts)],
+        dtype=np.int64,
+    )
+    return hashes, minhash(token_lists)
+
+
+def _band_keys(band: NDArray[np.uint32]) -> NDArray[np.uint64]:
+    """
+    One number per row of a band. Colliding rows are only compared, so a
+    rare false collision costs one comparison.
+    """
+    keys = np.zeros(len(band), dtype=np.uint64)
+    for column in band.T:
+        keys = keys * np.uint64(1_000_003) + column
+    return keys
+
+
+def duplicate_rows(
+    hashes: NDArray[np.int64],
+    signatures: NDArray[np.uint32],
+    threshold: float = DEFAULT_THRESHOLD,
+    groups: NDArray[np.int64] | None = None,
+) -> tuple[NDArray[np.bool_], NDArray[np.bool_]]:
+    """
+    Flags exact and near duplicates of earlier rows, see the module docstring.
+    signatures can be a memory map, it is read a band and a block at a time.
+    With groups, one number per row, a row is only a near duplicate of a row
+    of its group. Returns the exact and the near duplicate masks, which never
+    overlap.
+    """
+    n = len(hashes)
+    _, first = np.unique(hashes, return_index=True)
+    exact = np.ones(n, dtype=bool)
+    exact[first] = False
+
+    near = np.zeros(n, dtype=bool)
+    candidates = np.sort(first)
+    candidates = candidates[np.asarray(signatures[candidates, 0]) != EMPTY]
+    groups = np.zeros(n, dtype=np.int64) if groups is None else np.asarray(groups)
+    rows_per_band = NUM_PERM // BANDS
+
+    for band in range(BANDS):
+        columns = slice(band * rows_per_band, (band + 1) * rows_per_band)
+        keys = _band_keys(np.asarray(signatures[candidates, columns]))
+        keys = keys * np.uint64(1_000_003) + groups[candidates].astype(np.uint64)
+
+        # Stable, so the first row of every bucket is its earliest
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        starts = np.ones(len(order), dtype=bool)
+        starts[1:] = sorted_keys[1:] != sorted_keys[:-1]
+        leader_positions = np.maximum.accumulate(np.where(starts, np.arange(len(order)), 0))
+
+        rows = candidates[order[~starts]]
+        leaders = candidates[order[leader_positions[~starts]]]
+        unflagged = ~near[rows]
+        rows, leaders = rows[unflagged], leaders[unflagged]
+
+        for start in range(0, len(rows), COMPARE_BLOCK):
+            block_rows = rows[start : start + COMPARE_BLOCK]
+            block_leaders = leaders[start : start + COMPARE_BLOCK]
+            similarity = (
+                np.asarray(signatures[block_rows]) == np.asarray(signatures[block_leaders])
+            ).mean(axis=1)
+            # Keys of different groups can collide
+            same_group = groups[block_rows] == groups[block_leaders]
+            near[block_rows[(similarity >= threshold) & same_group]] = True
+
+    return exact, near
@@ -0,0 +1,114 @@
+"""
+Local, memory mapped word embedding store.
+
+gensim.downloader.load parses the whole GloVe text model (and needs the network
+the first time) on every run. Instead, the vectors are converted once into a
+float32 .npy matrix, opened with mmap so that processes share the same pages,
+plus a vocabulary file holding one word per line in index order.
+
+Convert a model ahead of time with:
+
+    python -m utils.embeddings glove-wiki-gigaword-100
+"""
+
+import os
+import sys
+
+import numpy as np
+
+DEFAULT_EMBEDDINGS = "glove-wiki-gigaword-100"
+EMBEDDINGS_DIR = "./models/embeddings"
+
+VECTORS_FILE = "vectors.npy"
+VOCAB_FILE = "vocab.txt"
+
+
+class EmbeddingStore:
+    """
+    Read only stand-in for gensim's KeyedVectors, exposing the parts used by
+    the training and inference code: vectors, key_to_index and `in`. Pruned
+    vocabularies (see utils.vocabulary) also have an OOV index, which the words
+    in oov_words map to, and no vectors once loaded back for inference.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        vectors: np.ndarray | None,
+        index_to_key: list[str],
+        oov_index: int | None = None,
+        oov_words: list[str] | None = None,
+    ):
+        self.name = name
+        self.vectors = vectors
+        self.index_to_key = index_to_key
+        self.key_to_index = dict.fromkeys(oov_words or [], oov_index)
+        self.key_to_index.update((word, i) for i, word in enumerate(index_to_key))
+        self.oov_index = oov_index
+        self.oov_words = oov_words or []
+
+    def __contains__(self, word: str) -> bool:
+        return word in self.key_to_index
+
+    def __len__(self) -> int:
+        return len(self.index_to_key)
+
+
+def store_path(name: str) -> str:
+    return os.path.join(EMBEDDINGS_DIR, name)
+
+
+def build_embedding_store(name: str = DEFAULT_EMBEDDINGS) -> str:
+    """
+    Downloads a gensim model and writes it to the local store
+    """
+    import gensim.downloader
+
+    print(f"[i] Converting {name} into a local embedding store")
+    model = gensim.downloader.load(name)
+
+    path = store_path(name)
+    os.makedirs(path, exist_ok=True)
+
+    # Write to temporary names first so a crash never leaves a half written store
+    vectors_tmp = os.path.join(path, "vectors.tmp.npy")
+    vocab_tmp = os.path.join(path, "vocab.tmp.txt")
+
+    np.save(vectors_tmp, np.asarray(model.vectors, dtype=np.float32))  # pyright: ignore
+    with open(vocab_tmp, "w", encoding="utf-8") as f:
+        f.write("\n".join(model.index_to_key))  # pyright: ignore
+
+    os.replace(vectors_tmp, os.path.join(path, VECTORS_FILE))
+    os.replace(vocab_tmp, os.path.join(path, VOCAB_FILE))
+
+    return path
+
+
+def load_embeddings(name: str = DEFAULT_EMBEDDINGS) -> EmbeddingStore:
+    """
+    Opens an embedding store, converting the gensim model the first time
+    """
+    path = store_path(name)
+    vectors_path = os.path.join(path, VECTORS_FILE)
+    vocab_path = os.path.join(path, VOCAB_FILE)
+
+    if not (os.path.exists(vectors_path) and os.path.exists(vocab_path)):
+        build_embedding_store(name)
+
+    vectors = np.load(vectors_path, mmap_mode="r")
+    with open(vocab_path, "r", encoding="utf-8") as f:
+        index_to_key = f.read().split("\n")
+
+    return EmbeddingStore(name, vectors, index_to_key)
+
+
+def load_model_embeddings(model_info: dict) -> EmbeddingStore:
+    """
+    Opens the embedding store a trained model was built with
+    """
+    return load_embeddings(model_info.get("gensin_model", DEFAULT_EMBEDDINGS))
+
+
+if __name__ == "__main__":
+    for name in sys.argv[1:] or [DEFAULT_EMBEDDINGS]:
+        print(f"[i] Store written to {build_embedding_store(name)}")
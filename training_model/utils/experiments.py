@@ -0,0 +1,165 @@
+"""
+Ax experiments saved to disk, so a search survives crashes and later searches
+can build on earlier ones.
+
+Checkpoints live in ./models/experiments/<dataset>/<dataset key>/, where the
+dataset key is the key of the featurized dataset cache. Two experiments share
+a directory only when their cleaned data, vocabulary and max_text_len match.
+The running experiment is current.json, rewritten after every trial.
+
+- resume reloads current.json and continues it. Trials that were running when
+  the process died are abandoned, and Ax suggests new ones in their place.
+- warm start begins a new experiment seeded with the completed trials of every
+  earlier experiment in the directory. Ax then needs fewer random trials before
+  it starts modelling. Only trials trained on the full data are seeds: pruned
+  trials stopped on low fidelity values, and seeds of an earlier warm start are
+  already in the experiment they came from.
+
+A new experiment archives the previous current.json in the same directory,
+named after its modification time in nanoseconds.
+"""
+
+import glob
+import os
+
+import pandas as pd
+
+EXPERIMENTS_DIR = "./models/experiments"
+CHECKPOINT_FILE = "current.json"
+
+# Abandon reason of trials that were running when a resumed search died
+INTERRUPTED = "interrupted"
+
+
+def experiment_dir(dataset: str, cache_path: str) -> str:
+    return os.path.join(EXPERIMENTS_DIR, dataset, os.path.basename(cache_path))
+
+
+def save_checkpoint(ax_client, path: str):
+    # Write next to the checkpoint first, a crash mid write keeps the old one
+    tmp_path = f"{path}.tmp"
+    ax_client.save_to_json_file(filepath=tmp_path)
+    os.replace(tmp_path, path)
+
+
+def is_full_fidelity(trial) -> bool:
+    """
+    Whether a trial was trained in full by its own experiment. Pruned trials
+    are abandoned (see utils.search), seeds were trained by another experiment.
+    """
+    return trial.status.is_completed and not trial.run_metadata.get("warm_start")
+
+
+def archive_path(directory: str, mtime_ns: int) -> str:
+    """
+    A free file name for an archived experiment. File times are coarser than
+    nanoseconds, so two experiments can still share one.
+    """
+    path = os.path.join(directory, f"{mtime_ns}.json")
+    copy = 0
+    while os.path.exists(path):
+        copy += 1
+        path = os.path.join(directory, f"{mtime_ns}-{copy}.json")
+    return path
+
+
+def previous_results(directory: str, metric_names: list[str]) -> list[tuple[dict, dict]]:
+    """
+    Parameters and results of every full fidelity trial saved in directory
+    """
+    from ax.service.ax_client import AxClient
+
+    results = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.json"))):
+        previous = AxClient.load_from_json_file(filepath=path, verbose_logging=False)
+
+        for row in previous.get_trials_data_frame().to_dict("records"):
+            trial = previous.experiment.trials[row["trial_index"]]
+            if not is_full_fidelity(trial):
+                continue
+            if any(pd.isna(row.get(metric)) for metric in metric_names):
+                continue
+
+            raw_data = {metric: (float(row[metric]), 0) for metric in metric_names}
+            results.append((trial.arm.parameters, raw_data))  # pyright: ignore
+
+    return results
+
+
+def open_experiment(
+    dataset: str,
+    cache_path: str,
+    parameters: list[dict],
+    objectives: dict,
+    workers: int = 1,
+    resume: bool = False,
+    warm_start: bool = False,
+):
+    """
+    Creates or resumes the experiment of a dataset. Returns the Ax client, the
+    checkpoint path to pass to run_search and how many trials it already ran.
+    """
+    from ax.service.ax_client import AxClient
+    from ax.service.utils.instantiation import InstantiationBase
+
+    directory = experiment_dir(dataset, cache_path)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, CHECKPOINT_FILE)
+
+    if resume and os.path.exists(path):
+        print(f"[i] Resuming experiment from {path}")
+        ax_client = AxClient.load_from_json_file(filepath=path)
+
+        # Pruned trials are abandoned too, but they ran and count as done
+        done = 0
+        for trial in ax_client.experiment.trials.values():
+            if trial.status.is_running:
+                ax_client.abandon_trial(trial_index=trial.index, reason=INTERRUPTED)
+            elif trial.abandoned_reason != INTERRUPTED and not trial.run_metadata.get(
+                "warm_start"
+            ):
+                done += 1
+
+        save_checkpoint(ax_client, path)
+        return ax_client, path, done
+
+    if os.path.exists(path):
+        archived = archive_path(directory, os.stat(path).st_mtime_ns)
+        os.replace(path, archived)
+        print(f"[i] Previous experiment archived to {archived}")
+
+    seeds = []
+    if warm_start:
+        # Seeds outside the current search space cannot be attached
+        search_space = InstantiationBase.make_search_space(parameters, None)
+        seeds = [
+            seed
+            for seed in previous_results(directory, list(objectives))
+            if search_space.check_membership(seed[0])
+        ]
+
+    ax_client = AxClient()
+
+    # create the experiment. Ax may suggest as many trials at once as there
+    # are workers to run them, and skips random trials for every seed.
+    ax_client.create_experiment(
+        name=f"{dataset}_experiment",
+        parameters=parameters,
+        objectives=objectives,
+        choose_generation_strategy_kwargs={
+            "max_parallelism_override": workers,
+            "num_completed_initialization_trials": len(seeds),
+        },
+    )
+
+    for trial_parameters, raw_data in seeds:
+        _, trial_index = ax_client.attach_trial(
+            trial_parameters, run_metadata={"warm_start": True}
+        )
+        ax_client.complete_trial(trial_index=trial_index, raw_data=raw_data)
+
+    if warm_start:
+        print(f"[i] Warm started with {len(seeds)} earlier trials")
+
+    save_checkpoint(ax_client, path)
+    return ax_client, path, 0
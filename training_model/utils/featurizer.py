@@ -0,0 +1,154 @@
+"""
+Turns cleaned text into embedding indices.
+
+Documents are stored CSR style: one flat int32 array holding every token id and
+an offsets array where document i spans tokens[offsets[i]:offsets[i + 1]].
+That is far smaller than a Python list per document and can be padded straight
+into a preallocated array.
+"""
+
+from array import array
+from typing import Iterable
+
+import numpy as np
+from numpy.typing import NDArray
+from tqdm import tqdm
+
+from utils import profiling
+
+
+class TokenSequences:
+    """
+    Ragged batch of token id sequences
+    """
+
+    def __init__(self, tokens: NDArray[np.int32], offsets: NDArray[np.int64]):
+        self.tokens = tokens
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> NDArray[np.int32]:
+        return self.tokens[self.offsets[i] : self.offsets[i + 1]]
+
+    def lengths(self) -> NDArray[np.int64]:
+        return np.diff(self.offsets)
+
+    def take(self, rows: NDArray[np.integer]) -> "TokenSequences":
+        """
+        Selects a subset of documents, in the given order
+        """
+        lengths = self.lengths()[rows]
+        offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+
+        starts = np.repeat(self.offsets[rows] - offsets[:-1], lengths)
+        tokens = self.tokens[starts + np.arange(offsets[-1])]
+
+        return TokenSequences(tokens, offsets)
+
+    def _last_tokens(self, maxlen: int):
+        """
+        Locates the last (at most) maxlen tokens of every document. Returns how
+        many are kept per document, their row, their position within the kept
+        tokens and their position in self.tokens.
+        """
+        kept = np.minimum(self.lengths(), maxlen)
+
+        rows = np.repeat(np.arange(len(self)), kept)
+        first_kept = np.zeros(len(self) + 1, dtype=np.int64)
+        np.cumsum(kept, out=first_kept[1:])
+        within = np.arange(first_kept[-1]) - np.repeat(first_kept[:-1], kept)
+        sources = np.repeat(self.offsets[1:] - kept, kept) + within
+
+        return kept, rows, within, sources
+
+    def truncate(self, maxlen: int) -> "TokenSequences":
+        """
+        Keeps only the last maxlen tokens of every document, which is all that
+        pad ever uses
+        """
+        kept, _, _, sources = self._last_tokens(maxlen)
+        offsets = np.zeros(len(self) + 1, dtype=np.int64)
+        np.cumsum(kept, out=offsets[1:])
+
+        return TokenSequences(self.tokens[sources], offsets)
+
+    def pad(self, maxlen: int | None = None, value: int = 0) -> NDArray[np.int32]:
+        """
+        Pads into a (documents, maxlen) array. Like keras' pad_sequences with its
+        defaults, padding and truncation both happen at the start and a missing
+        maxlen means the longest document.
+        """
+        if maxlen is None:
+            maxlen = int(self.lengths().max()) if len(self) else 0
+
+        with profiling.tally("pad", rows=len(self)):
+            kept, rows, within, sources = self._last_tokens(maxlen)
+            padded = np.full((len(self), maxlen), value, dtype=np.int32)
+            padded[rows, np.repeat(maxlen - kept, kept) + within] = self.tokens[sources]
+
+        return padded
+
+
+class SequenceRows:
+    """
+    Some rows of a TokenSequences, in the given order, without copying their
+    tokens. take and pad only copy the rows they return, so a batch gathered
+    from memory mapped tokens costs the batch and not the whole selection.
+    """
+
+    def __init__(self, sequences: "TokenSequences | SequenceRows", rows: NDArray):
+        self.sequences = sequences
+        self.rows = np.asarray(rows, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def lengths(self) -> NDArray[np.int64]:
+        return self.sequences.lengths()[self.rows]
+
+    def take(self, rows: NDArray[np.integer]) -> TokenSequences:
+        return self.sequences.take(self.rows[rows])
+
+    def pad(self, maxlen: int | None = None, value: int = 0) -> NDArray[np.int32]:
+        return self.take(np.arange(len(self))).pad(maxlen, value)
+
+
+class Featurizer:
+    """
+    Maps cleaned text onto the indices of an embedding model, dropping words
+    that are not in its vocabulary. Pruned vocabularies map the words they
+    dropped to their OOV index, see utils.vocabulary.
+    """
+
+    def __init__(self, embedding_model):
+        self.key_to_index: dict[str, int] = embedding_model.key_to_index
+
+    def encode(self, txt: str) -> list[int]:
+        get = self.key_to_index.get
+        return [i for i in map(get, txt.split(" ")) if i is not None]
+
+    def transform(
+        self, texts: Iterable[str], desc: str | None = None
+    ) -> TokenSequences:
+        """
+        Encodes a batch of texts. Pass desc to show a progress bar
+        """
+        tokens = array("i")
+        offsets = array("q", [0])
+
+        iterator = tqdm(texts, desc) if desc else texts
+        with profiling.span("featurize") as span:
+            for txt in iterator:
+                if isinstance(txt, str):
+                    tokens.extend(self.encode(txt))
+                offsets.append(len(tokens))
+
+            span.rows = len(offsets) - 1
+
+        return TokenSequences(
+            np.frombuffer(tokens, dtype=np.int32),
+            np.frombuffer(offsets, dtype=np.int64),
+        )
@@ -0,0 +1,201 @@
+"""
+Sender to recipient sentiment graph of labelled emails, for the web app's
+Neo4j database.
+
+Addresses are interned into an AddressTable: every distinct address gets an
+int32 id, in sorted order so that comparing ids compares addresses. The From
+and To lists of every message are flattened CSR style (one array of ids and an
+offsets array, see utils.featurizer) and crossed into one (sender, recipient)
+pair per recipient. Pairs are then grouped with a single np.unique over a
+64 bit key, counting emails and averaging sentiment per pair without a Python
+loop over messages.
+
+Like the data pipeline, edges are undirected by default: a pair is ordered
+with the lower address first, so a -> b and b -> a add to the same edge.
+
+The labelled emails hold VADER compound scores in [-1, 1]. They are scaled to
+[0, 1] before averaging, as clean_emails does for training, because the web
+app colours and buckets edges on that scale. Nodes, relationships and the
+sentiment scale match the data pipeline's graph, but its sentiment is the
+model's prediction and this one is the VADER label.
+
+The graph is written as CSV files for neo4j-admin's offline import, which
+builds the database in one pass instead of one MERGE query per edge:
+
+    neo4j-admin database import full --nodes=Project=projects.csv \\
+        --nodes=User=users.csv --relationships=OWNS=owns.csv \\
+        --relationships=SENTIMENT=sentiment.csv <database>
+"""
+
+import os
+from itertools import chain
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+from numpy.typing import NDArray
+
+from utils import profiling
+
+GRAPH_DIR = "./graph"
+
+
+class AddressTable:
+    """
+    Interned addresses, id i stands for addresses[i]
+    """
+
+    def __init__(self, addresses: NDArray[np.object_]):
+        self.addresses = addresses
+
+    def __len__(self) -> int:
+        return len(self.addresses)
+
+    def __getitem__(self, i: int) -> str:
+        return self.addresses[i]
+
+    def ids(self, addresses: Iterable[str]) -> NDArray[np.int32]:
+        """
+        Ids of addresses, -1 for the ones not in the table
+        """
+        return pd.Index(self.addresses).get_indexer(list(addresses)).astype(np.int32)
+
+
+def flatten(column: Iterable) -> tuple[list[str], NDArray[np.int64]]:
+    """
+    The addresses of a column of address lists, and the offsets where row i
+    spans addresses[offsets[i]:offsets[i + 1]]
+    """
+    column = list(column)
+    offsets = np.zeros(len(column) + 1, dtype=np.int64)
+    np.cumsum([len(addresses) for addresses in column], out=offsets[1:])
+    return list(chain.from_iterable(column)), offsets
+
+
+def intern_addresses(
+    *columns: Iterable,
+) -> tuple[AddressTable, list[tuple[NDArray[np.int32], NDArray[np.int64]]]]:
+    """
+    Builds the address table of some address list columns. Returns it with
+    every column as an array of ids and its offsets.
+    """
+    flattened = [flatten(column) for column in columns]
+    codes, addresses = pd.factorize(
+        np.array(list(chain.from_iterable(values for values, _ in flattened)), dtype=object),
+        sort=True,
+    )
+    codes = codes.astype(np.int32)
+
+    split = np.cumsum([len(values) for values, _ in flattened])[:-1]
+    return AddressTable(np.asarray(addresses, dtype=object)), [
+        (ids, offsets) for ids, (_, offsets) in zip(np.split(codes, split), flattened)
+    ]
+
+
+def cross_pairs(
+    senders: NDArray[np.int32],
+    sender_offsets: NDArray[np.int64],
+    recipients: NDArray[np.int32],
+    recipient_offsets: NDArray[np.int64],
+) -> tuple[NDArray[np.int32], NDArray[np.int32], NDArray[np.int64]]:
+    """
+    Every (sender, recipient) pair of every message. Returns the senders,
+    recipients and message row of each pair.
+    """
+    rows = np.repeat(np.arange(len(sender_offsets) - 1), np.diff(sender_offsets))
+    per_sender = np.diff(recipient_offsets)[rows]
+
+    first = np.zeros(len(rows) + 1, dtype=np.int64)
+    np.cumsum(per_sender, out=first[1:])
+    within = np.arange(first[-1]) - np.repeat(first[:-1], per_sender)
+
+    return (
+        np.repeat(senders, per_sender),
+        recipients[np.repeat(recipient_offsets[rows], per_sender) + within],
+        np.repeat(rows, per_sender),
+    )
+
+
+def sentiment_edges(
+    df: pd.DataFrame, directed: bool = False
+) -> tuple[AddressTable, pd.DataFrame]:
+    """
+    Emails sent and mean sentiment per pair of addresses, from labelled emails
+    with From and To address lists. Returns the address table and one row per
+    edge with the ids of both ends.
+    """
+    df = df.dropna(subset=["sentiment"])
+
+    with profiling.span("graph/edges", rows=len(df)):
+        table, [(senders, sender_offsets), (recipients, recipient_offsets)] = (
+            intern_addresses(df["From"], df["To"])
+        )
+        start, end, rows = cross_pairs(senders, sender_offsets, recipients, recipient_offsets)
+        if not directed:
+            start, end = np.minimum(start, end), np.maximum(start, end)
+
+        keys, inverse, counts = np.unique(
+            (start.astype(np.int64) << 32) | end, return_inverse=True, return_counts=True
+        )
+        sentiment = (df["sentiment"].to_numpy(dtype=np.float64)[rows] + 1) / 2
+        sums = np.bincount(inverse, weights=sentiment, minlength=len(keys))
+
+    edges = pd.DataFrame(
+        {
+            "from": (keys >> 32).astype(np.int32),
+            "to": (keys & 0xFFFFFFFF).astype(np.int32),
+            "emails_sent": counts,
+            "sentiment": sums / np.maximum(counts, 1),
+        }
+    )
+    return table, edges
+
+
+def write_neo4j_import(
+    table: AddressTable, edges: pd.DataFrame, project: str, output_dir: str
+) -> list[str]:
+    """
+    Writes the project, its users and their sentiment edges as neo4j-admin
+    import files, with the labels and properties the data pipeline uses.
+    Returns their paths.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    paths = {
+        name: os.path.join(output_dir, f"{name}.csv")
+        for name in ["projects", "users", "owns", "sentiment"]
+    }
+
+    # Senders of messages without recipients have no edge but are users all the same
+    user_ids = np.arange(len(table), dtype=np.int32)
+
+    with profiling.span("graph/write", rows=len(edges)):
+        pd.DataFrame({"datasetName:ID(Project)": [project]}).to_csv(
+            paths["projects"], index=False
+        )
+        pd.DataFrame({":ID(User)": user_ids, "email": table.addresses}).to_csv(
+            paths["users"], index=False
+        )
+        pd.DataFrame({":START_ID(Project)": project, ":END_ID(User)": user_ids}).to_csv(
+            paths["owns"], index=False
+        )
+        edges.rename(
+            columns={
+                "from": ":START_ID(User)",
+                "to": ":END_ID(User)",
+                "sentiment": "sentiment:double",
+                "emails_sent": "emailsSent:long",
+            }
+        )[
+            [":START_ID(User)", ":END_ID(User)", "sentiment:double", "emailsSent:long"]
+        ].to_csv(paths["sentiment"], index=False)
+
+    return list(paths.values())
+
+
+def import_command(paths: list[str], database: str = "neo4j") -> str:
+    projects, users, owns, sentiment = paths
+    return (
+        f"neo4j-admin database import full --nodes=Project={projects} "
+        f"--nodes=User={users} --relationships=OWNS={owns} "
+        f"--relationships=SENTIMENT={sentiment} {database}"
+    )
@@ -0,0 +1,132 @@
+import json
+from typing import TYPE_CHECKING
+
+import numpy as np
+from numpy.typing import NDArray
+
+from utils import profiling
+from utils.cleaning import clean_texts
+from utils.featurizer import Featurizer, TokenSequences
+from utils.input_pipeline import bucket_batches
+from utils.prediction_cache import DEFAULT_CACHE_SIZE, PredictionCache, model_identity
+from utils.tflite import TFLiteModel
+from utils.vocabulary import load_model_vocabulary
+
+if TYPE_CHECKING:
+    import keras
+
+MODEL_NAMES = ["emails", "review"]
+
+# Saved model file of every format, see export_model.py for the TFLite ones
+MODEL_FORMATS = {
+    "keras": "models/{}_sentiment.keras",
+    "tflite": "models/{}_sentiment.tflite",
+    "tflite-int8": "models/{}_sentiment.int8.tflite",
+}
+
+# Most rows handed to the model in one call
+PREDICT_BATCH_SIZE = 1024
+
+
+class SentimentModel:
+    """
+    A trained model together with the vocabulary and settings it was trained
+    with. Turns raw text into sentiment scores between 0 and 1.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        cache_size: int = DEFAULT_CACHE_SIZE,
+        cache_path: str | None = None,
+        model_format: str = "keras",
+    ):
+        self.model_name = model_name
+        self.model_format = model_format
+        model_path = MODEL_FORMATS[model_format].format(model_name)
+
+        with open(f"models/{model_name}_modelInfo.json", "r") as f:
+            self.model_info: dict = json.load(f)
+
+        self.max_text_len: int = self.model_info["max_text_len"]
+
+        print("[i] Loading vocabulary")
+        self.featurizer = Featurizer(load_model_vocabulary(model_name, self.model_info))
+
+        print("[i] Loading model...")
+        self.model: "keras.Model | TFLiteModel"
+        if model_format == "keras":
+            import keras
+
+            self.model = keras.models.load_model(model_path)  # pyright: ignore
+        else:
+            self.model = TFLiteModel(model_path)
+
+        # Models trained on bucketed batches accept any length, exported graphs
+        # only max_text_len
+        self.fixed_length: int | None = self.model.input_shape[1]  # pyright: ignore
+
+        # A cache size of 0 turns caching off
+        self.cache: PredictionCache | None = None
+        if cache_size > 0:
+            self.cache = PredictionCache(
+                model_identity(model_name, self.model_info, model_path),
+                max_entries=cache_size,
+                disk_path=cache_path,
+            )
+
+    def featurize(self, cleaned: list[str]) -> TokenSequences:
+        return self.featurizer.transform(cleaned).truncate(self.max_text_len)
+
+    def predict(
+        self, sequences: TokenSequences, batch_size: int = PREDICT_BATCH_SIZE
+    ) -> NDArray[np.float32]:
+        """
+        Scores featurized text. Variable length models get one call per length
+        bucket, so a text is always padded the same way whatever it is batched
+        with.
+        """
+        n = len(sequences)
+        scores = np.zeros(n, dtype=np.float32)
+
+        if self.fixed_length is not None:
+            batches = [
+                (np.arange(start, min(start + batch_size, n)), self.fixed_length)
+                for start in range(0, n, batch_size)
+            ]
+        else:
+            batches = bucket_batches(sequences.lengths(), batch_size, self.max_text_len)
+
+        with profiling.span("predict", rows=n, format=self.model_format):
+            for rows, limit in batches:
+                padded = sequences.take(rows).pad(limit)
+                scores[rows] = self.model.predict_on_batch(padded).reshape(-1)
+
+        return scores
+
+    def score(self, texts: list[str]) -> NDArray[np.float32]:
+        """
+        Cleans, featurizes and scores texts. Texts seen before (after cleaning)
+        are answered from the cache, and duplicates in one call are scored once.
+        """
+        cleaned: list[str] = clean_texts(texts, progress=False)  # pyright: ignore
+        if self.cache is None:
+            return self.predict(self.featurize(cleaned))
+
+        keys = [self.cache.key(txt) for txt in cleaned]
+        cached = self.cache.get_many(keys)
+
+        # First position of every distinct text the cache did not know
+        todo: dict[bytes, int] = {}
+        for i, (key, score) in enumerate(zip(keys, cached)):
+            if score is None and key not in todo:
+                todo[key] = i
+
+        if todo:
+            rows = list(todo.values())
+            computed = self.predict(self.featurize([cleaned[i] for i in rows]))
+            self.cache.put_many(list(todo), computed.tolist())
+            found = dict(zip(todo, computed.tolist()))
+            cached = [found[k] if s is None else s for k, s in zip(keys, cached)]
+
+        return np.array(cached, dtype=np.float32)
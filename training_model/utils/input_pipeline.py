@@ -0,0 +1,176 @@
+"""
+Length bucketed input pipeline for training.
+
+Most emails and reviews are far shorter than max_text_len, so padding every
+sequence to it makes the LSTM spend most of its steps on padding. Here
+documents are grouped into buckets of similar length, and every batch is padded
+only to its bucket's upper bound. Padding stays at the start of the sequence,
+as with pad_sequences.
+
+Bucketing is off by default because it does not match how models are served.
+Padding uses id 0, which is a real GloVe word ("the"), and the embedding has
+no mask. A bucketed model sees a few pad tokens in front of a text, while the
+data pipeline and the exported graphs pad every text to max_text_len. Only
+utils.inference pads by bucket, so only serve bucketed models through it.
+
+Without bucketing every batch is still padded as it is drawn, only always to
+max_text_len. Padding the whole split up front costs max_text_len int32 per
+document, more than a gigabyte for the emails, and every search worker would
+hold its own copy.
+"""
+
+from typing import TYPE_CHECKING
+
+import numpy as np
+from numpy.typing import NDArray
+
+from utils.featurizer import SequenceRows, TokenSequences
+
+if TYPE_CHECKING:
+    import tensorflow as tf
+
+DEFAULT_BOUNDARIES = [16, 32, 64, 128, 256, 512]
+
+
+def bucket_batches(
+    lengths: NDArray,
+    batch_size: int,
+    max_text_len: int,
+    boundaries: list[int] = DEFAULT_BOUNDARIES,
+    rng: np.random.Generator | None = None,
+) -> list[tuple[NDArray[np.int64], int]]:
+    """
+    Groups row numbers into batches of similar length. Returns every batch with
+    the length it should be padded to. With an rng, rows are shuffled within
+    their bucket and the batches are shuffled between buckets.
+    """
+    limits = [b for b in boundaries if b < max_text_len] + [max_text_len]
+    bucket_of = np.searchsorted(limits, np.minimum(lengths, max_text_len))
+
+    batches = []
+    for bucket, limit in enumerate(limits):
+        rows = np.flatnonzero(bucket_of == bucket)
+        if rng is not None:
+            rng.shuffle(rows)
+
+        for start in range(0, len(rows), batch_size):
+            batches.append((rows[start : start + batch_size], limit))
+
+    if rng is not None:
+        batches = [batches[i] for i in rng.permutation(len(batches))]
+
+    return batches
+
+
+def bucketed_dataset(
+    sequences: TokenSequences | SequenceRows,
+    labels: NDArray,
+    batch_size: int,
+    max_text_len: int,
+    shuffle: bool = True,
+    boundaries: list[int] = DEFAULT_BOUNDARIES,
+    seed: int | None = None,
+) -> "tf.data.Dataset":
+    """
+    Builds a prefetching dataset of bucket padded batches. Every pass over the
+    dataset (one epoch) draws a new shuffle. Without boundaries below
+    max_text_len every batch is padded to max_text_len.
+    """
+    import tensorflow as tf
+
+    lengths = sequences.lengths()
+    labels = np.asarray(labels, dtype=np.float32)
+    rng = np.random.default_rng(seed) if shuffle else None
+    n_batches = len(bucket_batches(lengths, batch_size, max_text_len, boundaries))
+    width = None if any(b < max_text_len for b in boundaries) else max_text_len
+
+    def generate():
+        for rows, limit in bucket_batches(
+            lengths, batch_size, max_text_len, boundaries, rng
+        ):
+            yield sequences.take(rows).pad(limit), labels[rows]
+
+    dataset = tf.data.Dataset.from_generator(
+        generate,
+        output_signature=(
+            tf.TensorSpec(shape=(None, width), dtype=tf.int32),  # pyright: ignore
+            tf.TensorSpec(shape=(None,), dtype=tf.float32),  # pyright: ignore
+        ),
+    )
+    dataset = dataset.apply(tf.data.experimental.assert_cardinality(n_batches))
+
+    return dataset.prefetch(tf.data.AUTOTUNE)
+
+
+class TrainingData:
+    """
+    Train and test split of a featurized dataset, ready to feed model.fit
+    """
+
+    def __init__(
+        self,
+        train: TokenSequences | SequenceRows,
+        Y_train: NDArray,
+        test: TokenSequences | SequenceRows,
+        Y_test: NDArray,
+        max_text_len: int,
+    ):
+        self.train = train
+        self.Y_train = Y_train
+        self.test = test
+        self.Y_test = Y_test
+        self.max_text_len = max_text_len
+        self._padded: tuple[NDArray, NDArray] | None = None
+
+    def subset(self, fraction: float) -> "TrainingData":
+        """
+        The first fraction of the train and test rows. Rows come out of the
+        split shuffled, so this is a random sample. The tokens are not copied.
+        """
+        n_train = max(1, int(len(self.train) * fraction))
+        n_test = max(1, int(len(self.test) * fraction))
+
+        return TrainingData(
+            SequenceRows(self.train, np.arange(n_train)),
+            self.Y_train[:n_train],
+            SequenceRows(self.test, np.arange(n_test)),
+            self.Y_test[:n_test],
+            max_text_len=self.max_text_len,
+        )
+
+    def padded(self) -> tuple[NDArray[np.int32], NDArray[np.int32]]:
+        """
+        Train and test sequences padded to max_text_len, computed only once.
+        Training does not need these, fit_inputs pads batch by batch.
+        """
+        if self._padded is None:
+            self._padded = (
+                self.train.pad(self.max_text_len),
+                self.test.pad(self.max_text_len),
+            )
+
+        return self._padded
+
+    def fit_inputs(self, batch_size: int, bucketed: bool = False) -> dict:
+        """
+        Keyword arguments for model.fit, datasets of either length bucketed
+        batches or batches padded to max_text_len
+        """
+        boundaries = DEFAULT_BOUNDARIES if bucketed else []
+        return {
+            "x": bucketed_dataset(
+                self.train,
+                self.Y_train,
+                batch_size,
+                self.max_text_len,
+                boundaries=boundaries,
+            ),
+            "validation_data": bucketed_dataset(
+                self.test,
+                self.Y_test,
+                batch_size,
+                self.max_text_len,
+                shuffle=False,
+                boundaries=boundaries,
+            ),
+        }
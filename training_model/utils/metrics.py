@@ -0,0 +1,108 @@
+"""
+Regression and classification metrics accumulated batch by batch, so a dataset
+can be evaluated without holding every prediction in memory.
+"""
+
+import numpy as np
+from numpy.typing import NDArray
+
+NEG = -1
+NEU = 0
+POS = 1
+
+LABELS = [NEG, NEU, POS]
+CLASS_NAMES = ["Negative", "Neutral", "Positive"]
+
+
+def to_labels(scores: NDArray) -> NDArray[np.int64]:
+    """
+    Transforms scores into negative, neutral or positive
+    """
+    scores = np.asarray(scores).reshape(-1)
+    return np.where(scores < 0.45, NEG, np.where(scores < 0.6, NEU, POS))
+
+
+class StreamingMetrics:
+    def __init__(self):
+        self.n = 0
+        self.sum_y = 0.0
+        self.sum_y2 = 0.0
+        self.sse = 0.0
+        self.sae = 0.0
+        self.sape = 0.0
+        self.confusion = np.zeros((len(LABELS), len(LABELS)), dtype=np.int64)
+
+    def update(self, y_true: NDArray, y_pred: NDArray):
+        y_true = np.asarray(y_true, dtype=np.float64).reshape(-1)
+        y_pred = np.asarray(y_pred, dtype=np.float64).reshape(-1)
+        errors = y_pred - y_true
+
+        self.n += len(y_true)
+        self.sum_y += y_true.sum()
+        self.sum_y2 += np.square(y_true).sum()
+        self.sse += np.square(errors).sum()
+        self.sae += np.abs(errors).sum()
+        # Same epsilon as sklearn's mean_absolute_percentage_error
+        eps = np.finfo(np.float64).eps
+        self.sape += (np.abs(errors) / np.maximum(np.abs(y_true), eps)).sum()
+
+        true_idx = to_labels(y_true) + 1
+        pred_idx = to_labels(y_pred) + 1
+        np.add.at(self.confusion, (true_idx, pred_idx), 1)
+
+    def classification_report(self) -> dict:
+        """
+        Per class precision, recall, F1 and support, like sklearn's
+        classification_report(output_dict=True)
+        """
+        cm = self.confusion
+        true_pos = np.diag(cm).astype(np.float64)
+        support = cm.sum(axis=1)
+        predicted = cm.sum(axis=0)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            precision = np.nan_to_num(true_pos / predicted)
+            recall = np.nan_to_num(true_pos / support)
+            f1 = np.nan_to_num(2 * precision * recall / (precision + recall))
+
+        report: dict = {
+            name: {
+                "precision": float(precision[i]),
+                "recall": float(recall[i]),
+                "f1-score": float(f1[i]),
+                "support": int(support[i]),
+            }
+            for i, name in enumerate(CLASS_NAMES)
+        }
+
+        total = int(support.sum())
+        report["accuracy"] = float(true_pos.sum() / total) if total else 0.0
+        report["macro avg"] = {
+            "precision": float(precision.mean()),
+            "recall": float(recall.mean()),
+            "f1-score": float(f1.mean()),
+            "support": total,
+        }
+        weights = support / total if total else np.zeros(len(LABELS))
+        report["weighted avg"] = {
+            "precision": float((precision * weights).sum()),
+            "recall": float((recall * weights).sum()),
+            "f1-score": float((f1 * weights).sum()),
+            "support": total,
+        }
+
+        return report
+
+    def result(self) -> dict:
+        n = max(self.n, 1)
+        sst = self.sum_y2 - self.sum_y**2 / n
+
+        return {
+            "samples": self.n,
+            "MSE": self.sse / n,
+            "MAE": self.sae / n,
+            "MAPE": self.sape / n,
+            "R2": 1 - self.sse / sst if sst > 0 else 0.0,
+            "confusion_matrix": self.confusion.tolist(),
+            "classification_report": self.classification_report(),
+        }
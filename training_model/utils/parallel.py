@@ -0,0 +1,58 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Sequence, TypeVar
+
+from tqdm import tqdm
+
+from utils import profiling
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+DEFAULT_CHUNK_SIZE = 10_000
+
+
+def resolve_workers(workers: int | None) -> int:
+    """
+    None or 0 means every core
+    """
+    return workers or os.cpu_count() or 1
+
+
+def map_chunks(
+    func: Callable[[Sequence[T]], list[R]],
+    items: Sequence[T],
+    workers: int | None = 1,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    desc: str | None = None,
+) -> list[R]:
+    """
+    Applies func to consecutive chunks of items and joins the results in order.
+
+    With more than one worker the chunks run in a process pool, so func must be
+    a module level function. A single progress bar tracks rows across all
+    workers. Pass desc to show it. What func records while profiling is sent
+    back from the workers.
+    """
+    workers = resolve_workers(workers)
+    chunks = [items[i : i + chunk_size] for i in range(0, len(items), chunk_size)]
+    results: list[R] = []
+
+    with tqdm(total=len(items), desc=desc, disable=desc is None) as bar:
+        if workers > 1 and len(chunks) > 1:
+            collect = profiling.enabled()
+            with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as executor:
+                # map yields results in submission order, so rows stay aligned
+                for result in executor.map(
+                    profiling.Collected(func) if collect else func, chunks
+                ):
+                    if collect:
+                        result = profiling.merged(result)
+                    results.extend(result)
+                    bar.update(len(result))
+        else:
+            for chunk in chunks:
+                results.extend(func(chunk))
+                bar.update(len(chunk))
+
+    return results
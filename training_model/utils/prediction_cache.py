@@ -0,0 +1,137 @@
+"""
+Prediction cache for repeated texts.
+
+Corporate mail is full of duplicates (forwarded chains, notifications, mailing
+lists), so scores are cached under a hash of the cleaned text and the model's
+identity. The first tier is a bounded in-memory LRU. An optional SQLite file
+adds a second tier that survives restarts. The model identity is part of every
+key, so a retrained or different model never sees old scores, and stale rows
+are dropped from disk when the cache is opened.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+DEFAULT_CACHE_SIZE = 100_000
+
+
+def model_identity(model_name: str, model_info: dict, model_path: str) -> str:
+    """
+    Fingerprint of a trained model: its name, its modelInfo JSON and the size
+    and modification time of the saved model
+    """
+    stat = os.stat(model_path)
+    info = json.dumps(model_info, sort_keys=True)
+    fingerprint = f"{model_name}\n{info}\n{stat.st_size}:{stat.st_mtime_ns}"
+    return hashlib.sha256(fingerprint.encode()).hexdigest()
+
+
+class PredictionCache:
+    def __init__(
+        self,
+        identity: str,
+        max_entries: int = DEFAULT_CACHE_SIZE,
+        disk_path: str | None = None,
+    ):
+        self.identity = identity
+        self.max_entries = max_entries
+
+        self._memory: OrderedDict[bytes, float] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._db: sqlite3.Connection | None = None
+        if disk_path:
+            os.makedirs(os.path.dirname(disk_path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(disk_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS predictions"
+                " (key BLOB PRIMARY KEY, identity TEXT, score REAL)"
+            )
+            # Scores from any other model can never be hit again
+            self._db.execute("DELETE FROM predictions WHERE identity != ?", (identity,))
+            self._db.commit()
+
+    def key(self, cleaned_text: str) -> bytes:
+        digest = hashlib.sha256(self.identity.encode())
+        digest.update(b"\0")
+        digest.update(cleaned_text.encode("utf-8", errors="surrogatepass"))
+        return digest.digest()
+
+    def get_many(self, keys: list[bytes]) -> list[float | None]:
+        with self._lock:
+            scores: list[float | None] = []
+            for key in keys:
+                score = self._memory.get(key)
+                if score is not None:
+                    self._memory.move_to_end(key)
+                scores.append(score)
+
+            missing = [i for i, score in enumerate(scores) if score is None]
+            if missing and self._db is not None:
+                found = self._read_disk([keys[i] for i in missing])
+                for i in missing:
+                    score = found.get(keys[i])
+                    if score is not None:
+                        scores[i] = score
+                        self._remember(keys[i], score)
+                        self.disk_hits += 1
+
+            hits = sum(score is not None for score in scores)
+            self.hits += hits
+            self.misses += len(keys) - hits
+
+            return scores
+
+    def put_many(self, keys: list[bytes], scores: list[float]):
+        with self._lock:
+            for key, score in zip(keys, scores):
+                self._remember(key, float(score))
+
+            if self._db is not None:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO predictions VALUES (?, ?, ?)",
+                    [(key, self.identity, float(s)) for key, s in zip(keys, scores)],
+                )
+                self._db.commit()
+
+    def _remember(self, key: bytes, score: float):
+        self._memory[key] = score
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _read_disk(self, keys: list[bytes]) -> dict[bytes, float]:
+        found = {}
+        # SQLite limits the number of bound parameters per statement
+        for i in range(0, len(keys), 500):
+            batch = keys[i : i + 500]
+            rows = self._db.execute(  # pyright: ignore
+                "SELECT key, score FROM predictions WHERE key IN"
+                f" ({','.join('?' * len(batch))})",
+                batch,
+            )
+            found.update(rows)
+        return found
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0,
+                "entries": len(self._memory),
+            }
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -0,0 +1,306 @@
+"""
+Lightweight instrumentation of the training pipeline.
+
+Code marks the work it does with spans:
+
+    with profiling.span("featurize", rows=len(texts)):
+        ...
+
+Profiling is off by default. span then returns one shared object that does
+nothing, so instrumented code pays a single function call. main.py --profile
+turns it on, and every span records its wall time, CPU time, the peak RSS of
+the process and rows per second. CPU time counts this process and the worker
+processes that exited during the span. Steps that run thousands of times use
+tally instead, which only adds to totals per name.
+
+At the end of the run a JSON report holds every span and the totals per name.
+With --trace a Chrome trace is written next to it as well, for chrome://tracing
+or ui.perfetto.dev.
+
+Functions run in worker processes record into a profiler of their own. Wrap
+them in Collected and pass what they return through merged, which hands the
+records to the main process.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+PROFILES_DIR = "./profiles"
+
+
+def _cpu_time() -> float:
+    cpu = time.process_time()
+    if resource is not None:
+        children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        cpu += children.ru_utime + children.ru_stime
+    return cpu
+
+
+def _peak_rss_mib() -> float | None:
+    if resource is None:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, KiB everywhere else
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+class Span:
+    def __init__(self, profiler: "Profiler", name: str, rows: int | None, args: dict):
+        self.profiler = profiler
+        self.name = name
+        self.rows = rows
+        self.args = args
+
+    def __enter__(self) -> "Span":
+        self.start = time.perf_counter()
+        self.cpu_start = _cpu_time()
+        return self
+
+    def __exit__(self, *exc):
+        wall = time.perf_counter() - self.start
+        self.profiler.add_span(
+            {
+                "name": self.name,
+                "start": self.start,
+                "wall_s": wall,
+                "cpu_s": _cpu_time() - self.cpu_start,
+                "rows": self.rows,
+                "rows_per_s": self.rows / wall if self.rows and wall else None,
+                "peak_rss_mib": _peak_rss_mib(),
+                "pid": os.getpid(),
+                "tid": threading.get_ident(),
+                "args": self.args,
+            }
+        )
+
+
+class Tally:
+    def __init__(self, profiler: "Profiler", name: str, rows: int | None):
+        self.profiler = profiler
+        self.name = name
+        self.rows = rows
+
+    def __enter__(self) -> "Tally":
+        self.start = time.perf_counter()
+        self.cpu_start = time.process_time()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.add_tally(
+            self.name,
+            time.perf_counter() - self.start,
+            time.process_time() - self.cpu_start,
+            self.rows or 0,
+        )
+
+
+class _NullSpan:
+    """
+    What span and tally return while profiling is off
+    """
+
+    rows = None
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, *exc):
+        return None
+
+
+_NULL = _NullSpan()
+
+
+class Profiler:
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.started_at = datetime.now()
+        self.spans: list[dict] = []
+        # name -> [calls, wall, cpu, rows]
+        self.tallies: dict[str, list[float]] = {}
+        self.lock = threading.Lock()
+
+    def add_span(self, record: dict):
+        with self.lock:
+            self.spans.append(record)
+
+    def add_tally(self, name: str, wall: float, cpu: float, rows: int, calls: int = 1):
+        with self.lock:
+            total = self.tallies.setdefault(name, [0, 0.0, 0.0, 0])
+            total[0] += calls
+            total[1] += wall
+            total[2] += cpu
+            total[3] += rows
+
+    def records(self) -> dict:
+        return {"spans": self.spans, "tallies": self.tallies}
+
+    def merge(self, records: dict):
+        for record in records["spans"]:
+            self.add_span(record)
+        for name, (calls, wall, cpu, rows) in records["tallies"].items():
+            self.add_tally(name, wall, cpu, rows, calls)
+
+    def totals(self) -> dict[str, dict]:
+        """
+        Calls, time and rows per span or tally name
+        """
+        totals: dict[str, dict] = {}
+        for record in self.spans:
+            total = totals.setdefault(
+                record["name"],
+                {"calls": 0, "wall_s": 0.0, "cpu_s": 0.0, "rows": 0, "peak_rss_mib": 0.0},
+            )
+            total["calls"] += 1
+            total["wall_s"] += record["wall_s"]
+            total["cpu_s"] += record["cpu_s"]
+            total["rows"] += record["rows"] or 0
+            total["peak_rss_mib"] = max(total["peak_rss_mib"], record["peak_rss_mib"] or 0)
+
+        for name, (calls, wall, cpu, rows) in self.tallies.items():
+            totals[name] = {"calls": calls, "wall_s": wall, "cpu_s": cpu, "rows": rows}
+
+        for total in totals.values():
+            wall = total["wall_s"]
+            total["rows_per_s"] = total["rows"] / wall if total["rows"] and wall else None
+
+        return dict(sorted(totals.items(), key=lambda item: -item[1]["wall_s"]))
+
+    def report(self) -> dict:
+        spans = [
+            {**record, "start": record["start"] - self.origin}
+            for record in sorted(self.spans, key=lambda record: record["start"])
+        ]
+        return {
+            "command": sys.argv,
+            "started": self.started_at.isoformat(timespec="seconds"),
+            "wall_s": time.perf_counter() - self.origin,
+            "cpu_s": _cpu_time(),
+            "peak_rss_mib": _peak_rss_mib(),
+            "totals": self.totals(),
+            "spans": spans,
+        }
+
+    def trace(self) -> dict:
+        """
+        The spans as Chrome trace events. perf_counter is the system wide
+        monotonic clock on Linux, so spans of worker processes line up.
+        """
+        events = [
+            {
+                "name": record["name"],
+                "ph": "X",
+                "ts": (record["start"] - self.origin) * 1e6,
+                "dur": record["wall_s"] * 1e6,
+                "pid": record["pid"],
+                "tid": record["tid"],
+                "args": {
+                    key: record[key]
+                    for key in ["cpu_s", "rows", "rows_per_s", "peak_rss_mib"]
+                }
+                | record["args"],
+            }
+            for record in self.spans
+        ]
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+_profiler: Profiler | None = None
+
+
+def enable():
+    global _profiler
+    _profiler = Profiler()
+
+
+def enabled() -> bool:
+    return _profiler is not None
+
+
+def span(name: str, rows: int | None = None, **args):
+    """
+    Records a timed block. rows can also be set on the span inside the block.
+    """
+    if _profiler is None:
+        return _NULL
+    return Span(_profiler, name, rows, args)
+
+
+def tally(name: str, rows: int | None = None):
+    """
+    Adds a timed block to the totals of name without recording it on its own
+    """
+    if _profiler is None:
+        return _NULL
+    return Tally(_profiler, name, rows)
+
+
+class Collected:
+    """
+    Wraps a function run in a worker process. It records into a new profiler
+    there and returns (result, records), to be unwrapped with merged.
+    """
+
+    def __init__(self, func):
+        self.func = func
+
+    def __call__(self, *args):
+        global _profiler
+        previous = _profiler
+        _profiler = Profiler()
+        try:
+            return self.func(*args), _profiler.records()
+        finally:
+            _profiler = previous
+
+
+def merged(collected: tuple):
+    """
+    Adds the records returned by a Collected function to this process'
+    profiler and returns its result
+    """
+    result, records = collected
+    if _profiler is not None:
+        _profiler.merge(records)
+    return result
+
+
+def write_report(name: str, trace: bool = False) -> str | None:
+    """
+    Writes the report of this run, and its Chrome trace if asked, to
+    PROFILES_DIR. Returns the report path, or None when profiling is off.
+    """
+    if _profiler is None:
+        return None
+
+    os.makedirs(PROFILES_DIR, exist_ok=True)
+    stamp = _profiler.started_at.strftime("%Y%m%d-%H%M%S")
+    path = os.path.join(PROFILES_DIR, f"{name}-{stamp}.json")
+
+    report = _profiler.report()
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2, default=str)
+
+    if trace:
+        with open(path.replace(".json", ".trace.json"), "w") as f:
+            json.dump(_profiler.trace(), f, default=str)
+
+    print(f"[i] Profile written to {path}")
+    for name, total in list(report["totals"].items())[:10]:
+        rate = total["rows_per_s"]
+        print(
+            f"    {name:<32} {total['calls']:>6} calls {total['wall_s']:>9.2f}s wall "
+            f"{total['cpu_s']:>9.2f}s cpu" + (f" {rate:>12,.0f} rows/s" if rate else "")
+        )
+
+    return path
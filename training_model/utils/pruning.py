@@ -0,0 +1,120 @@
+"""
+Multi fidelity training for hyperparameter trials.
+
+A trial first trains on small random fractions of the data for one epoch each
+(the low fidelity rungs), then on the full data for its sampled number of
+epochs. After every rung and every full epoch the validation value is compared
+with the other trials through a MedianPruner. Trials clearly worse than most
+stop there, so only promising configurations get the full budget.
+
+The rungs only decide whether a trial goes on. Its weights and optimizer are
+reset before the full run, so a surviving trial gets no extra training from
+them, and only the full run is timed.
+
+A pruned trial's last value was measured with less training than a full run.
+It raises TrialPruned, and the search keeps the value out of Ax's model.
+"""
+
+import time
+
+import keras
+import numpy as np
+from keras.api.callbacks import Callback
+
+from utils import profiling
+from utils.input_pipeline import TrainingData
+from utils.search import MedianPruner, TrialPruned
+
+# (fraction of the data, epochs) trained before the full data
+LOW_FIDELITY_RUNGS = [(0.1, 1), (0.3, 1)]
+
+
+class PruningCallback(Callback):
+    """
+    Reports the monitored value after every epoch and stops training when the
+    pruner says so
+    """
+
+    def __init__(self, pruner: MedianPruner, monitor: str):
+        super().__init__()
+        self.pruner = pruner
+        self.monitor = monitor
+        self.pruned = False
+
+    def on_epoch_end(self, epoch, logs=None):
+        value = float((logs or {})[self.monitor])
+        if self.pruner.should_prune(f"full:{epoch + 1}", value):
+            print(f"[i] Pruned after epoch {epoch + 1}: {self.monitor}={value:.4f}")
+            self.pruned = True
+            self.model.stop_training = True  # pyright: ignore
+
+
+def training_state(model: keras.Model) -> dict[str, np.ndarray]:
+    """
+    The trainable weights and optimizer variables of a compiled model, to
+    reset it to. The frozen embedding matrix never changes and is not copied.
+    """
+    variables = model.trainable_variables + model.optimizer.variables  # pyright: ignore
+    return {v.path: v.numpy() for v in variables}
+
+
+def reset_training(model: keras.Model, state: dict[str, np.ndarray]):
+    """
+    Restores a training_state. Optimizer slots created since, like Adam's
+    moments, start from zero again.
+    """
+    for variable in model.trainable_variables + model.optimizer.variables:  # pyright: ignore
+        initial = state.get(variable.path)
+        if initial is None:
+            initial = np.zeros(variable.shape, variable.dtype)
+        variable.assign(initial)
+
+
+def fit_with_pruning(
+    model: keras.Model,
+    training_data: TrainingData,
+    batch_size: int,
+    epochs: int,
+    monitor: str,
+    pruner: MedianPruner | None,
+    bucketed: bool = False,
+) -> tuple[float, float]:
+    """
+    Trains a compiled model, pruning it early when the pruner says so. Without
+    a pruner this is a plain fit on the full data.
+
+    Returns the last value of monitor and how many seconds the fit on the full
+    data took. Raises TrialPruned with the value it was pruned at.
+    """
+    if pruner is not None:
+        state = training_state(model)
+        for fraction, rung_epochs in LOW_FIDELITY_RUNGS:
+            subset = training_data.subset(fraction)
+            with profiling.span("fit", rows=len(subset.train) * rung_epochs, rung=fraction):
+                res = model.fit(
+                    **subset.fit_inputs(batch_size, bucketed), epochs=rung_epochs
+                )
+
+            value = float(res.history[monitor][-1])
+            if pruner.should_prune(f"{fraction}x{rung_epochs}", value):
+                print(f"[i] Pruned on {fraction:.0%} of the data: {monitor}={value:.4f}")
+                raise TrialPruned(value)
+
+        reset_training(model, state)
+
+    callbacks = [] if pruner is None else [PruningCallback(pruner, monitor)]
+    with profiling.span("fit") as span:
+        start = time.perf_counter()
+        res = model.fit(
+            **training_data.fit_inputs(batch_size, bucketed),
+            epochs=epochs,
+            callbacks=callbacks,
+        )
+        seconds = time.perf_counter() - start
+        span.rows = len(training_data.train) * len(res.history[monitor])
+
+    value = float(res.history[monitor][-1])
+    if any(callback.pruned for callback in callbacks):
+        raise TrialPruned(value)
+
+    return value, seconds
@@ -0,0 +1,299 @@
+"""
+Hyperparameter search loop shared by the email and review searches.
+
+Trials run one after another in this process, or several at once in worker
+processes. Each worker gets its own share of the CPU threads. Workers reopen
+the featurized dataset from the on disk cache and select their split by row
+number, so the memory mapped tokens are shared between them. Only the batch
+being trained on is gathered and padded. The search stops after max_trials
+trials or once time_budget seconds have passed, whichever comes first. Trials
+already running when the budget runs out are allowed to finish.
+
+Trials share a MedianPruner, so a trial can stop itself as soon as it is worse
+than most trials were at the same point (see utils.pruning). A pruned trial is
+abandoned in Ax rather than completed, so its low fidelity value never reaches
+the model Ax suggests trials from.
+"""
+
+import multiprocessing as mp
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Callable
+
+import numpy as np
+from numpy.typing import NDArray
+
+from utils import profiling
+
+
+DEFAULT_MAX_TRIALS = 30
+
+# Trials that must reach a rung before any trial is pruned there
+PRUNE_MIN_TRIALS = 3
+
+# Read by TensorFlow and its math libraries when they start
+THREAD_VARIABLES = [
+    "TF_NUM_INTRAOP_THREADS",
+    "TF_NUM_INTEROP_THREADS",
+    "OMP_NUM_THREADS",
+]
+
+
+class TrialData:
+    """
+    Training data for trials, built lazily from a dataset cache entry. Only
+    the cache path and the row numbers are pickled when sent to a worker.
+    """
+
+    def __init__(
+        self,
+        cache_path: str,
+        train_rows: NDArray,
+        test_rows: NDArray,
+        max_text_len: int,
+        embeddings: str,
+        bucketed: bool = False,
+    ):
+        self.cache_path = cache_path
+        self.train_rows = train_rows
+        self.test_rows = test_rows
+        self.max_text_len = max_text_len
+        self.embeddings = embeddings
+        self.bucketed = bucketed
+        self._training_data = None
+        self._embedding_model = None
+
+    @property
+    def training_data(self):
+        if self._training_data is None:
+            from utils.dataset_cache import load_cached
+            from utils.featurizer import SequenceRows
+            from utils.input_pipeline import TrainingData
+
+            sequences, labels = load_cached(self.cache_path)
+            self._training_data = TrainingData(
+                SequenceRows(sequences, self.train_rows),
+                labels[self.train_rows],
+                SequenceRows(sequences, self.test_rows),
+                labels[self.test_rows],
+                max_text_len=self.max_text_len,
+            )
+
+        return self._training_data
+
+    @property
+    def embedding_model(self):
+        if self._embedding_model is None:
+            from utils.embeddings import load_embeddings
+
+            self._embedding_model = load_embeddings(self.embeddings)
+
+        return self._embedding_model
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state["_training_data"] = None
+        state["_embedding_model"] = None
+        return state
+
+
+class TrialPruned(Exception):
+    """
+    Raised by a trial function that was pruned, with the value it stopped at
+    """
+
+    def __init__(self, value: float):
+        super().__init__(value)
+        self.value = value
+
+
+class MedianPruner:
+    """
+    Median stopping rule. Trials report a value (lower is better) at named
+    rungs, such as "epoch 1 on 10% of the data". A trial should stop when its
+    value is worse than the median of the trials that reached the rung before
+    it. Nothing is pruned until PRUNE_MIN_TRIALS trials have reported there.
+
+    With a multiprocessing manager's dict and lock, the rungs are shared by
+    every worker process.
+    """
+
+    def __init__(self, history=None, lock=None, min_trials: int = PRUNE_MIN_TRIALS):
+        self.history = {} if history is None else history
+        self.lock = threading.Lock() if lock is None else lock
+        self.min_trials = min_trials
+
+    def should_prune(self, rung: str, value: float) -> bool:
+        with self.lock:
+            seen = list(self.history.get(rung, []))
+            self.history[rung] = seen + [value]
+
+        if len(seen) < self.min_trials:
+            return False
+
+        return value > float(np.median(seen))
+
+
+TrialFunction = Callable[[dict, TrialData, MedianPruner | None], dict]
+
+_trial_function: TrialFunction | None = None
+_trial_data: TrialData | None = None
+_pruner: MedianPruner | None = None
+_profile = False
+
+
+def _init_worker(
+    trial_function: TrialFunction,
+    trial_data: TrialData,
+    pruner: MedianPruner | None,
+    threads: int,
+    profile: bool = False,
+):
+    for variable in THREAD_VARIABLES:
+        os.environ[variable] = str(threads)
+
+    global _trial_function, _trial_data, _pruner, _profile
+    _trial_function = trial_function
+    _trial_data = trial_data
+    _pruner = pruner
+    _profile = profile
+
+
+def _trial(
+    trial_function: TrialFunction,
+    trial_index: int,
+    parameters: dict,
+    trial_data: TrialData,
+    pruner: MedianPruner | None,
+) -> dict:
+    with profiling.span("search/trial", trial=trial_index, parameters=parameters):
+        return trial_function(parameters, trial_data, pruner)
+
+
+def _run_trial(trial_index: int, parameters: dict):
+    run = profiling.Collected(_trial) if _profile else _trial
+    return run(_trial_function, trial_index, parameters, _trial_data, _pruner)  # pyright: ignore
+
+
+def _complete(ax_client, trial_index: int, get_result: Callable[[], dict]):
+    try:
+        raw_data = get_result()
+    except TrialPruned as e:
+        print(f"[i] Trial {trial_index} pruned at {e.value:.4f}")
+        ax_client.abandon_trial(trial_index=trial_index, reason=f"pruned at {e.value}")
+        return
+    except Exception as e:
+        print(f"[!] Trial {trial_index} failed: {e}")
+        ax_client.log_trial_failure(trial_index=trial_index)
+        return
+
+    print(f"[i] Trial {trial_index} finished: {raw_data}")
+    ax_client.complete_trial(trial_index=trial_index, raw_data=raw_data)
+
+
+def run_search(
+    ax_client,
+    trial_function: TrialFunction,
+    trial_data: TrialData,
+    workers: int = 1,
+    max_trials: int = DEFAULT_MAX_TRIALS,
+    time_budget: float | None = None,
+    prune: bool = True,
+    checkpoint_path: str | None = None,
+):
+    """
+    Runs trials until max_trials have been started or time_budget seconds
+    have passed. trial_function(parameters, trial_data, pruner) must be
+    importable from a module so worker processes can unpickle it. The pruner is
+    None when pruning is off, and a pruned trial raises TrialPruned. Ctrl-C
+    abandons the running trials and keeps the finished ones. With a
+    checkpoint_path, the experiment is saved there whenever trials start or
+    finish.
+    """
+    deadline = None if time_budget is None else time.monotonic() + time_budget
+    started = 0
+
+    def checkpoint():
+        if checkpoint_path is not None:
+            from utils.experiments import save_checkpoint
+
+            save_checkpoint(ax_client, checkpoint_path)
+
+    def budget_left() -> int:
+        if deadline is not None and time.monotonic() >= deadline:
+            return 0
+        return max_trials - started
+
+    running: dict[Future, int] = {}
+    pool = None
+    manager = None
+    pruner = MedianPruner() if prune else None
+
+    if workers > 1:
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        print(f"[i] Running {workers} trials at a time, {threads} threads each")
+
+        # TensorFlow does not survive being forked
+        context = mp.get_context("spawn")
+        if prune:
+            manager = context.Manager()
+            pruner = MedianPruner(manager.dict(), manager.Lock())
+
+        pool = ProcessPoolExecutor(
+            workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(trial_function, trial_data, pruner, threads, profiling.enabled()),
+        )
+
+    print(f"[i] Running up to {max_trials} trials. Ctrl-C stops early")
+    try:
+        while True:
+            trials = {}
+            wanted = min(workers - len(running), budget_left())
+            if wanted > 0:
+                trials, _ = ax_client.get_next_trials(max_trials=wanted)
+                started += len(trials)
+                checkpoint()
+
+            for trial_index, parameters in trials.items():
+                if pool is None:
+                    # Tracked so Ctrl-C abandons it
+                    running[Future()] = trial_index
+                    _complete(
+                        ax_client,
+                        trial_index,
+                        lambda: _trial(
+                            trial_function, trial_index, parameters, trial_data, pruner
+                        ),
+                    )
+                    running.clear()
+                    checkpoint()
+                else:
+                    running[pool.submit(_run_trial, trial_index, parameters)] = trial_index
+
+            if running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    result = future.result
+                    if profiling.enabled():
+                        result = lambda future=future: profiling.merged(future.result())
+                    _complete(ax_client, running.pop(future), result)
+                checkpoint()
+            elif not trials:
+                # Out of budget, or Ax has nothing more to suggest
+                break
+
+    except KeyboardInterrupt:
+        print("[i] Stopping search")
+        for trial_index in running.values():
+            ax_client.abandon_trial(trial_index=trial_index)
+        checkpoint()
+
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+        if manager is not None:
+            manager.shutdown()
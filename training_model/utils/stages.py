@@ -0,0 +1,318 @@
+"""
+Incremental stage runner for main.py.
+
+A pipeline is a list of stages run in order. Each stage declares the files it
+reads, the files it writes, the modules whose code shapes its output and the
+parameters that change it. Before a stage runs, those are hashed into a key.
+If the stage's manifest (./datasets/stages/<pipeline>/<stage>.json) holds the
+same key and its outputs are unchanged on disk, the stage is skipped.
+
+Outputs are also kept under their stage key, in
+./datasets/stages/<pipeline>/outputs/<stage>/<key>/. When a stage's key
+matches a stored run, its outputs are put back in place instead of rerunning
+it, so going back to earlier inputs or parameters is cheap. Stored files are
+hard links where the filesystem allows, so they cost no extra space until an
+output is rewritten. Before a stage runs, outputs that share their file with
+the store are replaced by private copies, so stages may update them in place.
+Only the STORE_KEEP most recent runs of each stage are kept.
+
+Stages hand data to each other only through files. A change anywhere therefore
+changes the hash of the files downstream stages read, and they rerun too.
+
+Hashing a large file is slow, so file digests are remembered by path, size
+and modification time in ./datasets/stages/hashes.json.
+"""
+
+import hashlib
+import importlib.util
+import inspect
+import json
+import os
+import shutil
+from typing import Callable
+
+from utils import profiling
+
+STAGES_DIR = "./datasets/stages"
+HASHES_FILE = "hashes.json"
+STORE_DIR = "outputs"
+STORE_KEEP = 3
+
+
+class Stage:
+    def __init__(
+        self,
+        name: str,
+        run: Callable[[], object],
+        inputs: list[str],
+        outputs: list[str],
+        code: list | None = None,
+        params: dict | None = None,
+    ):
+        self.name = name
+        self.run = run
+        self.inputs = inputs
+        self.outputs = outputs
+        self.code = code or []
+        self.params = params or {}
+
+
+class FileHasher:
+    """
+    Content hashes of files and directories, remembered across runs
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.known: dict[str, list] = {}
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                self.known = json.load(f)
+
+    def file_hash(self, path: str) -> str:
+        stat = os.stat(path)
+        key = os.path.abspath(path)
+
+        known = self.known.get(key)
+        if known and known[:2] == [stat.st_size, stat.st_mtime_ns]:
+            return known[2]
+
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            while block := f.read(1 << 20):
+                digest.update(block)
+
+        self.known[key] = [stat.st_size, stat.st_mtime_ns, digest.hexdigest()]
+        return digest.hexdigest()
+
+    def hash(self, path: str) -> str | None:
+        """
+        Hash of a file, or of every file under a directory. None if missing.
+        """
+        if os.path.isfile(path):
+            return self.file_hash(path)
+
+        if not os.path.isdir(path):
+            return None
+
+        digest = hashlib.sha256()
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for file in sorted(files):
+                file_path = os.path.join(root, file)
+                digest.update(os.path.relpath(file_path, path).encode())
+                digest.update(self.file_hash(file_path).encode())
+
+        return digest.hexdigest()
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "w") as f:
+            json.dump(self.known, f)
+
+
+def source_file(obj) -> str | None:
+    # Modules named by a string are found without importing them, so heavy
+    # ones only load when a stage runs
+    if isinstance(obj, str):
+        spec = importlib.util.find_spec(obj)
+        return spec.origin if spec else None
+
+    return inspect.getsourcefile(obj)
+
+
+def code_hash(objects: list) -> str:
+    """
+    Hash of the source files defining some modules, classes or functions.
+    Modules can also be given by name.
+    """
+    digest = hashlib.sha256()
+    files = {source_file(obj) for obj in objects}
+
+    for file in sorted(f for f in files if f):
+        with open(file, "rb") as f:
+            digest.update(f.read())
+
+    return digest.hexdigest()
+
+
+def stage_key(stage: Stage, hasher: FileHasher) -> str:
+    digest = hashlib.sha256()
+    digest.update(stage.name.encode())
+    digest.update(code_hash(stage.code).encode())
+    digest.update(json.dumps(stage.params, sort_keys=True, default=str).encode())
+
+    for path in stage.inputs:
+        content = hasher.hash(path)
+        if content is None:
+            raise FileNotFoundError(
+                f"Stage {stage.name} needs {path}, run the stage that writes it first"
+            )
+
+        digest.update(path.encode())
+        digest.update(content.encode())
+
+    return digest.hexdigest()
+
+
+def link_or_copy(src: str, dst: str):
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def remove(path: str):
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.lexists(path):
+        os.remove(path)
+
+
+def place(src: str, dst: str):
+    """
+    Replaces dst with the file or directory at src, linking files if possible
+    """
+    remove(dst)
+    os.makedirs(os.path.dirname(dst) or ".", exist_ok=True)
+    if os.path.isdir(src):
+        shutil.copytree(src, dst, copy_function=link_or_copy)
+    else:
+        link_or_copy(src, dst)
+
+
+def detach(path: str):
+    """
+    Gives every file under path that is linked elsewhere a copy of its own
+    """
+    files = [path] if os.path.isfile(path) else []
+    for root, _, names in os.walk(path):
+        files.extend(os.path.join(root, name) for name in names)
+
+    for file in files:
+        if os.stat(file).st_nlink > 1:
+            shutil.copy2(file, f"{file}.tmp")
+            os.replace(f"{file}.tmp", file)
+
+
+def store_outputs(store_dir: str, key: str, stage: Stage, outputs: dict):
+    """
+    Keeps the outputs of a run under its key, then drops the oldest runs
+    """
+    tmp_dir = os.path.join(store_dir, f"{key}.tmp")
+    remove(tmp_dir)
+    os.makedirs(tmp_dir)
+    for i, path in enumerate(stage.outputs):
+        place(path, os.path.join(tmp_dir, str(i)))
+    with open(os.path.join(tmp_dir, "outputs.json"), "w") as f:
+        json.dump(outputs, f, indent=2)
+
+    remove(os.path.join(store_dir, key))
+    os.replace(tmp_dir, os.path.join(store_dir, key))
+
+    runs = [os.path.join(store_dir, name) for name in os.listdir(store_dir)]
+    runs.sort(key=os.path.getmtime, reverse=True)
+    for run in runs[STORE_KEEP:]:
+        remove(run)
+
+
+def restore_outputs(
+    store_dir: str, key: str, stage: Stage, hasher: FileHasher
+) -> dict | None:
+    """
+    Puts the stored outputs of a run with this key back in place. Returns
+    their hashes, or None if there is no such run.
+    """
+    run_dir = os.path.join(store_dir, key)
+    manifest_path = os.path.join(run_dir, "outputs.json")
+    if not os.path.exists(manifest_path):
+        return None
+
+    with open(manifest_path, "r") as f:
+        outputs = json.load(f)
+    if list(outputs) != stage.outputs:
+        return None
+
+    for i, path in enumerate(stage.outputs):
+        place(os.path.join(run_dir, str(i)), path)
+    os.utime(run_dir)
+
+    if any(hasher.hash(path) != content for path, content in outputs.items()):
+        return None
+
+    return outputs
+
+
+def run_stages(
+    pipeline: str,
+    stages: list[Stage],
+    start: str | None = None,
+    stop: str | None = None,
+    force: list[str] | None = None,
+):
+    """
+    Runs the stages from start to stop (both included, default all of them),
+    skipping those whose outputs are still valid. Stages named in force always
+    run. An empty force list forces every stage. Stages whose key matches a
+    stored run get its outputs back instead of running.
+    """
+    names = [stage.name for stage in stages]
+    for name in [start, stop, *(force or [])]:
+        if name is not None and name not in names:
+            raise ValueError(f"Unknown {pipeline} stage {name}, expected one of {names}")
+
+    first = names.index(start) if start else 0
+    last = names.index(stop) if stop else len(stages) - 1
+    forced = set(names if force == [] else force or [])
+
+    manifest_dir = os.path.join(STAGES_DIR, pipeline)
+    os.makedirs(manifest_dir, exist_ok=True)
+    hasher = FileHasher(os.path.join(STAGES_DIR, HASHES_FILE))
+
+    for stage in stages[first : last + 1]:
+        key = stage_key(stage, hasher)
+        manifest_path = os.path.join(manifest_dir, f"{stage.name}.json")
+
+        manifest = {}
+        if os.path.exists(manifest_path):
+            with open(manifest_path, "r") as f:
+                manifest = json.load(f)
+
+        up_to_date = manifest.get("key") == key and all(
+            hasher.hash(path) == manifest["outputs"].get(path) for path in stage.outputs
+        )
+        if up_to_date and stage.name not in forced:
+            print(f"[i] Stage {stage.name} is up to date, skipping")
+            continue
+
+        # An interrupted stage must never look finished
+        if os.path.exists(manifest_path):
+            os.remove(manifest_path)
+
+        store_dir = os.path.join(manifest_dir, STORE_DIR, stage.name)
+        outputs = None
+        if stage.name not in forced:
+            outputs = restore_outputs(store_dir, key, stage, hasher)
+
+        if outputs is not None:
+            print(f"[i] Stage {stage.name} restored from an earlier run")
+        else:
+            print(f"[i] Running stage {stage.name}")
+            for path in stage.outputs:
+                detach(path)
+
+            with profiling.span(f"stage/{stage.name}", pipeline=pipeline):
+                stage.run()
+
+            outputs = {path: hasher.hash(path) for path in stage.outputs}
+            missing = [path for path, content in outputs.items() if content is None]
+            if missing:
+                raise FileNotFoundError(f"Stage {stage.name} did not write {missing}")
+
+            store_outputs(store_dir, key, stage, outputs)
+
+        with open(manifest_path, "w") as f:
+            json.dump({"key": key, "outputs": outputs}, f, indent=2)
+        hasher.save()
+
+    hasher.save()
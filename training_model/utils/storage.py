@@ -0,0 +1,149 @@
+"""
+Columnar storage for intermediate datasets.
+
+Labelled and cleaned datasets are written as zstd compressed Parquet instead
+of CSV. Text is read back into Arrow backed string columns, address sets are
+stored as list columns, and readers only load the columns they ask for. A
+dataset is either one .parquet file or a directory of .parquet shards.
+
+Datasets updated incrementally grow by appending shards. A single file dataset
+becomes the first shard of a directory of the same name the first time one is
+appended, so readers never need to know which kind they get.
+"""
+
+import glob
+import os
+import shutil
+from typing import Iterator
+
+import pandas as pd
+
+from utils import profiling
+
+COMPRESSION = "zstd"
+
+# Intermediate datasets of the pipeline
+EMAILS_DEDUPED = "./datasets/emails_deduped.parquet"
+EMAILS_LABELLED = "./datasets/emails_labelled.parquet"
+EMAILS_CLEANED = "./datasets/emails_cleaned.parquet"
+REVIEWS_CLEANED = "./datasets/reviews_cleaned.parquet"
+
+
+def _types_mapper(arrow_type):
+    import pyarrow as pa
+
+    if pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type):
+        return pd.StringDtype("pyarrow")
+
+    return None
+
+
+def dataset_files(path: str) -> list[str]:
+    if os.path.isdir(path):
+        return sorted(glob.glob(os.path.join(path, "*.parquet")))
+
+    return [path]
+
+
+def write_dataset(df: pd.DataFrame, path: str, index: bool = True):
+    """
+    Writes a DataFrame to a Parquet file. Address sets and other collections
+    must already be lists. A sharded dataset at path is replaced whole.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+
+    # Write next to the file first so readers never see half of it
+    tmp_path = f"{path}.tmp"
+    with profiling.span("write_dataset", rows=len(df), path=path):
+        df.to_parquet(tmp_path, engine="pyarrow", compression=COMPRESSION, index=index)
+    os.replace(tmp_path, path)
+
+
+def read_dataset(
+    path: str, columns: list[str] | None = None, limit: int | None = None
+) -> pd.DataFrame:
+    """
+    Reads a dataset, or only some of its columns. Shards are read in order
+    until limit rows have been loaded.
+    """
+    import pyarrow.parquet as pq
+
+    frames = []
+    rows = 0
+    with profiling.span("read_dataset", path=path) as span:
+        for file in dataset_files(path):
+            if limit is not None and rows >= limit:
+                break
+
+            table = pq.read_table(file, columns=columns, use_pandas_metadata=True)
+            frames.append(table.to_pandas(types_mapper=_types_mapper))
+            rows += len(frames[-1])
+
+        span.rows = rows
+
+    if not frames:
+        return pd.DataFrame(columns=columns)
+
+    data = pd.concat(frames) if len(frames) > 1 else frames[0]
+    return data if limit is None else data.iloc[:limit]
+
+
+def iter_dataset(
+    path: str, columns: list[str], batch_size: int
+) -> Iterator[pd.DataFrame]:
+    """
+    Yields a dataset batch_size rows at a time without loading it whole
+    """
+    import pyarrow.parquet as pq
+
+    for file in dataset_files(path):
+        for batch in pq.ParquetFile(file).iter_batches(
+            batch_size=batch_size, columns=columns
+        ):
+            yield batch.to_pandas(types_mapper=_types_mapper)
+
+
+def shard_dataset(path: str):
+    """
+    Makes path a directory of shards, moving a single file dataset into it as
+    its first shard
+    """
+    if os.path.isfile(path):
+        tmp_path = f"{path}.tmp"
+        os.replace(path, tmp_path)
+        os.makedirs(path)
+        os.replace(tmp_path, os.path.join(path, "part-00000.parquet"))
+
+    os.makedirs(path, exist_ok=True)
+
+
+def append_dataset(df: pd.DataFrame, path: str) -> str:
+    """
+    Adds df to a dataset as a new shard. Returns the shard's path.
+    """
+    shard_dataset(path)
+
+    shards = dataset_files(path)
+    number = int(os.path.basename(shards[-1])[5:10]) + 1 if shards else 0
+    shard = os.path.join(path, f"part-{number:05d}.parquet")
+    write_dataset(df, shard)
+    return shard
+
+
+def dataset_index(path: str) -> pd.Index:
+    """
+    The index of a dataset, read without any of its columns. Empty if there
+    is no dataset at path.
+    """
+    import pyarrow.parquet as pq
+
+    if not os.path.exists(path):
+        return pd.Index([])
+
+    indexes = [
+        pq.read_table(file, columns=[], use_pandas_metadata=True).to_pandas().index
+        for file in dataset_files(path)
+    ]
+    return indexes[0].append(indexes[1:]) if indexes else pd.Index([])
@@ -3,55 +3,19 @@
 import re
 
 import pandas as pd
-import nltk
-
-from keras.api.models import Sequential
-from keras.api.layers import LSTM, Dense, Embedding, Dropout, Bidirectional, Input
-
-nltk.download("stopwords")
-nltk.download("punkt")
-nltk.download("punkt_tab")
-
-emoticon_meanings = {
-    " :)": "happy",
-    " :(": "sad",
-    " :D": "very happy",
-    " :|": "neutral",
-    " :O": "surprised",
-    " <3": "love",
-    " ;)": "wink",
-    " :P": "playful",
-    " :/": "confused",
-    " :*": "kiss",
-    " :')": "touched",
-    " XD": "laughing",
-    " :3": "cute",
-    " >:(": "angry",
-    " :-O": "shocked",
-    " :|]": "robot",
-    " :>": "sly",
-    " ^_^": "happy",
-    " O_o": "confused",
-    " :-|": "straight face",
-    " :X": "silent",
-    " B-)": "cool",
-    " <(‘.'<)": "dance",
-    " (-_-)": "bored",
-    " (>_<)": "upset",
-    " (¬‿¬)": "sarcastic",
-    " (o_o)": "surprised",
-    " (o.O)": "shocked",
-    " :0": "shocked",
-    " :*(": "crying",
-    " :v ": "pac-Man",
-    " (^_^)v ": "double victory",
-    " :-D": "big grin",
-    " :-*": "blowing a kiss",
-    " :^)": "nosey",
-    " :-((": "very sad",
-    " :-(": "frowning",
-}
 
+from utils.cleaning import (
+    DEFAULT_CHUNK_SIZE,
+    LINKS_RE,
+    NUMBERS_RE,
+    REPEATS_RE,
+    SHORT_WORDS_RE,
+    SPACES_RE,
+    UNWANTED_CHARS_RE,
+    clean_texts,
+    convert_emoticons,
+    emoticon_meanings,  # noqa: F401
+)
 
 # Functions for cleaning
 def remove_pattern(input_txt: str, pattern: str) -> str:
@@ -60,57 +24,50 @@ def remove_pattern(input_txt: str, pattern: str) -> str:
 
 
 def remove_links(content: pd.DataFrame | pd.Series) -> pd.DataFrame | pd.Series:
-    return content.progress_apply(remove_pattern, pattern=r"https?://\S+|www\.\S+")
+    return content.progress_apply(lambda x: LINKS_RE.sub("", x))
 
 
 def remove_repeats(content: pd.DataFrame | pd.Series) -> pd.DataFrame | pd.Series:
-    return content.progress_apply(lambda x: re.sub(r"(.)\1{2,}", r"\1", x))
+    return content.progress_apply(lambda x: REPEATS_RE.sub(r"\1", x))
 
 
 def remove_lots_space(content: pd.DataFrame | pd.Series) -> pd.DataFrame | pd.Series:
-    return content.progress_apply(lambda x: re.sub(r"\s+", " ", x))
+    return content.progress_apply(lambda x: SPACES_RE.sub(" ", x))
 
 
 def replace_emoticons(content: pd.DataFrame | pd.Series) -> pd.DataFrame | pd.Series:
-    def convert_text(txt: str) -> str:
-        for emoticon, meaning in emoticon_meanings.items():
-            txt = txt.replace(emoticon, f" {meaning}")
-
-        return txt
-
-    return content.progress_apply(convert_text)
+    return content.progress_apply(convert_emoticons)
 
 
 def remove_unwanted_chars(
     content: pd.DataFrame | pd.Series,
 ) -> pd.DataFrame | pd.Series:
-    return content.progress_apply(lambda x: re.sub(r"[^a-zA-Z#]", " ", x))
+    return content.progress_apply(lambda x: UNWANTED_CHARS_RE.sub(" ", x))
 
 
 def remove_short_words(
     content: pd.DataFrame | pd.Series,
 ) -> pd.DataFrame | pd.Series:
-    return content.progress_apply(lambda x: re.sub(r"\b\w{1,2}\b", " ", x))
+    return content.progress_apply(lambda x: SHORT_WORDS_RE.sub(" ", x))
 
 
 def remove_numbers(content: pd.DataFrame | pd.Series) -> pd.DataFrame | pd.Series:
-    return content.progress_apply(lambda x: re.sub(r"(?<=\w)\d+|\d+(?=\w)", "", x))
+    return content.progress_apply(lambda x: NUMBERS_RE.sub("", x))
 
 
-def clean_text(content: pd.Series) -> pd.Series:
-    content = content.str.lower()
-    content = remove_links(content)  # pyright: ignore
-    content = replace_emoticons(content)  # pyright: ignore
-    content = remove_unwanted_chars(content)  # pyright: ignore
-    content = remove_repeats(content)  # pyright: ignore
-    content = remove_short_words(content)  # pyright: ignore
-    content = remove_numbers(content)  # pyright: ignore
-    content = remove_lots_space(content)  # pyright: ignore
-
-    return content
+def clean_text(
+    content: pd.Series, workers: int | None = 1, chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> pd.Series:
+    return clean_texts(
+        content, workers=workers, chunk_size=chunk_size
+    )  # pyright: ignore
 
 
 def get_keras_model(weights, lstm_units, neurons_dense, dropout_rate, text_length):
+    from keras.api.layers import LSTM, Bidirectional, Dense, Dropout, Embedding, Input
+    from keras.api.models import Sequential
+
+    # text_length=None accepts batches of any length (see utils.input_pipeline)
     model = Sequential(
         [
             Input(shape=(text_length,)),
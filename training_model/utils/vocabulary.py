@@ -0,0 +1,138 @@
+"""
+Vocabularies pruned to the words a corpus actually uses.
+
+GloVe knows 400k words, but Enron and Amazon text only use a small part of
+them. A model built over the whole matrix saves every vector with its weights
+and holds them in memory wherever it is served. A pruned vocabulary keeps the
+most frequent words of the training corpus only:
+
+- index 0 pads sequences and has a zero vector
+- index 1 is the OOV bucket every other GloVe word maps to. Its vector is the
+  mean of the words it replaces, weighted by how often they occur. Words GloVe
+  does not know are dropped, as with the full vocabulary.
+- the kept words follow, most frequent first
+
+The vocabulary is saved next to the model's modelInfo JSON as one word per
+line in index order, then an empty line and the GloVe words mapped to the OOV
+bucket. That is all inference needs: the vectors are part of the model.
+"""
+
+import os
+
+import numpy as np
+from numpy.typing import NDArray
+
+from utils.embeddings import EmbeddingStore, load_model_embeddings
+from utils.featurizer import Featurizer
+
+VOCAB_PATH = "./models/{}_vocab.txt"
+
+PAD_TOKEN = "<pad>"
+OOV_TOKEN = "<oov>"
+OOV_INDEX = 1
+
+
+def word_counts(texts, embedding_model) -> NDArray[np.int64]:
+    """
+    How often every word of an embedding model occurs in texts
+    """
+    tokens = Featurizer(embedding_model).transform(texts, "Counting words").tokens
+    return np.bincount(tokens, minlength=len(embedding_model.index_to_key))
+
+
+def prune_embeddings(
+    embedding_model, counts: NDArray[np.int64], size: int
+) -> EmbeddingStore:
+    """
+    Keeps the vectors of the size most frequent words, see the module docstring
+    """
+    # Stable sort, so ties keep the embedding model's (frequency) order
+    order = np.argsort(-counts, kind="stable")
+    kept = order[: min(size, int(np.count_nonzero(counts)))]
+    dropped = order[len(kept) :]
+
+    vectors = np.asarray(embedding_model.vectors, dtype=np.float32)
+    weights = counts[dropped].astype(np.float64)
+
+    pruned = np.zeros((len(kept) + 2, vectors.shape[1]), dtype=np.float32)
+    if weights.sum() > 0:
+        seen = dropped[weights > 0]
+        pruned[OOV_INDEX] = np.average(vectors[seen], axis=0, weights=weights[weights > 0])
+    pruned[2:] = vectors[kept]
+
+    words = [embedding_model.index_to_key[i] for i in kept]
+    return EmbeddingStore(
+        embedding_model.name,
+        pruned,
+        [PAD_TOKEN, OOV_TOKEN] + words,
+        OOV_INDEX,
+        oov_words=[embedding_model.index_to_key[i] for i in dropped],
+    )
+
+
+def save_vocabulary(embedding_model: EmbeddingStore, path: str):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(embedding_model.index_to_key))
+        f.write("\n\n")
+        f.write("\n".join(embedding_model.oov_words))
+    os.replace(tmp_path, path)
+
+
+def load_vocabulary(path: str, name: str) -> EmbeddingStore:
+    with open(path, "r", encoding="utf-8") as f:
+        index_to_key, _, oov_words = f.read().partition("\n\n")
+
+    return EmbeddingStore(
+        name,
+        None,
+        index_to_key.split("\n"),
+        OOV_INDEX,
+        oov_words=oov_words.split("\n") if oov_words else [],
+    )
+
+
+def load_model_vocabulary(model_name: str, model_info: dict) -> EmbeddingStore:
+    """
+    The vocabulary a trained model maps words with: its pruned vocabulary if it
+    was trained with one, the whole embedding store otherwise
+    """
+    path = VOCAB_PATH.format(model_name)
+    if os.path.exists(path):
+        return load_vocabulary(path, model_info.get("gensin_model", ""))
+
+    return load_model_embeddings(model_info)
+
+
+def pruned_training_embeddings(
+    model_name: str, texts, model_info: dict, vocab_size: int | None
+) -> EmbeddingStore:
+    """
+    Embeddings to train a model with. With a vocab_size, prunes them to the
+    words of texts and saves the vocabulary for inference. Without one, removes
+    any vocabulary left by an earlier pruned model.
+    """
+    embedding_model = load_model_embeddings(model_info)
+    path = VOCAB_PATH.format(model_name)
+
+    if vocab_size is None:
+        if os.path.exists(path):
+            os.remove(path)
+        return embedding_model
+
+    pruned = prune_embeddings(embedding_model, word_counts(texts, embedding_model), vocab_size)
+    save_vocabulary(pruned, path)
+
+    full_size = embedding_model.vectors.nbytes / 2**20  # pyright: ignore
+    pruned_size = pruned.vectors.nbytes / 2**20  # pyright: ignore
+    print(
+        f"[i] Vocabulary pruned from {len(embedding_model)} to {len(pruned) - 2} words, "
+        f"embedding weights {full_size:.1f} MiB -> {pruned_size:.1f} MiB"
+    )
+    print(
+        "[!] The data pipeline maps words with the full GloVe vocabulary, "
+        "train without a pruned vocabulary for its export"
+    )
+    return pruned